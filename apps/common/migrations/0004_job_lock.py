@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_hududimportproxy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nomi')),
+                ('owner', models.CharField(max_length=32, verbose_name='Egasi')),
+                ('locked_until', models.DateTimeField(verbose_name='Qulf muddati')),
+            ],
+            options={
+                'verbose_name': 'Vazifa qulfi',
+                'verbose_name_plural': 'Vazifa qulflari',
+                'db_table': 'job_lock',
+            },
+        ),
+    ]
@@ -33,3 +33,22 @@ class HududImportProxy(KoboForm):
         proxy = True
         verbose_name = "📥 Hududlar (JSON import)"
         verbose_name_plural = "📥 Hududlar (JSON import)"
+
+
+class JobLock(models.Model):
+    """
+    Fon vazifalari uchun bazadagi qulf (lease): bir nomli vazifani bir vaqtda faqat bitta
+    ishchi bajaradi. locked_until o'tgan qulf (ishchisi o'lgan) qayta egallanadi.
+    services.job_lock orqali ishlatiladi.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nomi")
+    owner = models.CharField(max_length=32, verbose_name="Egasi")
+    locked_until = models.DateTimeField(verbose_name="Qulf muddati")
+
+    def __str__(self):
+        return f"{self.name}: {self.locked_until}"
+
+    class Meta:
+        verbose_name = "Vazifa qulfi"
+        verbose_name_plural = "Vazifa qulflari"
+        db_table = 'job_lock'
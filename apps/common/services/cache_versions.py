@@ -0,0 +1,45 @@
+import time
+
+from django.core.cache import cache
+
+
+def _key(name):
+    return f'cache_version:{name}'
+
+
+def get_version(name):
+    """
+    Nomlangan ma'lumotlar to'plamining joriy versiyasi.
+
+    Kalit keshdan tushib ketgan bo'lsa yangi (vaqtga asoslangan) versiya yoziladi,
+    shunda jarayonlardagi eski nusxalar ham qayta quriladi.
+    """
+    version = cache.get(_key(name))
+    if version is None:
+        cache.add(_key(name), time.time_ns(), None)
+        version = cache.get(_key(name))
+    return version
+
+
+def bump_version(name):
+    """
+    Versiyani oshirish: shu versiyaga bog'langan barcha keshlar eskiradi.
+    """
+    try:
+        return cache.incr(_key(name))
+    except ValueError:
+        version = time.time_ns()
+        cache.set(_key(name), version, None)
+        return version
+
+
+def get_versions(names):
+    """
+    Bir nechta versiyani bitta kesh murojaatida (get_many) o'qish: {name: version}.
+    """
+    keys = {name: _key(name) for name in names}
+    found = cache.get_many(list(keys.values()))
+    return {
+        name: found[key] if found.get(key) is not None else get_version(name)
+        for name, key in keys.items()
+    }
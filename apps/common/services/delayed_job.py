@@ -0,0 +1,74 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from apps.common.services import job_lock
+
+logger = logging.getLogger(__name__)
+
+
+class DelayedJob:
+    """
+    Davr sanasi bo'yicha kechiktirilgan qayta hisoblash: task oraliqda bir martadan ko'p
+    rejalashtirilmaydi, tranzaksiya yakunlangach yuboriladi va bir sanani bir vaqtda
+    faqat bitta ishchi bajaradi (bazadagi qulf).
+    """
+
+    def __init__(self, name, task, delay_setting, lock_timeout_setting, title):
+        """
+        :param name: kesh kaliti va qulf nomi prefiksi
+        :param task: Celery task yo'li (modullar orasida aylanma import bo'lmasligi uchun satr)
+        :param title: log xabarlari uchun nom
+        """
+        self.name = name
+        self.task = task
+        self.delay_setting = delay_setting
+        self.lock_timeout_setting = lock_timeout_setting
+        self.title = title
+
+    def _scheduled_key(self, period_date_id):
+        return f'{self.name}:scheduled:{period_date_id}'
+
+    def _lock_name(self, period_date_id):
+        return f'{self.name}:lock:{period_date_id}'
+
+    def schedule(self, period_date_id):
+        """
+        Taskni delay_setting soniyadan keyin (shu oraliqda bir martadan ko'p emas)
+        tranzaksiya yakunlangach yuborish.
+        """
+        delay = getattr(settings, self.delay_setting, 60)
+        scheduled_key = self._scheduled_key(period_date_id)
+        if not cache.add(scheduled_key, True, delay + 60):
+            return
+
+        def enqueue():
+            try:
+                import_string(self.task).apply_async((period_date_id,), countdown=delay)
+            except Exception as e:
+                cache.delete(scheduled_key)
+                logger.error(f"{self.title} taskini yuborishda xatolik: {e}")
+
+        transaction.on_commit(enqueue)
+
+    def run(self, period_date_id, func):
+        """
+        Task uchun: func(period_date_id) ni qulf ostida bajarish. Qulf band bo'lsa task
+        qayta rejalashtiriladi.
+
+        :return: func natijasi yoki None (boshqa ishchi band)
+        """
+        # Bajarish boshlanganidan keyingi o'zgarishlar yangi taskni rejalashtira olishi uchun
+        cache.delete(self._scheduled_key(period_date_id))
+        lock_name = self._lock_name(period_date_id)
+        owner = job_lock.acquire(lock_name, getattr(settings, self.lock_timeout_setting, 60 * 10))
+        if owner is None:
+            self.schedule(period_date_id)
+            return None
+        try:
+            return func(period_date_id)
+        finally:
+            job_lock.release(lock_name, owner)
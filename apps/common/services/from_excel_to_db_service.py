@@ -435,6 +435,11 @@ class PlanshetExcelImporter:
                 self.import_category(self.read_sheet("category"))
             if "product" in sheets:
                 self.import_products(self.read_sheet("product"))
+
+            if "category" in sheets or "product" in sheets:
+                # bulk_create signal yubormaydi, katalog indeksini qo'lda eskirtiramiz
+                from apps.form.services.catalog import invalidate_catalog
+                transaction.on_commit(invalidate_catalog)
                 
             return self.results
             
@@ -0,0 +1,35 @@
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.common.models import JobLock
+
+
+def acquire(name, timeout):
+    """
+    Qulfni egallash: muddati o'tgan qulf shartli UPDATE bilan, yo'q qulf INSERT bilan olinadi.
+    Kesh ishlatilmaydi, shuning uchun LocMemCache da ham barcha jarayonlar uchun yagona.
+
+    :param timeout: soniya, shundan keyin qulf (ishchi o'lgan bo'lsa) qayta egallanishi mumkin
+    :return: egasi tokeni yoki None (boshqa ishchi band)
+    """
+    owner = uuid.uuid4().hex
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=timeout)
+    if JobLock.objects.filter(name=name, locked_until__lt=now).update(owner=owner, locked_until=locked_until):
+        return owner
+    try:
+        with transaction.atomic():
+            JobLock.objects.create(name=name, owner=owner, locked_until=locked_until)
+    except IntegrityError:
+        return None
+    return owner
+
+
+def release(name, owner):
+    """
+    Faqat o'zi egallagan qulfni bo'shatish (muddati o'tib boshqa ishchi olgan bo'lsa tegmaydi).
+    """
+    JobLock.objects.filter(name=name, owner=owner).delete()
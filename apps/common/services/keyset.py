@@ -0,0 +1,139 @@
+import base64
+import json
+import logging
+
+from django.db import connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(values, direction):
+    """
+    Kursor: kalit qiymatlari va yo'nalish, URL uchun xavfsiz base64 ko'rinishida.
+    """
+    payload = json.dumps([direction] + [str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parsers):
+    """
+    :param parsers: har bir kalit maydoni qiymatini satrdan o'giruvchi funksiyalar (masalan date.fromisoformat, int)
+    :return: (yo'nalish, qiymatlar) yoki None (kursor noto'g'ri yoki o'zgartirilgan)
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, list) or len(payload) != len(parsers) + 1 or payload[0] not in (NEXT, PREVIOUS):
+        return None
+    try:
+        values = [parse(value) for parse, value in zip(parsers, payload[1:])]
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return payload[0], values
+
+
+def estimate_count(queryset):
+    """
+    Taxminiy yozuvlar soni. PostgreSQL da rejalashtiruvchi bahosi (EXPLAIN), to'liq
+    COUNT(*) bajarilmaydi. Boshqa bazalarda aniq count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            return int(plan[0]['Plan']['Plan Rows'])
+        except (ValueError, LookupError, TypeError) as e:
+            logger.warning(f"EXPLAIN bahosini o'qib bo'lmadi: {e}")
+    return queryset.order_by().count()
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Kursor (keyset) sahifalash: OFFSET o'rniga `WHERE (a, b) < (oxirgi_a, oxirgi_b)`.
+    Har qanday sahifa birinchi sahifa kabi indeks bo'yicha per_page + 1 qator o'qiydi.
+
+    Tartib barcha kalit maydonlar bo'yicha kamayish tartibida, oxirgi maydon yagona
+    (masalan id) bo'lishi kerak.
+
+    :param fields: kalit maydonlari, masalan ('period__date', 'id')
+    :param key: obyektdan kalit qiymatlarini oluvchi funksiya, fields bilan bir xil tartibda
+    :param parsers: kursordagi qiymatlarni o'giruvchi funksiyalar, fields bilan bir xil tartibda
+    """
+
+    def __init__(self, queryset, fields, key, parsers, per_page):
+        self.queryset = queryset
+        self.fields = list(fields)
+        self.key = key
+        self.parsers = list(parsers)
+        self.per_page = per_page
+
+    def _after(self, values, descending):
+        """
+        (f1, f2, ...) dan keyingi (descending=True: kichik) qatorlar sharti.
+        """
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for position, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for previous_field, value in zip(self.fields[:position], values):
+                step &= Q(**{previous_field: value})
+            condition |= step
+        return condition
+
+    def _ordering(self, descending):
+        return [f'-{field}' if descending else field for field in self.fields]
+
+    def get_page(self, cursor=None):
+        decoded = decode_cursor(cursor, self.parsers)
+        limit = self.per_page + 1
+
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self._ordering(True))[:limit])
+            has_more, is_first = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        elif decoded[0] == NEXT:
+            rows = list(
+                self.queryset.filter(self._after(decoded[1], True)).order_by(*self._ordering(True))[:limit]
+            )
+            has_more, is_first = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        else:
+            rows = list(
+                self.queryset.filter(self._after(decoded[1], False)).order_by(*self._ordering(False))[:limit]
+            )
+            is_first = len(rows) <= self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_more = True
+
+        next_cursor = encode_cursor(self.key(rows[-1]), NEXT) if rows and has_more else None
+        previous_cursor = encode_cursor(self.key(rows[0]), PREVIOUS) if rows and not is_first else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,140 @@
+import threading
+from collections import namedtuple
+
+from apps.common.services.cache_versions import bump_version, get_versions
+from apps.form.models import Product, ProductCategory
+from apps.home.models import District, Employee, Period, PeriodDate, Region
+
+RegionOption = namedtuple('RegionOption', ['id', 'name', 'code'])
+DistrictOption = namedtuple('DistrictOption', ['id', 'name', 'code', 'region_id'])
+PeriodOption = namedtuple('PeriodOption', ['id', 'name', 'period_type', 'period_type_display'])
+PeriodDateOption = namedtuple('PeriodDateOption', ['id', 'date', 'period_id'])
+CategoryOption = namedtuple('CategoryOption', ['id', 'name'])
+ProductOption = namedtuple('ProductOption', ['id', 'name', 'category_id'])
+EmployeeOption = namedtuple('EmployeeOption', ['id', 'full_name', 'district_id'])
+
+PERIOD_TYPES = dict(Period._meta.get_field('period_type').choices)
+
+
+def _periods():
+    return [
+        PeriodOption(pk, name, period_type, PERIOD_TYPES.get(period_type, period_type))
+        for pk, name, period_type in Period.objects.filter(is_active=True).order_by('-id').values_list(
+            'id', 'name', 'period_type'
+        )
+    ]
+
+
+# Ro'yxat nomi -> yuklovchi. Har bir ro'yxat alohida versiyaga ega.
+LOADERS = {
+    'regions': lambda: [
+        RegionOption(*row) for row in Region.objects.order_by('name').values_list('id', 'name', 'code')
+    ],
+    'districts': lambda: [
+        DistrictOption(*row)
+        for row in District.objects.order_by('name').values_list('id', 'name', 'code', 'region_id')
+    ],
+    'periods': _periods,
+    'period_dates': lambda: [
+        PeriodDateOption(*row) for row in PeriodDate.objects.order_by('-id').values_list('id', 'date', 'period_id')
+    ],
+    'categories': lambda: [
+        CategoryOption(*row) for row in ProductCategory.objects.order_by('name').values_list('id', 'name')
+    ],
+    'products': lambda: [
+        ProductOption(*row) for row in Product.objects.order_by('name').values_list('id', 'name', 'category_id')
+    ],
+    'employees': lambda: [
+        EmployeeOption(*row)
+        for row in Employee.objects.order_by('full_name').values_list('id', 'full_name', 'district_id')
+    ],
+}
+# Qaysi model o'zgarganda qaysi ro'yxat eskiradi
+MODEL_LISTS = {
+    Region: ['regions'],
+    District: ['districts'],
+    Period: ['periods'],
+    PeriodDate: ['period_dates'],
+    ProductCategory: ['categories'],
+    Product: ['products'],
+    Employee: ['employees'],
+}
+# Sahifaga to'liq chiqarilmaydigan, qidiruv endpointi orqali beriladigan ro'yxatlar
+SEARCHABLE = {'products': 'name', 'employees': 'full_name'}
+SEARCH_LIMIT = 20
+
+_lock = threading.Lock()
+_lists = {}
+
+
+def _version_name(name):
+    return f'reference_data:{name}'
+
+
+def get_options(*names):
+    """
+    Filtr ro'yxatlari (namedtuple lar tuple i). Jarayon ichida saqlanadi va faqat versiyasi
+    o'zgarganda (model saqlangan/o'chirilgan) qayta yuklanadi; versiyalar bitta get_many bilan o'qiladi.
+
+    :return: bitta nom berilsa tuple, bir nechta bo'lsa {nom: tuple}
+    """
+    versions = get_versions([_version_name(name) for name in names])
+    result = {}
+    for name in names:
+        version = versions[_version_name(name)]
+        entry = _lists.get(name)
+        if entry is None or entry[0] != version:
+            with _lock:
+                entry = _lists.get(name)
+                if entry is None or entry[0] != version:
+                    entry = (version, tuple(LOADERS[name]()))
+                    _lists[name] = entry
+        result[name] = entry[1]
+    return result[names[0]] if len(names) == 1 else result
+
+
+def invalidate(model):
+    for name in MODEL_LISTS.get(model, []):
+        bump_version(_version_name(name))
+
+
+def find(name, pk):
+    """
+    Ro'yxatdan id bo'yicha qator (tanlangan qiymatni ko'rsatish uchun). Topilmasa None.
+    """
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    return next((option for option in get_options(name) if option.id == pk), None)
+
+
+def search(name, query='', limit=SEARCH_LIMIT, **filters):
+    """
+    Katta ro'yxatlarda server tomonida qidiruv: nomida query bo'lganlar (katta-kichik harf farqsiz).
+
+    :param filters: qator maydonlari bo'yicha aniq moslik, masalan category_id=3
+    """
+    field = SEARCHABLE[name]
+    query = (query or '').strip().casefold()
+    results = []
+    for option in get_options(name):
+        if any(str(getattr(option, key)) != str(value) for key, value in filters.items()):
+            continue
+        if query and query not in (getattr(option, field) or '').casefold():
+            continue
+        results.append(option)
+        if len(results) >= limit:
+            break
+    return results
+
+
+def filter_districts(districts, region_id):
+    """
+    Viloyat tanlangan bo'lsa faqat uning tumanlari.
+    """
+    try:
+        region_id = int(region_id)
+    except (TypeError, ValueError):
+        return districts
+    return [district for district in districts if district.region_id == region_id]
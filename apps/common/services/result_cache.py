@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from apps.common.services.cache_versions import bump_version, get_versions
+from apps.form.models import PriceFact, PriceSeries
+from apps.home.services.period_calendar import get_calendar
+
+logger = logging.getLogger(__name__)
+
+PERIOD_VERSION_PREFIX = 'monitoring_period'
+# Obyekt/rasta faolligi, hududlar va davrlar tuzilmasi: barcha natijalarga ta'sir qiladi
+STRUCTURE_VERSION = 'monitoring_structure'
+CATALOG_VERSION = 'product_catalog'
+METRICS_PREFIX = 'monitoring_cache:metrics'
+NAMESPACES = ('stats', 'dashboard_regions', 'product_detail', 'region_monitoring')
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple, set)):
+        return [_normalize(item) for item in value]
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def filter_fingerprint(filters):
+    """
+    Filtrlar lug'atining barqaror xeshi: kalitlar tartibi va qiymat turi (int/str/date) farq qilmaydi.
+    """
+    normalized = {key: _normalize(value) for key, value in filters.items() if value not in (None, '')}
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def period_version_name(period_date_id):
+    return f'{PERIOD_VERSION_PREFIX}:{period_date_id}'
+
+
+def invalidate_periods(period_date_ids):
+    """
+    Shu davr sanalariga bog'liq natijalarni eskirtirish (history o'zgarganda).
+    """
+    for period_date_id in set(period_date_ids):
+        bump_version(period_version_name(period_date_id))
+
+
+def invalidate_structure():
+    bump_version(STRUCTURE_VERSION)
+
+
+def period_dates_for_filters(filters):
+    """
+    History filtrlari qamraydigan PeriodDate lar (davr kalendaridan, bazaga murojaatsiz).
+    Davr ham, sana oralig'i ham berilmasa barcha sanalar.
+    """
+    calendar = get_calendar()
+    period_id = filters.get('period__period_id')
+    if period_id:
+        period_dates = calendar.period_dates(int(period_id))
+    else:
+        period_dates = list(calendar.by_id.values())
+    date_range = filters.get('period__date__range')
+    if date_range:
+        period_dates = [
+            period_date for period_date in period_dates if date_range[0] <= period_date.date <= date_range[1]
+        ]
+    return period_dates
+
+
+def _is_open(period_date_id, calendar):
+    """
+    Sana joriy (faol) davrga tegishlimi. Kalendarda yo'q sana ham ochiq hisoblanadi.
+    """
+    period_date = calendar.get(period_date_id)
+    if period_date is None:
+        return True
+    active = calendar.active(period_date.period.period_type)
+    return active is not None and active.period_id == period_date.period_id
+
+
+def _has_open(period_date_ids):
+    calendar = get_calendar()
+    return any(_is_open(period_date_id, calendar) for period_date_id in period_date_ids)
+
+
+def _data_stamp(period_date_ids):
+    """
+    Yopiq davr sanalari uchun Celery ishchisi yozadigan yig'ma jadvallarning bazadagi holati
+    (oxirgi yangilanish va qatorlar soni). Ishchidagi invalidate_periods LocMemCache da web
+    jarayonlariga yetmaydi, shuning uchun uzoq saqlanadigan natija shu qiymatga ham bog'lanadi.
+    """
+    return [
+        list(model.objects.filter(period_id__in=period_date_ids).aggregate(
+            updated=Max('updated_at'), count=Count('id')
+        ).values())
+        for model in (PriceFact, PriceSeries)
+    ]
+
+
+def _record(namespace, outcome):
+    key = f'{METRICS_PREFIX}:{namespace}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_or_compute(namespace, params, period_dates, compute):
+    """
+    Natijani (filtrlar xeshi + davr sanalari versiyalari) kaliti bo'yicha keshdan olish
+    yoki hisoblab yozish.
+
+    Davr sanasining historysi o'zgarsa uning versiyasi oshadi va unga bog'liq barcha
+    kalitlar o'z-o'zidan eskiradi. Yopiq davrlar natijasi uzoq (MONITORING_CACHE_CLOSED_TIMEOUT)
+    saqlanadi va kalitiga faktlar/vaqt qatorining bazadagi holati ham kiradi (_data_stamp),
+    joriy davrni o'z ichiga olganlari qisqa (MONITORING_STATS_TIMEOUT) saqlanadi.
+
+    :param namespace: natija turi (NAMESPACES dan)
+    :param params: natijani aniqlovchi filtrlar
+    :param period_dates: natija bog'liq PeriodDate obyektlari yoki id lari
+    :param compute: argumentsiz funksiya, keshda bo'lmasa chaqiriladi
+    """
+    period_date_ids = sorted({getattr(period_date, 'id', period_date) for period_date in period_dates})
+    names = [STRUCTURE_VERSION, CATALOG_VERSION] + [period_version_name(pk) for pk in period_date_ids]
+    versions = get_versions(names)
+    is_open = _has_open(period_date_ids)
+    fingerprint = filter_fingerprint({
+        **params,
+        '_versions': [versions[name] for name in names],
+        '_data': None if is_open else _data_stamp(period_date_ids),
+    })
+    key = f'monitoring_cache:{namespace}:{fingerprint}'
+
+    result = cache.get(key)
+    if result is not None:
+        _record(namespace, 'hits')
+        return result
+
+    _record(namespace, 'misses')
+    result = compute()
+    if is_open:
+        timeout = getattr(settings, 'MONITORING_STATS_TIMEOUT', 60 * 2)
+    else:
+        timeout = getattr(settings, 'MONITORING_CACHE_CLOSED_TIMEOUT', 60 * 60 * 24 * 7)
+    cache.set(key, result, timeout)
+    return result
+
+
+def cache_metrics():
+    """
+    Natija turlari bo'yicha hit/miss soni va ulushi.
+    """
+    keys = [
+        f'{METRICS_PREFIX}:{namespace}:{outcome}' for namespace in NAMESPACES for outcome in ('hits', 'misses')
+    ]
+    values = cache.get_many(keys)
+    metrics = {}
+    for namespace in NAMESPACES:
+        hits = values.get(f'{METRICS_PREFIX}:{namespace}:hits', 0)
+        misses = values.get(f'{METRICS_PREFIX}:{namespace}:misses', 0)
+        total = hits + misses
+        metrics[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 3) if total else None,
+        }
+    return metrics
@@ -0,0 +1,222 @@
+import logging
+
+import numpy as np
+
+from apps.common.services.result_cache import get_or_compute, period_dates_for_filters
+from apps.form.models import PriceFact, Product, TochkaProductHistory
+from apps.form.services.price_facts import fact_filters
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    'price', 'product_id', 'hudud_id', 'hudud__district_id',
+    'hudud__district__region_id', 'period__date', 'is_outlier',
+)
+TOP_PRODUCTS_LIMIT = 10
+
+
+def _empty():
+    return {
+        'total_records': 0,
+        'avg_price': None,
+        'max_price': None,
+        'min_price': None,
+        'median_price': None,
+        'outlier_count': 0,
+        'unique_products': 0,
+        'unique_tochkas': 0,
+        'unique_districts': 0,
+        'unique_regions': 0,
+        'top_products': [],
+        'trend': {'labels': [], 'data': []},
+    }
+
+
+def _fetch_columns(filters):
+    """
+    Bitta so'rov: faqat kerakli ustunlar, modelsiz (values_list) o'qiladi.
+    """
+    rows = list(
+        TochkaProductHistory.objects.filter(is_active=True, **filters).order_by().values_list(*COLUMNS)
+    )
+    if not rows:
+        return None
+    prices, products, tochkas, districts, regions, dates, outliers = zip(*rows)
+    return {
+        'price': np.asarray(prices, dtype=np.float64),
+        'product': np.asarray(products, dtype=np.int64),
+        'tochka': np.asarray(tochkas, dtype=np.int64),
+        'district': np.asarray(districts, dtype=np.int64),
+        'region': np.asarray(regions, dtype=np.int64),
+        'date': np.asarray(dates, dtype='datetime64[D]'),
+        'outlier': np.asarray(outliers, dtype=bool),
+    }
+
+
+def _group_mean(keys, values):
+    """
+    keys bo'yicha guruhlab o'rtacha: (unikal kalitlar, o'rtachalar).
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(unique))
+    counts = np.bincount(inverse, minlength=len(unique))
+    return unique, sums / counts
+
+
+def _fetch_fact_columns(filters):
+    """
+    PriceFact dan ustunlar: har bir qator (davr sanasi, tuman, mahsulot) guruhi.
+    """
+    rows = list(
+        PriceFact.objects.filter(count__gt=0, **filters).order_by().values_list(
+            'count', 'price_sum', 'price_min', 'price_max', 'product_id',
+            'district_id', 'district__region_id', 'period__date',
+            'price_median', 'clean_count', 'outlier_count',
+        )
+    )
+    if not rows:
+        return None
+    (counts, sums, minimums, maximums, products, districts, regions, dates,
+     medians, clean_counts, outlier_counts) = zip(*rows)
+    return {
+        'count': np.asarray(counts, dtype=np.int64),
+        'sum': np.asarray(sums, dtype=np.float64),
+        'min': np.asarray(minimums, dtype=np.float64),
+        'max': np.asarray(maximums, dtype=np.float64),
+        'product': np.asarray(products, dtype=np.int64),
+        'district': np.asarray(districts, dtype=np.int64),
+        'region': np.asarray(regions, dtype=np.int64),
+        'date': np.asarray(dates, dtype='datetime64[D]'),
+        'median': np.asarray(medians, dtype=np.float64),
+        'clean_count': np.asarray(clean_counts, dtype=np.int64),
+        'outlier_count': np.asarray(outlier_counts, dtype=np.int64),
+    }
+
+
+def _median(values):
+    return float(np.median(values)) if values.size else None
+
+
+def _weighted_median(values, weights):
+    """
+    Og'irlikli mediana: guruh medianalaridan umumiy medianani taxminlash.
+    """
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    if not cumulative.size or cumulative[-1] <= 0:
+        return None
+    return float(values[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+def _group_weighted_mean(keys, sums, counts):
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, (
+        np.bincount(inverse, weights=sums, minlength=len(unique)) /
+        np.bincount(inverse, weights=counts, minlength=len(unique))
+    )
+
+
+def _top_and_trend(stats, product_ids, product_means, dates, date_means):
+    top = np.argsort(-product_means, kind='stable')[:TOP_PRODUCTS_LIMIT]
+    names = {
+        product['id']: product
+        for product in Product.objects.filter(id__in=product_ids[top].tolist()).values(
+            'id', 'name', 'category__name'
+        )
+    }
+    stats['top_products'] = [
+        {
+            'product__name': names.get(int(product_ids[index]), {}).get('name'),
+            'product__category__name': names.get(int(product_ids[index]), {}).get('category__name'),
+            'avg_price': float(product_means[index]),
+        }
+        for index in top
+    ]
+
+    labels = []
+    for date in dates.astype(object):
+        labels.append(f"{date.year}-{date.month}-{date.day}")
+    stats['trend'] = {'labels': labels, 'data': [float(mean) for mean in date_means]}
+    return stats
+
+
+def compute_statistics_from_facts(filters):
+    """
+    compute_statistics bilan bir xil natija, lekin PriceFact yig'indilaridan.
+    Unikal obyektlar soni faktlardan chiqmaydi, u (period, hudud) indeksi bo'yicha sanaladi.
+    Mediana bu yerda taxminiy: guruh medianalarining narxlar soni bo'yicha og'irlikli medianasi.
+
+    :param filters: TochkaProductHistory filtrlari (fact_filters qabul qiladigan)
+    """
+    columns = _fetch_fact_columns(fact_filters(filters))
+    if columns is None:
+        return _empty()
+
+    counts = columns['count']
+    total = int(counts.sum())
+    computed = ~np.isnan(columns['median'])
+    stats = {
+        'total_records': total,
+        'avg_price': float(columns['sum'].sum() / total),
+        'max_price': float(columns['max'].max()),
+        'min_price': float(columns['min'].min()),
+        # Guruh medianalari hali hisoblanmagan (services.price_outliers) faktlar hisobga olinmaydi
+        'median_price': _weighted_median(
+            columns['median'][computed], (columns['clean_count'] + columns['outlier_count'])[computed]
+        ),
+        'outlier_count': int(columns['outlier_count'].sum()),
+        'unique_products': int(np.unique(columns['product']).size),
+        'unique_tochkas': TochkaProductHistory.objects.filter(
+            is_active=True, **filters
+        ).order_by().values('hudud_id').distinct().count(),
+        'unique_districts': int(np.unique(columns['district']).size),
+        'unique_regions': int(np.unique(columns['region']).size),
+    }
+    product_ids, product_means = _group_weighted_mean(columns['product'], columns['sum'], counts)
+    dates, date_means = _group_weighted_mean(columns['date'], columns['sum'], counts)
+    return _top_and_trend(stats, product_ids, product_means, dates, date_means)
+
+
+def compute_statistics(filters):
+    """
+    Monitoring ko'rsatkichlarini bitta ustunli o'qish va NumPy qisqartmalari bilan hisoblash:
+    soni, o'rtacha/eng yuqori/eng past narx, musbat narxlar medianasi, shubhali narxlar soni, unikal mahsulot/obyekt/tuman/viloyatlar,
+    o'rtacha narx bo'yicha top-10 mahsulot va sana bo'yicha narx dinamikasi.
+
+    :param filters: TochkaProductHistory uchun ORM filtrlari (is_active=True doim qo'shiladi)
+    """
+    columns = _fetch_columns(filters)
+    if columns is None:
+        return _empty()
+
+    prices = columns['price']
+    stats = {
+        'total_records': int(prices.size),
+        'avg_price': float(prices.mean()),
+        'max_price': float(prices.max()),
+        'min_price': float(prices.min()),
+        'median_price': _median(prices[prices > 0]),
+        'outlier_count': int(columns['outlier'].sum()),
+        'unique_products': int(np.unique(columns['product']).size),
+        'unique_tochkas': int(np.unique(columns['tochka']).size),
+        'unique_districts': int(np.unique(columns['district']).size),
+        'unique_regions': int(np.unique(columns['region']).size),
+    }
+
+    product_ids, product_means = _group_mean(columns['product'], prices)
+    dates, date_means = _group_mean(columns['date'], prices)
+    return _top_and_trend(stats, product_ids, product_means, dates, date_means)
+
+
+def get_statistics(filters):
+    """
+    Statistika natijasi filtrlar xeshi va davr sanalari versiyalari bo'yicha keshlanadi
+    (services.result_cache).
+    """
+    def compute():
+        # Filtrlar tuman/mahsulot/davr darajasida bo'lsa PriceFact dan, aks holda xom historydan
+        if fact_filters(filters) is not None:
+            return compute_statistics_from_facts(filters)
+        return compute_statistics(filters)
+
+    return get_or_compute('stats', filters, period_dates_for_filters(filters), compute)
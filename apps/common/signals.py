@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.form.models import Product, ProductCategory, TochkaProduct, TochkaProductHistory
+from apps.form.signals import histories_changed, activation_changed
+from apps.home.models import District, Employee, NTochka, Period, PeriodDate, Region, Tochka
+
+from .services import reference_data, result_cache
+
+
+@receiver(histories_changed, sender=TochkaProductHistory)
+def invalidate_period_results(sender, histories, **kwargs):
+    """
+    History o'zgargan davr sanalarining monitoring natijalarini tranzaksiya yakunlangach eskirtirish.
+    """
+    period_date_ids = {history.period_id for history in histories}
+    transaction.on_commit(lambda: result_cache.invalidate_periods(period_date_ids))
+
+
+@receiver(activation_changed)
+def invalidate_results_on_activation(sender, **kwargs):
+    transaction.on_commit(result_cache.invalidate_structure)
+
+
+@receiver(post_save, sender=TochkaProduct)
+@receiver(post_delete, sender=TochkaProduct)
+@receiver(post_save, sender=Tochka)
+@receiver(post_delete, sender=Tochka)
+@receiver(post_save, sender=NTochka)
+@receiver(post_delete, sender=NTochka)
+@receiver(post_save, sender=District)
+@receiver(post_delete, sender=District)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Period)
+@receiver(post_delete, sender=Period)
+@receiver(post_save, sender=PeriodDate)
+@receiver(post_delete, sender=PeriodDate)
+def invalidate_results_on_structure(sender, instance, **kwargs):
+    """
+    Obyekt/rasta, hudud, xodim yoki davr o'zgarganda barcha monitoring natijalarini eskirtirish.
+    """
+    transaction.on_commit(result_cache.invalidate_structure)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=District)
+@receiver(post_delete, sender=District)
+@receiver(post_save, sender=Period)
+@receiver(post_delete, sender=Period)
+@receiver(post_save, sender=PeriodDate)
+@receiver(post_delete, sender=PeriodDate)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_reference_data(sender, instance, **kwargs):
+    """
+    Filtr ro'yxatlaridan tegishlisini barcha jarayonlarda tranzaksiya yakunlangach eskirtirish,
+    aks holda boshqa jarayon yangi versiya bilan hali yakunlanmagan (eski) ro'yxatni yuklab qo'yadi.
+    """
+    transaction.on_commit(lambda: reference_data.invalidate(sender))
@@ -1,3 +1,357 @@
-from django.test import TestCase
+import base64
+import json
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+
+from apps.common.models import JobLock
+from apps.common.services import job_lock, reference_data, result_cache
+from apps.common.services.delayed_job import DelayedJob
+from apps.common.services.keyset import KeysetPaginator, NEXT, decode_cursor, encode_cursor
+from apps.common.services.statistics import compute_statistics
+from apps.form.models import PriceFact
+from apps.form.services.price_outliers import flag_period
+from apps.form.services.price_series import rebuild_series
+from apps.form.tests import create_history, create_rasta
+from apps.home.models import Period, PeriodDate, Region
+from apps.home.services.period_calendar import get_calendar
+from core import db_router
+from core.db_router import REPLICA_DB_ALIAS, ReplicaRouter, ReplicaRoutingMiddleware
+
+
+@override_settings(REPLICA_READ_VIEWS=['home:home:tochka-list'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        replica = dict(connections.settings[DEFAULT_DB_ALIAS])
+        patcher = mock.patch.dict(connections.settings, {REPLICA_DB_ALIAS: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_view(self, method, path, status=200, cookies=None, **extra):
+        seen = {}
+
+        def view(request):
+            seen['db'] = self.router.db_for_read(None)
+            return HttpResponse(status=status)
+
+        def get_response(request):
+            # Django handler kabi: resolve -> process_view -> view
+            request.resolver_match = resolve(request.path)
+            return middleware.process_view(request, view, (), {}) or view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(self.factory, method)(path, **extra)
+        request.COOKIES.update(cookies or {})
+        seen['response'] = middleware(request)
+        return seen['db'], seen['response']
+
+    def read_db(self, **kwargs):
+        return self.run_view('get', '/api/home/tochka-list/', **kwargs)[0]
+
+    def test_listed_view_reads_from_replica(self):
+        self.assertEqual(self.read_db(), REPLICA_DB_ALIAS)
+        self.assertFalse(db_router._use_replica.get())
+
+    def test_other_views_read_from_default(self):
+        self.assertEqual(self.run_view('get', '/api/form/product-list/')[0], DEFAULT_DB_ALIAS)
+
+    def test_write_makes_client_sticky(self):
+        _, response = self.run_view('post', '/api/form/tochka-product-history/')
+        value = response.cookies[db_router.STICKY_COOKIE].value
+        self.assertEqual(response[db_router.STICKY_HEADER], value)
+
+        # Kesh ishlatilmaydi: belgi mijozning o'zida (cookie yoki qaytarilgan sarlavha)
+        cache.clear()
+        self.assertEqual(self.read_db(cookies={db_router.STICKY_COOKIE: value}), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read_db(HTTP_X_DB_STICKY=value), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read_db(), REPLICA_DB_ALIAS)
+        self.assertEqual(self.read_db(HTTP_X_DB_STICKY=value + 'x'), REPLICA_DB_ALIAS)
+
+    def test_sticky_mark_expires(self):
+        _, response = self.run_view('post', '/api/form/tochka-product-history/')
+        value = response[db_router.STICKY_HEADER]
+        with mock.patch('time.time', return_value=time.time() + db_router._sticky_seconds() + 1):
+            self.assertEqual(self.read_db(HTTP_X_DB_STICKY=value), REPLICA_DB_ALIAS)
+
+    def test_failed_write_is_not_sticky(self):
+        _, response = self.run_view('post', '/api/form/tochka-product-history/', status=400)
+        self.assertNotIn(db_router.STICKY_COOKIE, response.cookies)
+        self.assertFalse(response.has_header(db_router.STICKY_HEADER))
+
+    def test_write_inside_request_switches_reads_to_default(self):
+        token = db_router._use_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(None), REPLICA_DB_ALIAS)
+            self.assertEqual(self.router.db_for_write(None), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+        finally:
+            db_router._use_replica.reset(token)
+
+
+class KeysetPaginatorTests(TestCase):
+    parsers = (date.fromisoformat, int)
+
+    def setUp(self):
+        cache.clear()
+        period = Period.objects.create(name='2026-W01', period_type='weekly')
+        start = date(2026, 1, 1)
+        # bir xil sanali qatorlar id bo'yicha ajraladi
+        for offset in (0, 0, 1, 2, 2, 2, 3):
+            PeriodDate.objects.create(period=period, date=start + timedelta(days=offset))
+        self.expected = list(PeriodDate.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.paginator = KeysetPaginator(
+            PeriodDate.objects.all(), fields=('date', 'id'), key=lambda period_date: (period_date.date, period_date.id),
+            parsers=self.parsers, per_page=3,
+        )
+
+    def ids(self, page):
+        return [period_date.id for period_date in page]
+
+    def test_pages_forward_and_back(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        back = self.paginator.get_page(back.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertFalse(back.has_previous)
+
+    def test_tampered_cursor_returns_first_page(self):
+        tampered = [
+            'not-base64!',
+            encode_cursor(['2026-13-45', 1], NEXT),
+            encode_cursor(['2026-01-01', 'abc'], NEXT),
+            encode_cursor(['2026-01-01'], NEXT),
+            base64.urlsafe_b64encode(json.dumps(['x', '2026-01-01', '1']).encode()).decode(),
+        ]
+        for cursor in tampered:
+            self.assertIsNone(decode_cursor(cursor, self.parsers), cursor)
+            self.assertEqual(self.ids(self.paginator.get_page(cursor)), self.expected[:3])
+
+
+class StatisticsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        period_date = self.rasta['period_date']
+        first, second, third = self.rasta['tochka_products']
+        create_history(first, period_date, 10)
+        create_history(second, period_date, 20)
+        create_history(third, period_date, 60, is_outlier=True, outlier_reason='high')
+        create_history(first, PeriodDate.objects.create(period=self.rasta['period'], date=date(2020, 1, 1)), 5,
+                       is_active=False)
+        self.filters = {'period__period_id': self.rasta['period'].id}
+
+    def test_compute_statistics(self):
+        with self.assertNumQueries(2):
+            stats = compute_statistics(self.filters)
+        self.assertEqual(
+            {key: stats[key] for key in (
+                'total_records', 'avg_price', 'max_price', 'min_price', 'median_price', 'outlier_count',
+                'unique_products', 'unique_tochkas', 'unique_districts', 'unique_regions',
+            )},
+            {
+                'total_records': 3, 'avg_price': 30.0, 'max_price': 60.0, 'min_price': 10.0, 'median_price': 20.0,
+                'outlier_count': 1, 'unique_products': 3, 'unique_tochkas': 1, 'unique_districts': 1,
+                'unique_regions': 1,
+            },
+        )
+        self.assertEqual(
+            [(product['product__name'], product['avg_price']) for product in stats['top_products']],
+            [('Mahsulot 2', 60.0), ('Mahsulot 1', 20.0), ('Mahsulot 0', 10.0)],
+        )
+        today = self.rasta['period_date'].date
+        self.assertEqual(stats['trend'], {'labels': [f'{today.year}-{today.month}-{today.day}'], 'data': [30.0]})
+
+    def test_empty_filters_return_empty_statistics(self):
+        stats = compute_statistics({'period__period_id': 0})
+        self.assertEqual((stats['total_records'], stats['avg_price'], stats['top_products']), (0, None, []))
+
+
+class ResultCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.period_date = self.rasta['period_date']
+        self.other = PeriodDate.objects.create(period=self.rasta['period'], date=date(2020, 1, 1))
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def get(self, period_dates):
+        return result_cache.get_or_compute('stats', {'period': self.rasta['period'].id}, period_dates, self.compute)
+
+    def test_period_bump_invalidates_only_dependent_results(self):
+        self.assertEqual(self.get([self.period_date]), {'calls': 1})
+        self.assertEqual(self.get([self.other]), {'calls': 2})
+        self.assertEqual(self.get([self.period_date]), {'calls': 1})
+
+        result_cache.invalidate_periods([self.period_date.id])
+        self.assertEqual(self.get([self.period_date]), {'calls': 3})
+        self.assertEqual(self.get([self.other]), {'calls': 2})
+
+        result_cache.invalidate_structure()
+        self.assertEqual(self.get([self.other]), {'calls': 4})
+        self.assertEqual(result_cache.cache_metrics()['stats'], {'hits': 2, 'misses': 4, 'hit_ratio': 0.333})
+
+    def test_history_change_bumps_version_after_commit(self):
+        self.get([self.period_date])
+        with self.captureOnCommitCallbacks(execute=True):
+            create_history(self.rasta['tochka_products'][0], self.period_date, 100)
+            # Tranzaksiya yakunlanmaguncha eski natija qaytadi
+            self.assertEqual(self.get([self.period_date]), {'calls': 1})
+        self.assertEqual(self.get([self.period_date]), {'calls': 2})
+
+    def test_closed_period_results_follow_worker_rebuilds(self):
+        closed = PeriodDate.objects.create(
+            period=Period.objects.create(name='2019-W01', period_type='weekly'), date=date(2019, 1, 7)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            create_history(self.rasta['tochka_products'][0], closed, 100)
+        self.assertIsNotNone(get_calendar().get(closed.id))
+        self.assertFalse(result_cache._has_open([closed.id]))
+        self.assertEqual(self.get([closed]), {'calls': 1})
+        self.assertEqual(self.get([closed]), {'calls': 1})
+
+        # Ishchi boshqa jarayonda qayta qurdi: bu jarayonning versiyasi oshmagan
+        with mock.patch('apps.form.services.price_series.invalidate_periods'):
+            rebuild_series([closed.id])
+        self.assertEqual(self.get([closed]), {'calls': 2})
+        with mock.patch('apps.form.services.price_outliers.invalidate_periods'):
+            PriceFact.objects.filter(period=closed).update(price_median=None)
+            flag_period(closed.id)
+        self.assertEqual(self.get([closed]), {'calls': 3})
+
+    def test_evicted_version_invalidates_results(self):
+        self.get([self.period_date])
+        cache.delete(f'cache_version:{result_cache.period_version_name(self.period_date.id)}')
+        self.assertEqual(self.get([self.period_date]), {'calls': 2})
+
+
+class ReferenceDataTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_model_change_invalidates_list_after_commit(self):
+        self.assertEqual(reference_data.get_options('regions'), ())
+        with self.captureOnCommitCallbacks(execute=True):
+            region = Region.objects.create(name='Toshkent', code='27')
+            # Yakunlanmagan tranzaksiyada versiya o'zgarmaydi, jarayondagi ro'yxat qoladi
+            self.assertEqual(reference_data.get_options('regions'), ())
+        self.assertEqual(reference_data.get_options('regions'), (reference_data.RegionOption(region.id, 'Toshkent', '27'),))
+
+
+class PriceSeriesViewTests(TestCase):
+    url = '/monitoring/series/'
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.product = self.rasta['tochka_products'][0].product
+        create_history(self.rasta['tochka_products'][0], self.rasta['period_date'], 100)
+        rebuild_series()
+        self.client.force_login(User.objects.create_user('monitor'))
+
+    def test_series_for_product(self):
+        response = self.client.get(self.url, {'product': self.product.id, 'points': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.json()['labels'], response.json()['avg']),
+            ([self.rasta['period_date'].date.strftime('%Y-%m-%d')], [100.0]),
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in (
+            {}, {'product': self.product.id, 'points': 0}, {'product': self.product.id, 'points': -3},
+            {'product': 'abc'}, {'category': '1x'}, {'product': self.product.id, 'region': 'toshkent'},
+            {'product': self.product.id, 'date_from': '2026-13-01'},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class PriceIndexViewTests(TestCase):
+    url = '/monitoring/index/'
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('monitor'))
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in (
+            {'level': 'mahalla'}, {'level': 'district'}, {'level': 'region', 'region': 'abc'},
+            {'product': '1x'}, {'date_to': '2026-02-30'},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+        self.assertEqual(self.client.get(self.url, {'level': 'region', 'region': 1}).status_code, 200)
+
+
+class JobLockTests(TestCase):
+
+    def test_lock_is_exclusive_until_released_or_expired(self):
+        owner = job_lock.acquire('price_series:lock:1', 60)
+        self.assertIsNotNone(owner)
+        self.assertIsNone(job_lock.acquire('price_series:lock:1', 60))
+        self.assertIsNotNone(job_lock.acquire('price_series:lock:2', 60))
+
+        job_lock.release('price_series:lock:1', 'boshqa')
+        self.assertIsNone(job_lock.acquire('price_series:lock:1', 60))
+        job_lock.release('price_series:lock:1', owner)
+        self.assertIsNotNone(job_lock.acquire('price_series:lock:1', 60))
+
+        # Muddati o'tgan qulf (ishchi o'lgan) qayta egallanadi
+        JobLock.objects.filter(name='price_series:lock:2').update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertIsNotNone(job_lock.acquire('price_series:lock:2', 60))
+
+
+class DelayedJobTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.job = DelayedJob(
+            'test_job', 'apps.form.tasks.build_price_series_task',
+            delay_setting='PRICE_SERIES_DELAY',
+            lock_timeout_setting='PRICE_SERIES_LOCK_TIMEOUT',
+            title="Test",
+        )
+
+    def test_schedule_enqueues_once_after_commit(self):
+        with mock.patch('apps.form.tasks.build_price_series_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.job.schedule(7)
+                self.job.schedule(7)
+                self.assertFalse(apply_async.called)
+        self.assertEqual(apply_async.call_count, 1)
+        self.assertEqual(apply_async.call_args.args, ((7,),))
+
+    def test_busy_lock_reschedules_instead_of_running(self):
+        owner = job_lock.acquire('test_job:lock:7', 60)
+        func = mock.Mock(return_value=3)
+        with mock.patch.object(self.job, 'schedule') as schedule:
+            self.assertIsNone(self.job.run(7, func))
+            schedule.assert_called_once_with(7)
+        self.assertFalse(func.called)
+
+        job_lock.release('test_job:lock:7', owner)
+        self.assertEqual(self.job.run(7, func), 3)
+        self.assertFalse(JobLock.objects.filter(name='test_job:lock:7').exists())
@@ -6,6 +6,11 @@ app_name = 'monitoring'
 urlpatterns = [
     # Main dashboard view
     path('', views.MonitoringDashboardView.as_view(), name='dashboard'),
+    path('history/', views.MonitoringHistoryJsonView.as_view(), name='history'),
+    path('cache-stats/', views.MonitoringCacheStatsView.as_view(), name='cache_stats'),
+    path('series/', views.PriceSeriesView.as_view(), name='price_series'),
+    path('index/', views.PriceIndexView.as_view(), name='price_index'),
+    path('options/<str:name>/', views.ReferenceOptionsView.as_view(), name='reference_options'),
     
     # Product detail view
     path('product/<int:pk>/', views.ProductHistoryDetailView.as_view(), name='product_detail'),
@@ -1,10 +1,10 @@
 import csv
 import zipfile
 import io
-from datetime import datetime
+from datetime import date, datetime
 from django.contrib import admin
 from django.urls import path
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.utils.safestring import mark_safe
 
 from apps.form.models import *
@@ -12,8 +12,8 @@ from apps.home.models import *
 from apps.common.models import  *
 from django.shortcuts import render, redirect
 from django.http import HttpResponse
-from django.views.generic import ListView, DetailView, TemplateView
-from django.db.models import Avg, Min, Max, Count, Q, F, Sum, Value, CharField, Case, When, IntegerField, Prefetch
+from django.views.generic import ListView, DetailView, TemplateView, View
+from django.db.models import Avg, Min, Max, Count, Q, F, Sum, Value, CharField, Case, When, IntegerField, Prefetch, ExpressionWrapper, FloatField
 from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, Concat
 from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -32,8 +32,15 @@ from apps.home.models import (
 )
 from apps.form.models import (
     TochkaProductHistory, TochkaProduct, 
-    Product, ProductCategory, Birlik, Application
+    Product, ProductCategory, Birlik, Application, PriceFact
 )
+from apps.common.services.keyset import KeysetPaginator, estimate_count
+from apps.common.services import reference_data
+from apps.common.services.result_cache import cache_metrics, get_or_compute, period_dates_for_filters
+from apps.common.services.statistics import get_statistics
+from apps.form.services.coverage import coverage_rows, district_coverage
+from apps.form.services.price_index import get_index
+from apps.form.services.price_series import get_series
 
 def export_all_csv_zip(request):
     """Namuna formatida CSV fayllarni ZIP da export qilish"""
@@ -110,12 +117,23 @@ def export_all_csv_zip(request):
 
 
 
-class MonitoringDashboardView(LoginRequiredMixin, TemplateView):
-    template_name = 'monitoring/dashboard.html'
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
+class MonitoringHistoryMixin:
+    """
+    Monitoring jadvali uchun filtrlangan history queryset va kursor bo'yicha sahifalash.
+    """
+    per_page = 50
+    keyset_fields = ('period__date', 'id')
+    keyset_parsers = (date.fromisoformat, int)
+
+    def get_history_filters(self, context=None):
+        """
+        GET parametrlaridan TochkaProductHistory uchun ORM filtrlari.
+        context berilsa tanlangan filtr obyektlari unga yoziladi.
+
+        :return: (filters, selected_period)
+        """
+        context = {} if context is None else context
+
         # Get filter parameters
         region_id = self.request.GET.get('region')
         district_id = self.request.GET.get('district')
@@ -128,27 +146,17 @@ class MonitoringDashboardView(LoginRequiredMixin, TemplateView):
         date_to = self.request.GET.get('date_to')
         
         selected_period = None
-        per_page = 50
 
-        # Base queryset with optimized prefetch/select
-        history_qs = TochkaProductHistory.objects.select_related(
-            'product', 'ntochka', 'hudud', 'employee', 'period',
-            'hudud__district', 'hudud__district__region',
-            'product__category', 'product__unit'
-        ).prefetch_related(
-            'tochka_product',
-        ).filter(is_active=True)
-        
         # Apply filters
         filters = {}
         
         if region_id:
             filters['hudud__district__region_id'] = region_id
-            context['selected_region'] = Region.objects.get(id=region_id)
+            context['selected_region'] = reference_data.find('regions', region_id)
         
         if district_id:
             filters['hudud__district_id'] = district_id
-            context['selected_district'] = District.objects.get(id=district_id)
+            context['selected_district'] = reference_data.find('districts', district_id)
         
         if period_id:
             try:
@@ -159,11 +167,11 @@ class MonitoringDashboardView(LoginRequiredMixin, TemplateView):
         
         if category_id:
             filters['product__category_id'] = category_id
-            context['selected_category'] = ProductCategory.objects.get(id=category_id)
+            context['selected_category'] = reference_data.find('categories', category_id)
         
         if product_id:
             filters['product_id'] = product_id
-            context['selected_product'] = Product.objects.get(id=product_id)
+            context['selected_product'] = reference_data.find('products', product_id)
         
         if status:
             filters['status'] = status
@@ -171,7 +179,7 @@ class MonitoringDashboardView(LoginRequiredMixin, TemplateView):
             
         if employee_id:
             filters['employee_id'] = employee_id
-            context['selected_employee'] = Employee.objects.get(id=employee_id)
+            context['selected_employee'] = reference_data.find('employees', employee_id)
         
         # Date range filtering
         if date_from and date_to:
@@ -191,126 +199,268 @@ class MonitoringDashboardView(LoginRequiredMixin, TemplateView):
                 filters['period__period_id'] = latest_period.period_id
                 selected_period = latest_period.period
         
-        # Apply all filters
-        history_qs = history_qs.filter(**filters).order_by('-period__date', '-id')
+        return filters, selected_period
+
+    def get_history_queryset(self, filters):
+        """
+        Jadval uchun queryset (bog'liq obyektlar bilan).
+        """
+        return TochkaProductHistory.objects.select_related(
+            'product', 'ntochka', 'hudud', 'employee', 'period',
+            'hudud__district', 'hudud__district__region',
+            'product__category', 'product__unit'
+        ).prefetch_related(
+            'tochka_product',
+        ).filter(is_active=True, **filters).order_by('-period__date', '-id')
+
+    def get_history_page(self, history_qs):
+        """
+        (period sanasi, id) bo'yicha kursor sahifasi. OFFSET va COUNT yo'q.
+        """
+        paginator = KeysetPaginator(
+            history_qs,
+            fields=self.keyset_fields,
+            key=lambda history: (history.period.date, history.id),
+            parsers=self.keyset_parsers,
+            per_page=self.per_page,
+        )
+        return paginator.get_page(self.request.GET.get('cursor'))
+
+
+class MonitoringDashboardView(LoginRequiredMixin, MonitoringHistoryMixin, TemplateView):
+    template_name = 'monitoring/dashboard.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        region_id = self.request.GET.get('region')
+        category_id = self.request.GET.get('category')
+        product_id = self.request.GET.get('product')
+
+        filters, selected_period = self.get_history_filters(context)
+        history_qs = self.get_history_queryset(filters)
         context['selected_period'] = selected_period
 
-        total_count = history_qs.count()
-        # Add to context
-        paginator = Paginator(history_qs, per_page)
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        page_obj = self.get_history_page(history_qs)
         query_params = self.request.GET.copy()
-        if 'page' in query_params:
-            query_params.pop('page')
+        for param in ('page', 'cursor'):
+            query_params.pop(param, None)
         context['query_string'] = query_params.urlencode()
 
         context['history_records'] = page_obj.object_list
         context['page_obj'] = page_obj
-        context['paginator'] = paginator
-        context['total_count'] = total_count
-        context['per_page'] = per_page
-        
-        # Dropdown data for filters
-        context['regions'] = Region.objects.all().order_by('name')
-        
-        if region_id:
-            context['districts'] = District.objects.filter(region_id=region_id).order_by('name')
-        else:
-            context['districts'] = District.objects.all().order_by('name')
-            
-        context['periods'] = Period.objects.filter(is_active=True).order_by('-id')
-        context['categories'] = ProductCategory.objects.all().order_by('name')
+        context['per_page'] = self.per_page
         
-        if category_id:
-            context['products'] = Product.objects.filter(category_id=category_id).order_by('name')
-        else:
-            context['products'] = Product.objects.all().order_by('name')[:100]
-            
-        context['employees'] = Employee.objects.all().order_by('full_name')
+        # Dropdown data for filters (services.reference_data, jarayon ichida keshlangan)
+        options = reference_data.get_options('regions', 'districts', 'periods', 'categories')
+        context['regions'] = options['regions']
+        context['districts'] = reference_data.filter_districts(options['districts'], region_id)
+        context['periods'] = options['periods']
+        context['categories'] = options['categories']
+
+        # Mahsulot va xodimlar ko'p: faqat tanlangani chiqariladi, qolgani qidiruv endpointidan
+        context['products'] = [option for option in [context.get('selected_product')] if option]
+        context['employees'] = [option for option in [context.get('selected_employee')] if option]
         context['status_choices'] = dict(TochkaProductHistory.PRODUCT_STATUS_CHOICES)
         
-        # Statistics
-        aggregates = history_qs.aggregate(
-            avg_price=Avg('price'),
-            max_price=Max('price'),
-            min_price=Min('price')
-        )
+        # Barcha ko'rsatkichlar bitta ustunli o'qishdan (services.statistics, filtr bo'yicha keshlanadi)
+        stats = get_statistics(filters)
+        context['total_count'] = stats['total_records']
         context['stats'] = {
-            'avg_price': aggregates['avg_price'],
-            'max_price': aggregates['max_price'],
-            'min_price': aggregates['min_price'],
-            'total_records': total_count,
-            'unique_products': history_qs.values('product_id').distinct().count(),
-            'unique_tochkas': history_qs.values('hudud_id').distinct().count()
+            'avg_price': stats['avg_price'],
+            'max_price': stats['max_price'],
+            'min_price': stats['min_price'],
+            'median_price': stats['median_price'],
+            'outlier_count': stats['outlier_count'],
+            'total_records': stats['total_records'],
+            'unique_products': stats['unique_products'],
+            'unique_tochkas': stats['unique_tochkas'],
         }
         
         # Price trend data (for charts)
         if product_id or category_id:
-            # Get trend data for specific product or category
-            trend_data = self._get_price_trend_data(history_qs)
-            context['trend_data'] = json.dumps(trend_data)
+            context['trend_data'] = json.dumps(stats['trend'])
             
             # Product price comparison across regions
             if product_id:
-                region_monitoring = self._get_region_monitoring(
-                    product_id,
-                    selected_period.id if selected_period else None
+                period_id = selected_period.id if selected_period else None
+                region_monitoring = get_or_compute(
+                    'dashboard_regions',
+                    {'product': product_id, 'period': period_id},
+                    period_dates_for_filters({'period__period_id': period_id}),
+                    lambda: self._get_region_monitoring(product_id, period_id)
                 )
                 context['region_monitoring'] = json.dumps(region_monitoring)
         
         # Top 10 most expensive products
-        top_products = history_qs.values(
-            'product__name', 'product__category__name'
-        ).annotate(
-            avg_price=Avg('price')
-        ).order_by('-avg_price')[:10]
-        
-        context['top_products'] = list(top_products)
+        context['top_products'] = stats['top_products']
         
         return context
     
-    def _get_price_trend_data(self, queryset):
-        """Generate price trend data for charts"""
-        trends = queryset.values('period__date').annotate(
-            avg_price=Avg('price'),
-            date_str=Concat(
-                F('period__date__year'), Value('-'), 
-                F('period__date__month'), Value('-'),
-                F('period__date__day'), 
-                output_field=CharField()
-            )
-        ).order_by('period__date')
-        
-        return {
-            'labels': [t['date_str'] for t in trends],
-            'data': [float(t['avg_price']) if t['avg_price'] else 0 for t in trends]
-        }
-    
     def _get_region_monitoring(self, product_id, period_id=None):
-        """Compare product prices across regions"""
-        comparison = TochkaProductHistory.objects.filter(
+        """
+        Compare product prices across regions. Shubhali narxlarsiz o'rtacha olinadi
+        (services.price_outliers), viloyat uchun hali hisoblanmagan bo'lsa oddiy o'rtacha.
+        """
+        comparison = PriceFact.objects.filter(
             product_id=product_id, 
-            is_active=True
+            count__gt=0
         )
 
         if period_id:
             comparison = comparison.filter(period__period_id=period_id)
 
-        comparison = comparison.select_related(
-            'hudud__district__region'
-        ).values(
-            'hudud__district__region__name'
+        comparison = comparison.values(
+            'district__region__name'
         ).annotate(
-            avg_price=Avg('price')
-        ).order_by('hudud__district__region__name')
+            avg_price=ExpressionWrapper(Sum('price_sum') / Sum('count'), output_field=FloatField()),
+            clean_sum=Sum('clean_sum'),
+            clean_count=Sum('clean_count'),
+        ).order_by('district__region__name')
         
         return {
-            'labels': [c['hudud__district__region__name'] for c in comparison],
-            'data': [float(c['avg_price']) if c['avg_price'] else 0 for c in comparison]
+            'labels': [c['district__region__name'] for c in comparison],
+            'data': [
+                c['clean_sum'] / c['clean_count'] if c['clean_count'] else float(c['avg_price'] or 0)
+                for c in comparison
+            ]
         }
 
 
+class MonitoringHistoryJsonView(LoginRequiredMixin, MonitoringHistoryMixin, View):
+    """
+    Monitoring jadvalining JSON ko'rinishi: ?cursor=... bilan sahifalanadi,
+    ?with_total=1 bo'lsa taxminiy jami ham qaytadi.
+    """
+
+    def get(self, request, *args, **kwargs):
+        filters, _ = self.get_history_filters()
+        history_qs = self.get_history_queryset(filters)
+        page = self.get_history_page(history_qs)
+        data = {
+            'results': [
+                {
+                    'id': record.id,
+                    'product': record.product.name,
+                    'category': record.product.category.code,
+                    'obyekt': record.hudud.name,
+                    'rasta': record.ntochka.name,
+                    'price': record.price,
+                    'status': record.status,
+                    'date': record.period.date.isoformat(),
+                    'employee': record.employee.full_name,
+                    'soato': record.hudud.district.soato,
+                }
+                for record in page
+            ],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+        if request.GET.get('with_total'):
+            data['estimated_total'] = estimate_count(history_qs)
+        return JsonResponse(data)
+
+
+class MonitoringCacheStatsView(LoginRequiredMixin, View):
+    """
+    Monitoring natijalari keshining hit/miss ko'rsatkichlari (natija turlari bo'yicha).
+    """
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'results': cache_metrics()})
+
+
+class ReferenceOptionsView(LoginRequiredMixin, View):
+    """
+    Katta filtr ro'yxatlari (mahsulotlar, xodimlar) uchun server tomonida qidiruv:
+    ?q=...&category=... (mahsulotlar) yoki &district=... (xodimlar).
+    """
+    filter_params = {'products': {'category': 'category_id'}, 'employees': {'district': 'district_id'}}
+
+    def get(self, request, name, *args, **kwargs):
+        if name not in reference_data.SEARCHABLE:
+            raise Http404
+        filters = {
+            field: request.GET[param]
+            for param, field in self.filter_params[name].items() if request.GET.get(param)
+        }
+        try:
+            limit = min(int(request.GET.get('limit', reference_data.SEARCH_LIMIT)), 50)
+        except ValueError:
+            limit = reference_data.SEARCH_LIMIT
+        field = reference_data.SEARCHABLE[name]
+        options = reference_data.search(name, request.GET.get('q', ''), limit=limit, **filters)
+        return JsonResponse({
+            'results': [{'id': option.id, 'text': getattr(option, field)} for option in options]
+        })
+
+
+class PriceSeriesView(LoginRequiredMixin, View):
+    """
+    Narx vaqt qatori (grafiklar uchun): ?product=... yoki ?category=..., ixtiyoriy region,
+    date_from/date_to (YYYY-MM-DD) va points (uzun oraliqni shuncha nuqtaga qisqartirish).
+    """
+    max_points = 500
+
+    def get(self, request, *args, **kwargs):
+        if not request.GET.get('product') and not request.GET.get('category'):
+            return JsonResponse({'detail': "product yoki category parametri majburiy."}, status=400)
+        try:
+            product_id, category_id, region_id = (
+                int(request.GET[name]) if request.GET.get(name) else None for name in ('product', 'category', 'region')
+            )
+            date_from = datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() if request.GET.get('date_from') else None
+            date_to = datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date() if request.GET.get('date_to') else None
+            points = min(int(request.GET['points']), self.max_points) if request.GET.get('points') else None
+        except ValueError:
+            return JsonResponse({'detail': "Parametrlar noto'g'ri."}, status=400)
+        if points is not None and points < 1:
+            return JsonResponse({'detail': "points musbat bo'lishi kerak."}, status=400)
+
+        series = get_series(
+            product_id=product_id,
+            category_id=category_id,
+            region_id=region_id,
+            date_from=date_from,
+            date_to=date_to,
+            points=points,
+        )
+        return JsonResponse(series)
+
+
+class PriceIndexView(LoginRequiredMixin, View):
+    """
+    Narx indeksi qatori (baza = 100): ?level=district|region|country (district/region id bilan),
+    ixtiyoriy product (berilmasa barcha indeks mahsulotlari), period_type, date_from/date_to.
+    """
+    levels = {'district': 'district', 'region': 'region', 'country': None}
+
+    def get(self, request, *args, **kwargs):
+        level = request.GET.get('level', 'country')
+        if level not in self.levels:
+            return JsonResponse({'detail': "level noto'g'ri."}, status=400)
+        if self.levels[level] and not request.GET.get(self.levels[level]):
+            return JsonResponse({'detail': f"{self.levels[level]} parametri majburiy."}, status=400)
+        try:
+            region_id, district_id, product_id = (
+                int(request.GET[name]) if request.GET.get(name) else None for name in ('region', 'district', 'product')
+            )
+            date_from = datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() if request.GET.get('date_from') else None
+            date_to = datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date() if request.GET.get('date_to') else None
+        except ValueError:
+            return JsonResponse({'detail': "Parametrlar noto'g'ri."}, status=400)
+
+        index = get_index(
+            level=level,
+            region_id=region_id,
+            district_id=district_id,
+            product_id=product_id,
+            period_type=request.GET.get('period_type', 'weekly'),
+            date_from=date_from,
+            date_to=date_to,
+        )
+        return JsonResponse(index)
+
+
 class ProductHistoryDetailView(LoginRequiredMixin, DetailView):
     model = Product
     template_name = 'monitoring/product_detail.html'
@@ -334,35 +484,58 @@ class ProductHistoryDetailView(LoginRequiredMixin, DetailView):
         region_id = self.request.GET.get('region')
         if region_id:
             history = history.filter(hudud__district__region_id=region_id)
-            context['selected_region'] = Region.objects.get(id=region_id)
+            context['selected_region'] = reference_data.find('regions', region_id)
             
         # Filter by district if specified
         district_id = self.request.GET.get('district')
         if district_id:
             history = history.filter(hudud__district_id=district_id)
-            context['selected_district'] = District.objects.get(id=district_id)
+            context['selected_district'] = reference_data.find('districts', district_id)
             
-        # Price trends over time
-        price_trends = history.values('period__date').annotate(
-            avg_price=Avg('price'),
-            min_price=Min('price'),
-            max_price=Max('price')
+        # Dinamika va jadval (product, hudud) bo'yicha keshlanadi, barcha davr sanalariga bog'liq
+        result = get_or_compute(
+            'product_detail',
+            {'product': product.id, 'region': region_id, 'district': district_id},
+            period_dates_for_filters({}),
+            lambda: self._get_detail_data(product, history, region_id, district_id)
+        )
+        context['history'] = result['history']
+        context['trend_data'] = result['trend_data']
+        options = reference_data.get_options('regions', 'districts')
+        context['regions'] = options['regions']
+        context['districts'] = reference_data.filter_districts(options['districts'], region_id)
+        
+        return context
+
+    def _get_detail_data(self, product, history, region_id, district_id):
+        if district_id:
+            trend_data = self._get_district_trend(product, district_id)
+        else:
+            # Viloyat yoki respublika darajasi: oldindan hisoblangan vaqt qatoridan
+            trend_data = get_series(product_id=product.id, region_id=region_id)
+
+        return {
+            'history': list(history[:500]),  # Limit for performance
+            'trend_data': json.dumps(trend_data),
+        }
+
+    def _get_district_trend(self, product, district_id):
+        # Tuman darajasi: PriceFact dan (davr sanasi x tuman yig'indilari)
+        price_trends = PriceFact.objects.filter(
+            product=product, district_id=district_id, count__gt=0
+        ).values('period__date').annotate(
+            avg_price=ExpressionWrapper(Sum('price_sum') / Sum('count'), output_field=FloatField()),
+            min_price=Min('price_min'),
+            max_price=Max('price_max')
         ).order_by('period__date')
         
         # Convert to chart-friendly format
-        trend_data = {
+        return {
             'labels': [t['period__date'].strftime('%Y-%m-%d') for t in price_trends],
             'avg': [float(t['avg_price']) if t['avg_price'] else 0 for t in price_trends],
             'min': [float(t['min_price']) if t['min_price'] else 0 for t in price_trends],
             'max': [float(t['max_price']) if t['max_price'] else 0 for t in price_trends]
         }
-        
-        context['history'] = history[:500]  # Limit for performance
-        context['trend_data'] = json.dumps(trend_data)
-        context['regions'] = Region.objects.all()
-        context['districts'] = District.objects.all() if not region_id else District.objects.filter(region_id=region_id)
-        
-        return context
 
 
 class RegionMonitoringView(LoginRequiredMixin, TemplateView):
@@ -454,8 +627,9 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
         status_filter = self.request.GET.get('status')
 
         # Context for filters
-        context['periods'] = Period.objects.filter(is_active=True).order_by('-id')
-        context['regions'] = Region.objects.all().order_by('name')
+        options = reference_data.get_options('periods', 'regions', 'districts')
+        context['periods'] = options['periods']
+        context['regions'] = options['regions']
         
         # Determine target dates
         target_dates = []
@@ -494,7 +668,7 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
 
         # 2. Region & District Filters
         if region_id:
-            context['districts'] = District.objects.filter(region_id=region_id).order_by('name')
+            context['districts'] = reference_data.filter_districts(options['districts'], region_id)
             context['selected_region'] = region_id
         
         if district_id:
@@ -502,15 +676,37 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
         
         context['selected_status'] = status_filter
 
-        # 3. Data Aggregation
-        data = []
-        mode = 'region' # region, district, tochka
-
+        # 3. Data Aggregation (filtrlar va tanlangan sanalar versiyalari bo'yicha keshlanadi)
         if not target_dates:
              context['data'] = []
-             context['mode'] = mode
+             context['mode'] = 'region'
              return context
 
+        if tochka_id:
+            context['selected_tochka'] = Tochka.objects.get(id=tochka_id)
+
+        result = get_or_compute(
+            'region_monitoring',
+            {
+                'dates': [period_date.id for period_date in target_dates],
+                'region': region_id,
+                'district': district_id,
+                'tochka': tochka_id,
+                'status': status_filter,
+            },
+            target_dates,
+            lambda: self.get_monitoring_data(target_dates, region_id, district_id, tochka_id, status_filter)
+        )
+        context.update(result)
+        return context
+
+    def get_monitoring_data(self, target_dates, region_id, district_id, tochka_id, status_filter):
+        """
+        Tanlangan daraja (viloyat/tuman/obyekt/mahsulot) bo'yicha qamrov qatorlari va jami.
+        """
+        data = []
+        mode = 'region' # region, district, tochka
+
         def get_status_class(percent):
             if percent >= 100: return 'bg-success', 'To\'liq'
             elif percent >= 70: return 'bg-warning', 'Yaxshi'
@@ -518,7 +714,6 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
 
         if tochka_id:
             mode = 'product'
-            context['selected_tochka'] = Tochka.objects.get(id=tochka_id)
             
             queryset = TochkaProduct.objects.filter(hudud_id=tochka_id, is_active=True).select_related('product', 'product__unit')
             
@@ -559,16 +754,19 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
             mode = 'tochka'
             # Show Tochkas in the district
             queryset = Tochka.objects.filter(district_id=district_id, is_active=True).select_related('employee')
-            
-            # Annotate with entered status
-            queryset = queryset.annotate(
-                total_products=Count('products', filter=Q(products__is_active=True)),
-                entered_products=Count('products', filter=Q(products__is_active=True, products__history__period__in=target_dates), distinct=True)
+            coverage = coverage_rows(target_dates, tochka__district_id=district_id)
+
+            # Narx kiritilmagan obyektlar uchun qamrov qatori yo'q: faol mahsulotlar soni alohida
+            uncovered = dict(
+                TochkaProduct.objects.filter(
+                    hudud__district_id=district_id, is_active=True
+                ).exclude(hudud_id__in=list(coverage)).order_by().values('hudud_id').annotate(
+                    total=Count('id')
+                ).values_list('hudud_id', 'total')
             )
-            
+
             for obj in queryset:
-                total = obj.total_products
-                entered = obj.entered_products
+                total, entered = coverage.get(obj.id, (uncovered.get(obj.id, 0), 0))
                 percent = (entered / total * 100) if total > 0 else 0
                 status_cls, status_text = get_status_class(percent)
                 
@@ -587,19 +785,17 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
         elif region_id:
             mode = 'district'
             # Show Districts in the region
-            queryset = District.objects.filter(region_id=region_id, employees__isnull=False).distinct().prefetch_related(
+            queryset = District.objects.filter(region_id=region_id, employees__isnull=False).distinct().select_related(
+                'region'
+            ).prefetch_related(
                 Prefetch('employees', queryset=Employee.objects.all())
             )
             
-            # Annotate total active tochkas
-            queryset = queryset.annotate(
-                total_tochkas=Count('tochkas', filter=Q(tochkas__is_active=True)),
-                entered_tochkas=Count('tochkas', filter=Q(tochkas__is_active=True, tochkas__product_history__period__in=target_dates), distinct=True)
-            )
+            # Faol va kiritilgan obyektlar qamrov jadvalidan
+            coverage = district_coverage(target_dates, district__region_id=region_id)
 
             for obj in queryset:
-                total = obj.total_tochkas
-                entered = obj.entered_tochkas
+                total, entered = coverage.get(obj.id, (0, 0))
                 percent = (entered / total * 100) if total > 0 else 0
                 status_cls, status_text = get_status_class(percent)
                 
@@ -621,10 +817,10 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
             # Instead of complex annotation on Region, we aggregate from Districts
             
             # 1. Get all districts that have employees
-            districts_qs = District.objects.filter(employees__isnull=False).distinct().annotate(
-                total_tochkas=Count('tochkas', filter=Q(tochkas__is_active=True)),
-                entered_tochkas=Count('tochkas', filter=Q(tochkas__is_active=True, tochkas__product_history__period__in=target_dates), distinct=True)
-            ).select_related('region').prefetch_related('employees')
+            districts_qs = District.objects.filter(employees__isnull=False).distinct().select_related(
+                'region'
+            ).prefetch_related('employees')
+            coverage = district_coverage(target_dates)
 
             # 2. Initialize Region Data
             region_map = {}
@@ -642,8 +838,9 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
             for d in districts_qs:
                 if d.region_id in region_map:
                     r_data = region_map[d.region_id]
-                    r_data['total'] += d.total_tochkas
-                    r_data['entered'] += d.entered_tochkas
+                    total, entered = coverage.get(d.id, (0, 0))
+                    r_data['total'] += total
+                    r_data['entered'] += entered
                     for emp in d.employees.all():
                         r_data['employees'].add(emp)
             
@@ -671,24 +868,23 @@ class RegionMonitoringView(LoginRequiredMixin, TemplateView):
         if status_filter:
             data = [d for d in data if status_filter in d['status_class']]
 
-        context['data'] = data
-        context['mode'] = mode
-        
         # Calculate Totals
         total_obj = sum(d['total'] for d in data)
         total_ent = sum(d['entered'] for d in data)
         total_percent = (total_ent / total_obj * 100) if total_obj else 0
         status_cls, status_text = get_status_class(total_percent)
         
-        context['total_data'] = {
-            'total': total_obj,
-            'entered': total_ent,
-            'percent': round(total_percent, 1),
-            'status_class': status_cls,
-            'status_text': status_text
+        return {
+            'data': data,
+            'mode': mode,
+            'total_data': {
+                'total': total_obj,
+                'entered': total_ent,
+                'percent': round(total_percent, 1),
+                'status_class': status_cls,
+                'status_text': status_text
+            },
         }
-        
-        return context
 
 
 @login_required
@@ -806,25 +1002,30 @@ def export_to_excel(request):
             worksheet.write(0, col_num, value, header_format)
             worksheet.set_column(col_num, col_num, 15)  # Set column width
             
-        # Add summary sheet
+        # Add summary sheet (dashboard bilan bir xil statistika engine)
+        stats = get_statistics(filters)
         summary_data = {
             'Metrics': [
                 'Jami mahsulotlar soni',
                 'O\'rtacha narx',
                 'Eng yuqori narx',
                 'Eng past narx',
+                'Mediana narx',
+                'Shubhali narxlar soni',
                 'Viloyatlar soni',
                 'Tumanlar soni',
                 'Obyektlar soni'
             ],
             'Values': [
-                queryset.count(),
-                queryset.aggregate(Avg('price'))['price__avg'],
-                queryset.aggregate(Max('price'))['price__max'],
-                queryset.aggregate(Min('price'))['price__min'],
-                queryset.values('hudud__district__region_id').distinct().count(),
-                queryset.values('hudud__district_id').distinct().count(),
-                queryset.values('hudud_id').distinct().count()
+                stats['total_records'],
+                stats['avg_price'],
+                stats['max_price'],
+                stats['min_price'],
+                stats['median_price'],
+                stats['outlier_count'],
+                stats['unique_regions'],
+                stats['unique_districts'],
+                stats['unique_tochkas']
             ]
         }
         
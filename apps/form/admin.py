@@ -1,4 +1,5 @@
 from django.contrib import admin, messages
+from django.db import transaction
 from django.forms import ValidationError
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import path, reverse
@@ -7,6 +8,9 @@ from django.utils.html import format_html
 from apps.home.models import Employee, PeriodDate, Tochka, NTochka, Period
 from .models import Birlik, ProductCategory, Product, TochkaProduct, TochkaProductHistory, Application
 from apps.common.admin import BaseAdmin
+from .services.moderation import moderate_applications, RESULT_APPROVED, RESULT_REJECTED
+from .services import price_index
+from .signals import histories_changed
 
 
 @admin.register(Birlik)
@@ -109,11 +113,13 @@ class TochkaProductAdmin(BaseAdmin):
 
 @admin.register(TochkaProductHistory)
 class TochkaProductHistoryAdmin(BaseAdmin):
-    list_display = ('id', 'product_name', 'price', 'employee_name', 'period', 'status_display', 'created_at')
+    list_display = ('id', 'product_name', 'price', 'employee_name', 'period', 'status_display', 'outlier_reason', 'created_at')
     list_filter = (
         'status',
         'is_active',
         'is_checked',
+        'is_outlier',
+        'outlier_reason',
         'product',
         'ntochka',
         'hudud',
@@ -122,7 +128,8 @@ class TochkaProductHistoryAdmin(BaseAdmin):
     )
     search_fields = ('employee__full_name', 'id', 'employee__login')
     ordering = ('-id',)
-    readonly_fields = ('created_at', 'updated_at')
+    # Shubha belgilari services.price_outliers tomonidan hisoblanadi
+    readonly_fields = ('created_at', 'updated_at', 'is_outlier', 'outlier_reason')
     date_hierarchy = 'created_at'
     list_per_page = 30
     raw_id_fields = ('tochka_product', 'ntochka', 'hudud', 'product', 'employee', 'period', 'alternative_for','employee')
@@ -146,7 +153,7 @@ class TochkaProductHistoryAdmin(BaseAdmin):
             'period',
             'product',
         ).only(
-            'id', 'price', 'status', 'is_active', 'is_checked', 'created_at',
+            'id', 'price', 'status', 'is_active', 'is_checked', 'is_outlier', 'outlier_reason', 'created_at',
             'employee__id', 'employee__login',
             'period__id', 'period__date',
             'tochka_product__id',
@@ -211,6 +218,8 @@ class TochkaProductHistoryAdmin(BaseAdmin):
             'fields': (
                 'status',
                 'is_checked',
+                'is_outlier',
+                'outlier_reason',
                 'is_active',
                 'is_alternative',
                 'is_from_application',
@@ -256,18 +265,32 @@ class TochkaProductHistoryAdmin(BaseAdmin):
     # Bulk actions
     actions = ['make_active', 'make_inactive', 'mark_as_checked']
     
+    def _set_active(self, queryset, is_active):
+        # queryset.update post_save chaqirmaydi: faktlar va marshrutlar uchun signal yuboriladi
+        histories = list(queryset.only('id', 'period_id', 'hudud_id', 'ntochka_id', 'product_id'))
+        with transaction.atomic():
+            updated = TochkaProductHistory.objects.filter(
+                id__in=[history.id for history in histories]
+            ).update(is_active=is_active)
+            histories_changed.send(sender=TochkaProductHistory, histories=histories)
+        return updated
+
     def make_active(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = self._set_active(queryset, True)
         self.message_user(request, f'{updated} ta yozuv faollashtirildi.')
     make_active.short_description = "Tanlangan yozuvlarni faollashtirish"
     
     def make_inactive(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = self._set_active(queryset, False)
         self.message_user(request, f'{updated} ta yozuv nofaollashtirildi.')
     make_inactive.short_description = "Tanlangan yozuvlarni nofaollashtirish"
     
     def mark_as_checked(self, request, queryset):
+        period_ids = set(queryset.filter(is_outlier=True).values_list('period_id', flat=True))
         updated = queryset.update(is_checked=True)
+        # Tekshirilgan shubhali narxlar indeksga qaytadi
+        for period_id in period_ids:
+            price_index.schedule_refresh(period_id)
         self.message_user(request, f'{updated} ta yozuv tekshirildi deb belgilandi.')
     mark_as_checked.short_description = "Tanlangan yozuvlarni tekshirildi deb belgilash"
 
@@ -277,6 +300,7 @@ class ApplicationAdmin(admin.ModelAdmin):
     list_display = ('id', 'application_type', 'employee', 'get_all_tochkas', 'toggle_links', 'is_checked', 'created_at')
     list_editable = ('is_checked',)
     list_filter = ('application_type','employee')
+    actions = ['approve_selected', 'reject_selected']
 
     # --- Holatlarni ko'rsatish ---
     def get_all_tochkas(self, obj):
@@ -336,4 +360,28 @@ class ApplicationAdmin(admin.ModelAdmin):
             f"{attr.capitalize()} holati o'zgartirildi: {'Faol' if target.is_active else 'Nofaol'}"
         )
 
-        return redirect(reverse('admin:form_application_changelist'))
\ No newline at end of file
+        return redirect(reverse('admin:form_application_changelist'))
+
+    # --- Ommaviy tasdiqlash / rad etish ---
+    def _moderate(self, request, queryset, approve):
+        results = moderate_applications(
+            list(queryset.values_list('id', flat=True)),
+            approve=approve,
+            user=request.user
+        )
+        done = sum(1 for result in results if result['status'] in (RESULT_APPROVED, RESULT_REJECTED))
+        skipped = len(results) - done
+        self.message_user(
+            request,
+            f"{done} ta ariza {'tasdiqlandi' if approve else 'rad etildi'}"
+            + (f", {skipped} tasi avval tekshirilgan" if skipped else ""),
+            messages.SUCCESS if done else messages.WARNING
+        )
+
+    def approve_selected(self, request, queryset):
+        self._moderate(request, queryset, approve=True)
+    approve_selected.short_description = "Tanlangan arizalarni tasdiqlash"
+
+    def reject_selected(self, request, queryset):
+        self._moderate(request, queryset, approve=False)
+    reject_selected.short_description = "Tanlangan arizalarni rad etish"
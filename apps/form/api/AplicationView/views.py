@@ -12,10 +12,14 @@ from django.utils import timezone
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
-from apps.home.api.utils import get_employee_by_uuid
+from apps.home.api.utils import get_request_employee
 from ...models import Application, Product, TochkaProduct, TochkaProductHistory
 from apps.home.models import NTochka, PeriodDate, Employee, Tochka
-from apps.form.api.utils import INN_in_DSQ, get_period_by_today, get_period_by_type_today
+from apps.form.api.utils import (
+    INN_in_DSQ, get_period_by_today, get_period_by_type_today, generate_tochka_code, generate_ntochka_code
+)
+from apps.form.services.dsq_registry import dsq_registry
+from apps.form.signals import activation_changed
 
 from .serializers import (
     ApplicationListSerializer,
@@ -55,15 +59,14 @@ class ApplicationListView(ListAPIView):
         )
 
     def get_queryset(self):
-        user_uuid = self.request.META.get('HTTP_X_USER_UUID')
-        employee = get_employee_by_uuid(user_uuid)
+        employee = get_request_employee(self.request)
 
         if not employee:
             return Application.objects.none()
 
         # Optimizatsiya: select_related va prefetch_related ishlatish
         queryset = Application.objects.filter(
-            employee=employee
+            employee_id=employee.id
         ).select_related(
             'employee',
             'checked_by',
@@ -111,8 +114,7 @@ class ApplicationCreateView(CreateAPIView):
         ]
     )
     def post(self, request, *args, **kwargs):
-        user_uuid = request.META.get('HTTP_X_USER_UUID')
-        employee = get_employee_by_uuid(user_uuid)
+        employee = get_request_employee(request)
         application_type = request.data.get('application_type')
         period = get_period_by_type_today('weekly')
 
@@ -153,9 +155,8 @@ class ApplicationCreateView(CreateAPIView):
                         name=rasta_name,
                         hudud=tochka,
                         in_proccess=True,
+                        code=generate_ntochka_code(tochka),
                     )
-                    ntochka.code=f"{tochka.code}-{ntochka.id}"
-                    ntochka.save()
                     products = request.data.get('products', [])
                     if products:
                         tochka_products = [
@@ -170,6 +171,7 @@ class ApplicationCreateView(CreateAPIView):
                             for product in products if product.get('product_id')
                         ]
                         TochkaProduct.objects.bulk_create(tochka_products)
+                        activation_changed.send(sender=TochkaProduct, tochka_ids={tochka.id}, ntochka_ids={ntochka.id})
                     mutable_data['ntochka'] = ntochka.id
                 except Tochka.DoesNotExist:
                     return Response(
@@ -185,11 +187,12 @@ class ApplicationCreateView(CreateAPIView):
                         {"detail": "Yopish uchun kamida bitta obyekt tanlang."},
                         status=status.HTTP_400_BAD_REQUEST
                     )
-                tochkas = Tochka.objects.filter(id__in=tochka_ids)
-                for t in tochkas:
-                    inn_is_inDSQ = INN_in_DSQ(int(t.inn))
+                tochkas = list(Tochka.objects.filter(id__in=tochka_ids).only('id', 'inn', 'is_inDSQ'))
+                now = timezone.now()
+                for t, inn_is_inDSQ in zip(tochkas, dsq_registry.contains_many([t.inn for t in tochkas])):
                     t.is_inDSQ = inn_is_inDSQ
-                    t.save()
+                    t.updated_at = now
+                Tochka.objects.bulk_update(tochkas, ['is_inDSQ', 'updated_at'])
                 mutable_data['tochkas'] = tochka_ids
 
             elif application_type == 'for_open_obyekt':
@@ -219,12 +222,11 @@ class ApplicationCreateView(CreateAPIView):
                         inn=obyekt_data.get('inn', ''),
                         plan=obyekt_data.get('plan', 0),
                         pinfl= obyekt_data.get('pinfl', ''),
-                        employee=employee,
+                        employee_id=employee.id,
                         is_inDSQ=inn_is_inDSQ,
-                        in_proccess=True
+                        in_proccess=True,
+                        code=generate_tochka_code(district),
                     )
-                    tochka.code=f"{district.region.code}{district.code}{tochka.id}"
-                    tochka.save()
                     mutable_data['tochka'] = tochka.id
                 except Exception as e:
                     logger.error(f"Tochka creation error: {str(e)}")
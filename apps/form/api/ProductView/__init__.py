@@ -1 +1,2 @@
-from .views import TochkaProductHistoryCreateView, TochkaProductListView, AlternativeProductListView, ProductListView
\ No newline at end of file
+from .views import TochkaProductHistoryCreateView, TochkaProductHistoryBatchCreateView, TochkaProductListView, AlternativeProductListView, ProductListView, \
+    PriceIngestionStatusView
\ No newline at end of file
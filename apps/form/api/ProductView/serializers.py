@@ -1,3 +1,4 @@
+import math
 from random import choices
 
 from django.conf import settings
@@ -109,3 +110,22 @@ class TochkaProductHistorySerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('period_type', None)
         return super().create(validated_data)
+
+
+class TochkaProductHistoryBatchItemSerializer(serializers.Serializer):
+    tochka_product = serializers.IntegerField()
+    price = serializers.FloatField(min_value=0)
+    status = serializers.ChoiceField(choices=TochkaProductHistory.PRODUCT_STATUS_CHOICES, default='mavjud')
+
+    def validate_price(self, value):
+        if not math.isfinite(value):
+            raise serializers.ValidationError("Narx noto'g'ri.")
+        return value
+
+
+class TochkaProductHistoryBatchSerializer(serializers.Serializer):
+    """
+    Bitta rasta uchun barcha narxlarni bitta so'rovda qabul qilish.
+    """
+    period_type = serializers.CharField(max_length=10)
+    items = TochkaProductHistoryBatchItemSerializer(many=True, allow_empty=False)
@@ -1,18 +1,25 @@
 from rest_framework.generics import ListAPIView, CreateAPIView
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import connection
+from django.utils.http import parse_etags
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from django.db.models import Prefetch, Q
 
-from ..utils import get_product_by_uuid, get_period_by_type_today, get_tochka_product_by_id
+from ..utils import get_product_by_uuid, get_period_by_type_today, get_tochka_product_by_id, parse_price
+from ..idempotency import idempotent_response
 from ...models import Application, TochkaProduct, Product, TochkaProductHistory
 
 from .serializers import TochkaProductSerializer, TochkaProductHistorySerializer, ProductSerializer, \
-    ProductListSerializer
+    ProductListSerializer, TochkaProductHistoryBatchSerializer
+from ...services.price_submission import save_rasta_prices, upsert_price, save_alternative_price, history_data
+from ...services.rasta_sync import RastaSync
+from ...services.catalog import get_catalog
+from ...services import ingestion
 
-from apps.home.api.utils import get_employee_by_uuid, get_ntochka_by_uuid
+from apps.home.api.utils import get_request_employee, get_ntochka_by_uuid
 
 
 class TochkaProductListView(ListAPIView):
@@ -52,61 +59,69 @@ class TochkaProductListView(ListAPIView):
                 type=openapi.TYPE_STRING,
                 required=True
             ),
+            openapi.Parameter(
+                'since',
+                openapi.IN_QUERY,
+                description="Oldingi javobdagi X-Sync-Token (o'zgarganlar qaytadi, qatorlar id bo'yicha almashtiriladi)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
         ]
     )
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    def get_queryset(self):
+        sync = self.get_rasta_sync()
+        if sync is None:
+            return Response([], status=status.HTTP_200_OK)
+
+        etag = sync.etag()
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif 'since' in request.query_params:
+            since = sync.parse_token(request.query_params.get('since'))
+            if since is None:
+                # Token eskirgan yoki boshqa davrga tegishli - to'liq ro'yxat
+                response = Response({
+                    'full': True,
+                    'changed': self.get_serializer(sync.get_queryset(), many=True).data,
+                    'removed': [],
+                }, status=status.HTTP_200_OK)
+            else:
+                response = Response({
+                    'full': False,
+                    'changed': self.get_serializer(sync.changed(since), many=True).data,
+                    'removed': sync.removed(since),
+                }, status=status.HTTP_200_OK)
+        else:
+            serializer = self.get_serializer(sync.get_queryset(), many=True)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+
+        response['ETag'] = etag
+        response['X-Sync-Token'] = sync.token()
+        return response
+
+    def get_rasta_sync(self):
         req = self.request
         uuid = req.META.get('HTTP_X_USER_UUID')
         rasta_uuid = req.META.get('HTTP_X_RASTA_UUID')
         print(f"UUID: {uuid}, Rasta UUID: {rasta_uuid}")
-        in_process = req.query_params.get('in_proccess', 'false').lower() == 'true'
         period_type = req.GET.get('period_type', 'weekly')
-        is_weekly = period_type == 'weekly'
         _product_type = req.GET.get('obyekt_type', None)
         product_type = {'food': '1', 'nofood': '2', 'services': '3'}.get(_product_type, '1')
 
-        employee = get_employee_by_uuid(uuid)
+        employee = get_request_employee(req)
         ntochka = get_ntochka_by_uuid(rasta_uuid)
-        qs = None
-        query = Q(
-            ntochka=ntochka,
-            is_active=True,
-            is_weekly=is_weekly,
-        )
-        if not is_weekly:
-            query &= Q(product__category__product_type=product_type)
-        print(f"Employee: {employee}, NTochka: {ntochka}, In process: {in_process}, Period type: {period_type}, Obyekt type: {product_type}",f"Query: {query}")
-        if employee and ntochka:
-            current_period = get_period_by_type_today(period_type=period_type)
-            print(f"Current Period: {current_period}", period_type)
-            history_prefetch = Prefetch(
-                'history', 
-                queryset=TochkaProductHistory.objects.filter(
-                    period__period=current_period.period,
-                    is_active=True
-                ).select_related('tochka_product', 'period', 'employee'),
-                to_attr='current_history'
-            )
+        if not (employee and ntochka):
+            return None
+        current_period = get_period_by_type_today(period_type=period_type)
+        if not current_period:
+            return None
+        return RastaSync(ntochka, current_period, period_type, product_type)
 
-            qs = TochkaProduct.objects.filter(
-                query
-            ).select_related(
-                'product',
-                'ntochka',
-                'hudud',
-                'product__category',
-                'product__unit'
-            ).prefetch_related(
-                history_prefetch
-            )
-        
-        print(f"Query count: {len(connection.queries)}")
-        return qs
+    def get_queryset(self):
+        sync = self.get_rasta_sync()
+        if sync is None:
+            return TochkaProduct.objects.none()
+        return sync.get_queryset()
 
 
 class TochkaProductHistoryCreateView(CreateAPIView):
@@ -130,109 +145,219 @@ class TochkaProductHistoryCreateView(CreateAPIView):
                 description="Tochka Product ID (header orqali)",
                 type=openapi.TYPE_STRING,
                 required=True
+            ),
+            openapi.Parameter(
+                'Idempotency-Key',
+                openapi.IN_HEADER,
+                description="Qayta yuborishda bir xil qoladigan so'rov kaliti (ixtiyoriy)",
+                type=openapi.TYPE_STRING,
+                required=False
             )
         ]
     )
     def post(self, request, *args, **kwargs):
-        uuid = request.META.get('HTTP_X_USER_UUID')
+        employee = get_request_employee(request)
+        if not employee:
+            return Response({"detail": "Xodim topilmadi."}, status=status.HTTP_400_BAD_REQUEST)
+        return idempotent_response(request, employee.id, lambda: self.submit(request, employee))
+
+    def submit(self, request, employee):
         tochka_product_id = request.META.get('HTTP_X_TOCHKA_PRODUCT_ID')
-        print(f"UUID: {uuid}, Tochka Product ID: {tochka_product_id}")
-        employee = get_employee_by_uuid(uuid)
         tochka_product = get_tochka_product_by_id(tochka_product_id)
         period_type = request.data.get('period_type')
-        print(f"Employee: {employee}, Tochka Product: {tochka_product}, Period Type: {period_type}")
         period = get_period_by_type_today(period_type)
-        
-        data = request.data.copy()
-        data['employee'] = employee.id
-        data['ntochka'] = tochka_product.ntochka.id
-        data['hudud'] = tochka_product.hudud.id
-        data['product'] = tochka_product.product.id
-        data['tochka_product'] = tochka_product.id
-        data['period'] = period.id
-        print(f"Data: {data}")
-        # Get product status
-        product_status = data.get('status')
-        # Handle alternative product if status is 'sotilmayapti'
-        if product_status == 'sotilmayapti':
-            alternative_data = data.get('alternative_product')
-            print(alternative_data)
-            alternative_product_uuid = alternative_data.get('uuid')
-            alternative_product_price = alternative_data.get('price')
-            alternative_product_quantity = alternative_data.get('quantity')
-
-            if not alternative_product_uuid or not alternative_product_price or not alternative_product_quantity:
-                print(alternative_product_uuid, alternative_product_price, alternative_product_quantity,1111)
-                return Response(
-                    {"detail": "Alternativ mahsulot ma'lumotlari to'liq emas."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Get alternative product
-            alternative_product = get_product_by_uuid(alternative_product_uuid)
-            if not alternative_product:
-                print(alternative_product,222222)
-                return Response(
-                    {"detail": "Alternativ mahsulot topilmadi."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Update or create TochkaProduct for alternative product
-            alt_ntochka_product, created = TochkaProduct.objects.get_or_create(
-                ntochka=tochka_product.ntochka,
-                product=alternative_product,
-                defaults={
-                    'hudud': tochka_product.hudud,
-                }
+        if not tochka_product or not period:
+            return Response(
+                {"detail": "Rasta mahsuloti yoki period topilmadi."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        product_status = request.data.get('status') or 'mavjud'
+        if product_status != 'sotilmayapti':
+            return self.upsert(request, employee, tochka_product, period, product_status)
+
+        return self.save_alternative(request, employee, tochka_product, period)
+
+    def save_alternative(self, request, employee, tochka_product, period):
+        """
+        'sotilmayapti': alternativ mahsulot narxi va asosiy mahsulot uchun 0 narx bitta tranzaksiyada.
+        """
+        alternative_data = request.data.get('alternative_product') or {}
+        alternative_product_uuid = alternative_data.get('uuid')
+        alternative_product_price = parse_price(alternative_data.get('price'))
+        alternative_product_quantity = parse_price(alternative_data.get('quantity'))
+
+        if not alternative_product_uuid or not alternative_product_price or not alternative_product_quantity:
+            return Response(
+                {"detail": "Alternativ mahsulot ma'lumotlari to'liq emas."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Alternativ mahsulot katalog indeksidan (bazaga murojaatsiz)
+        catalog = get_catalog()
+        alternative_product = catalog.get_product(alternative_product_uuid)
+        if not alternative_product or alternative_product[0] == tochka_product.product_id:
+            return Response(
+                {"detail": "Alternativ mahsulot topilmadi."},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            alt_ntochka_product.previous_price = alt_ntochka_product.last_price
-            alt_ntochka_product.last_price = float(alternative_product_price)
-            alt_ntochka_product.is_weekly = True
-            alt_ntochka_product.save()
-            alternative_data = {
-                'employee': employee.id,
-                'ntochka': tochka_product.ntochka.id,
-                'hudud': tochka_product.hudud.id,
-                'product': alternative_product.id,
-                'tochka_product': alt_ntochka_product.id,
+        alternative_product_id, _ = alternative_product
+        history = save_alternative_price(
+            employee,
+            tochka_product,
+            period,
+            alternative_product_id,
+            catalog.unit_miqdor[alternative_product_id],
+            alternative_product_price,
+            alternative_product_quantity,
+        )
+        if history is None:
+            return Response(
+                {"detail": "Rasta mahsuloti topilmadi."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(history_data(history), status=status.HTTP_201_CREATED)
+
+    def upsert(self, request, employee, tochka_product, period, product_status):
+        """
+        Oddiy narx: serializersiz, (tochka_product, period) bo'yicha upsert.
+        Qayta yuborilgan yoki tuzatilgan narx 400 emas, saqlangan yozuvni qaytaradi.
+        """
+        price = parse_price(request.data.get('price'))
+        if price is None:
+            return Response({"price": ["Narx noto'g'ri."]}, status=status.HTTP_400_BAD_REQUEST)
+        if price < 0:
+            return Response({"price": ["Narx manfiy bo'lishi mumkin emas."]}, status=status.HTTP_400_BAD_REQUEST)
+        if product_status not in dict(TochkaProductHistory.PRODUCT_STATUS_CHOICES):
+            return Response({"status": ["Noto'g'ri status."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if ingestion.is_enabled():
+            return self.enqueue(employee, tochka_product, period, price, product_status)
+
+        history, _ = upsert_price(employee, tochka_product, period, price, product_status)
+        return Response(history_data(history), status=status.HTTP_201_CREATED)
+
+    def enqueue(self, employee, tochka_product, period, price, product_status):
+        """
+        Navbat rejimi: narx navbatga qo'yiladi va 202 qaytadi. Saqlanganini
+        price-ingestion/status/?ids=<submission_id> orqali tekshirish mumkin.
+        """
+        queue = ingestion.get_queue()
+        if ingestion.is_overloaded(queue):
+            response = Response(
+                {"detail": "Server band, birozdan keyin qayta yuboring."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '30'
+            return response
+
+        submission_id = ingestion.enqueue_price(employee, tochka_product, period, price, product_status)
+        return Response(
+            {
+                'submission_id': submission_id,
+                'state': ingestion.STATUS_QUEUED,
+                'tochka_product': tochka_product.id,
                 'period': period.id,
-                'period_type':'weekly',
-                'price': float(alternative_product_price),
-                'unit_miqdor': float(alternative_product_quantity),
-                'unit_price': float(alternative_product_price) / float(
-                    alternative_product_quantity) * alternative_product.unit.miqdor,
-                'status': 'mavjud',  # Alternative product is available
-                'is_alternative': True,
-                'is_checked': True,
-            }
-            print(alternative_data)
-            # Save alternative product history
-            alt_serializer = self.get_serializer(data=alternative_data)
-            if alt_serializer.is_valid():
-                alt_serializer.save()
+                'price': price,
+                'status': product_status,
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
 
-            else:
-                print(alt_serializer.errors, 333)
-                return Response(alt_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            # For the main product, set price to 0 since it's not available
-            data['price'] = 0
-            data['unit_miqdor'] = 0
-            data['unit_price'] = 0
+class TochkaProductHistoryBatchCreateView(CreateAPIView):
+    """
+    Bitta rasta (NTochka) ning barcha narxlarini bitta so'rovda saqlash.
+    """
+    serializer_class = TochkaProductHistoryBatchSerializer
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'X-User-UUID',
+                openapi.IN_HEADER,
+                description="Xodim UUID raqami (header orqali)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                'X-Rasta-UUID',
+                openapi.IN_HEADER,
+                description="Rasta UUID (header orqali)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                'Idempotency-Key',
+                openapi.IN_HEADER,
+                description="Qayta yuborishda bir xil qoladigan so'rov kaliti (ixtiyoriy)",
+                type=openapi.TYPE_STRING,
+                required=False
+            )
+        ]
+    )
+    def post(self, request, *args, **kwargs):
+        employee = get_request_employee(request)
+        if not employee:
+            return Response({"detail": "Xodim topilmadi."}, status=status.HTTP_400_BAD_REQUEST)
+        return idempotent_response(request, employee.id, lambda: self.submit(request, employee))
+
+    def submit(self, request, employee):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        ntochka = get_ntochka_by_uuid(request.META.get('HTTP_X_RASTA_UUID'))
+        period = get_period_by_type_today(serializer.validated_data['period_type'])
+        if not all([employee, ntochka, period]):
+            return Response(
+                {"detail": "Xodim, rasta yoki period topilmadi."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        serializer = self.get_serializer(data=data)
+        results = save_rasta_prices(employee, ntochka, period, serializer.validated_data['items'])
+        created = sum(1 for result in results if 'errors' not in result)
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
 
-        if serializer.is_valid():
-            serializer.save()
-            data = serializer.data
-            tochka_product.previous_price = tochka_product.last_price
-            tochka_product.last_price = data['price']
-            tochka_product.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        print(serializer.errors, 444)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class PriceIngestionStatusView(APIView):
+    """
+    Navbat rejimida yuborilgan narxlarning holati va navbat ko'rsatkichlari.
+    """
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'X-User-UUID',
+                openapi.IN_HEADER,
+                description="Xodim UUID raqami (header orqali)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="submission_id lar, vergul bilan",
+                type=openapi.TYPE_STRING,
+                required=False
+            )
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        employee = get_request_employee(request)
+        if not employee:
+            return Response({"detail": "Xodim topilmadi."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = [value for value in request.GET.get('ids', '').split(',') if value][:500]
+        submissions = {
+            submission_id: ingestion.get_status(submission_id) or {'state': 'unknown'}
+            for submission_id in ids
+        }
+        return Response({'queue': ingestion.queue_stats(), 'submissions': submissions}, status=status.HTTP_200_OK)
 
 
 class AlternativeProductListView(ListAPIView):
@@ -266,35 +391,26 @@ class AlternativeProductListView(ListAPIView):
     )
     def get(self, request, *args, **kwargs):
         req = self.request
-        user_uuid = req.META.get('HTTP_X_USER_UUID')
         product_uuid = req.META.get('HTTP_X_PRODUCT_UUID')
         rasta_uuid = req.META.get('HTTP_X_RASTA_UUID')
 
-        employee = get_employee_by_uuid(user_uuid)
+        employee = get_request_employee(req)
         ntochka = get_ntochka_by_uuid(rasta_uuid)
-        product = get_product_by_uuid(product_uuid)
+        catalog = get_catalog()
+        product = catalog.get_product(product_uuid) if product_uuid else None
 
         if not all([employee, ntochka, product]):
             return Response({"detail": "Invalid headers or not found"}, status=400)
 
-        category = product.category
-        category_products = Product.objects.filter(category=category, is_index=True).select_related(
-            'category',
-            'unit'
-        )
-
-
+        _, category_id = product
 
         # Ushbu rasta (ntochka)da mavjud bo‘lgan productlar ID ro‘yxati
         existing_product_ids = ntochka.products.filter(
             is_udalen=False
         ).values_list('product_id', flat=True)
 
-        # Faqat mavjud bo‘lmagan productlar
-        missing_products = category_products.exclude(id__in=existing_product_ids)
-
-        serializer = ProductSerializer(missing_products, many=True)
-        return Response(serializer.data, status=200)
+        # Faqat mavjud bo‘lmagan productlar (katalog indeksidan, tayyor dict ko'rinishida)
+        return Response(catalog.alternatives(category_id, existing_product_ids), status=200)
 
 
 class ProductListView(ListAPIView):
@@ -313,13 +429,10 @@ class ProductListView(ListAPIView):
         ]
     )
     def get(self, request, *args, **kwargs):
-        user_uuid = request.META.get('HTTP_X_USER_UUID')
-        employee = get_employee_by_uuid(user_uuid)
+        employee = get_request_employee(request)
         if not employee:
             return Response({"detail": "Xodim yoki period topilmadi."}, status=status.HTTP_400_BAD_REQUEST)
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(get_catalog().special, status=status.HTTP_200_OK)
 
     def get_queryset(self):
         return Product.objects.filter(
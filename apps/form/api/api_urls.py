@@ -1,6 +1,7 @@
 from django.urls import path
 
-from .ProductView import TochkaProductListView, TochkaProductHistoryCreateView, AlternativeProductListView, ProductListView
+from .ProductView import TochkaProductListView, TochkaProductHistoryCreateView, TochkaProductHistoryBatchCreateView, \
+    AlternativeProductListView, ProductListView, PriceIngestionStatusView
 from .AplicationView import  ApplicationCreateView, ApplicationListView
 
 app_name = 'home'
@@ -8,6 +9,8 @@ app_name = 'home'
 urlpatterns = [
     path('tochka-products/', TochkaProductListView.as_view(), name='tochka_product_list'),
     path('tochka-product-history/', TochkaProductHistoryCreateView.as_view(), name='tochka_product_history_create'),
+    path('tochka-product-history/batch/', TochkaProductHistoryBatchCreateView.as_view(), name='tochka_product_history_batch_create'),
+    path('price-ingestion/status/', PriceIngestionStatusView.as_view(), name='price_ingestion_status'),
     path('get-alternative-products/', AlternativeProductListView.as_view(), name='alternative_product_list'),
     path('create-application/', ApplicationCreateView.as_view(), name='create_application'),
     path('application-list/', ApplicationListView.as_view(), name='application_list'),
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+# So'rov nishonini (rasta mahsuloti, rasta) tanadan emas, headerdan oladigan endpointlar uchun
+SCOPE_HEADERS = ('HTTP_X_TOCHKA_PRODUCT_ID', 'HTTP_X_RASTA_UUID')
+
+
+def _timeout():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TIMEOUT', 60 * 60 * 24)
+
+
+def _cache_key(scope, key):
+    return f"idempotency:{scope}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+
+def _fingerprint(request):
+    """
+    So'rov tanasi, manzili va nishon headerlari hashi: bir xil kalit boshqa tana bilan
+    yoki boshqa rasta mahsuloti/rasta uchun kelganini aniqlash uchun.
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    scope = json.dumps([request.META.get(header) for header in SCOPE_HEADERS])
+    return hashlib.sha256(f'{request.method} {request.path}\n{scope}\n{body}'.encode()).hexdigest()
+
+
+def idempotent_response(request, scope, handler):
+    """
+    `Idempotency-Key` header bilan kelgan so'rovni bir marta bajarish.
+
+    Takroriy so'rovga saqlangan javob (status va body) bazaga murojaatsiz qaytariladi.
+    Kalit boshqa tanali so'rov uchun ishlatilgan bo'lsa 422, bir xil kalitli so'rov
+    hali bajarilayotgan bo'lsa 409 qaytadi.
+
+    :param request: DRF request
+    :param scope: kalit egasi (masalan xodim id)
+    :param handler: javobni qaytaradigan funksiya
+    """
+    key = request.META.get(HEADER)
+    if not key:
+        return handler()
+
+    cache_key = _cache_key(scope, key)
+    fingerprint = _fingerprint(request)
+    stored = cache.get(cache_key)
+    if stored is not None:
+        if stored.get('fingerprint') != fingerprint:
+            return Response(
+                {"detail": "Bu Idempotency-Key boshqa so'rov uchun ishlatilgan."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        response = Response(stored['data'], status=stored['status'])
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    lock_key = f'{cache_key}:lock'
+    if not cache.add(lock_key, True, 60):
+        return Response({"detail": "Bu so'rov hali bajarilmoqda."}, status=status.HTTP_409_CONFLICT)
+    try:
+        response = handler()
+        # 5xx javoblar saqlanmaydi, mijoz qayta urinishi mumkin
+        if response.status_code < 500:
+            cache.set(
+                cache_key,
+                {'status': response.status_code, 'data': response.data, 'fingerprint': fingerprint},
+                _timeout()
+            )
+    finally:
+        cache.delete(lock_key)
+    return response
@@ -1,12 +1,23 @@
-import os
-from django.core.cache import cache
-
-from datetime import datetime, time, timedelta
+import math
 
 from ..models import Product, TochkaProduct, TochkaProductHistory
-from apps.home.models import PeriodDate, Tochka, NTochka
+from apps.home.models import Tochka, NTochka
+from apps.home.services.period_calendar import get_calendar
+from apps.home.services.code_sequence import next_tochka_code, next_ntochka_code
+from ..services.dsq_registry import dsq_registry
+
+def parse_price(value):
+    """
+    Narx (yoki miqdor) ni float ga o'girish.
+
+    :return: float yoki None (son emas, NaN yoki cheksiz)
+    """
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) else None
 
-import pandas as pd
 
 def get_product_by_uuid(uuid):
     """
@@ -25,38 +36,17 @@ def get_period_by_today():
     """
     Get the current period based on today's date.
 
-    :return: Period string in the format 'YYYY-MM'.
+    :return: PeriodDate instance (haftalik, bo'lmasa oylik) or None
     """
-    today = datetime.today().date()
-    try:
-        return PeriodDate.objects.get(date=today)
-    except PeriodDate.DoesNotExist:
-        return None
+    calendar = get_calendar()
+    return calendar.active('weekly') or calendar.active('monthly')
 
 
 def get_period_by_type_today(period_type='weekly'):
     """
-    Bugungi kun uchun period olish (cache bilan)
+    Bugungi kun uchun faol period sanasi (davr kalendaridan, bazaga murojaatsiz)
     """
-    today = datetime.today()
-    cache_key = f'period_{period_type}_{today}'
-    period = cache.get(cache_key)
-
-    if period is None:
-        try:
-            period = PeriodDate.objects.get(
-                period__period_type=period_type,
-                date = today.date()
-            )
-            seconds_until_midnight = (
-                    datetime.combine(today + timedelta(1), time.min) -
-                    datetime.now()
-            ).seconds
-            cache.set(cache_key, period, seconds_until_midnight)
-        except PeriodDate.DoesNotExist:
-            return None
-
-    return period
+    return get_calendar().active(period_type)
 
 
 def get_tochka_product_history(ntochka, product, period):
@@ -72,37 +62,16 @@ def get_tochka_product_history(ntochka, product, period):
 
 def generate_tochka_code(district):
     """
-    Tochka uchun yangi kod generatsiya qilish
+    Tochka uchun yangi kod generatsiya qilish (CodeSequence dan, poyga holatisiz)
     """
-    last_tochka = Tochka.objects.filter(
-        district=district
-    ).order_by('-id').values_list('code', flat=True).first()
-
-    if last_tochka and '-' in last_tochka:
-        last_num = int(last_tochka.split('-')[-1])
-        new_code = f"{district.code}-{last_num + 1:04d}"
-    else:
-        new_code = f"{district.code}-0001"
-
-    return new_code
+    return next_tochka_code(district)
 
 
 def generate_ntochka_code(tochka):
     """
-    NTochka uchun yangi kod generatsiya qilish
+    NTochka uchun yangi kod generatsiya qilish (CodeSequence dan, poyga holatisiz)
     """
-
-    last_ntochka = NTochka.objects.filter(
-        hudud=tochka
-    ).order_by('-id').values_list('code', flat=True).first()
-
-    if last_ntochka and '-' in last_ntochka:
-        last_num = int(last_ntochka.split('-')[-1])
-        new_code = f"{tochka.code}-{last_num + 1:03d}"
-    else:
-        new_code = f"{tochka.code}-001"
-
-    return new_code
+    return next_ntochka_code(tochka)
 
 
 def get_tochka_product_by_id(tochka_product_id):
@@ -118,8 +87,4 @@ def get_tochka_product_by_id(tochka_product_id):
         return None
 
 def INN_in_DSQ(INN)->bool:
-    file_path = os.path.join('datas', 'DSQ_orgs.csv')
-    df = pd.read_csv(file_path)
-    orgs_set = set(df['INN'].values)
-    print(orgs_set, 'orgsssss')
-    return INN in orgs_set
\ No newline at end of file
+    return dsq_registry.contains(INN)
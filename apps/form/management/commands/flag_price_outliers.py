@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.form.services.price_outliers import rebuild_outliers
+
+
+class Command(BaseCommand):
+    help = "Shubhali narxlarni qayta belgilaydi va narx faktlarining mediana/MAD/kvantillarini yozadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, action='append', default=None, help="Faqat shu PeriodDate id (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        total = rebuild_outliers(options['period_date'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"{total} ta history belgisi o'zgardi"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.form.services.coverage import rebuild_coverage
+
+
+class Command(BaseCommand):
+    help = "Obyektlar qamrovi jadvalini (davr sanasi x obyekt) xom historydan qayta quradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, action='append', default=None, help="Faqat shu PeriodDate id (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        total = rebuild_coverage(options['period_date'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"{total} ta obyekt qamrovi yozildi"))
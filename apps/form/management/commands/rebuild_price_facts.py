@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.form.services.price_facts import rebuild_facts
+from apps.form.services.price_outliers import rebuild_outliers
+
+
+class Command(BaseCommand):
+    help = "Narx faktlari jadvalini (davr sanasi x tuman x mahsulot) xom historydan qayta quradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, action='append', default=None, help="Faqat shu PeriodDate id (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        total = rebuild_facts(options['period_date'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"{total} ta narx fakti yozildi"))
+        # Qayta yaratilgan faktlarning barqaror ustunlari bo'sh: ular ham to'ldiriladi
+        rebuild_outliers(options['period_date'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.form.services.price_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Narx indeksi bo'g'inlarini (Jevons/Laspeyres, tuman/viloyat/respublika) xom historydan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, action='append', default=None, help="Faqat shu PeriodDate id (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        total = rebuild_index(options['period_date'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"{total} ta indeks bo'g'ini yozildi"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.form.services.price_series import rebuild_series
+
+
+class Command(BaseCommand):
+    help = "Narx vaqt qatorini (mahsulot/kategoriya x viloyat x sana) xom historydan qayta quradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, action='append', default=None, help="Faqat shu PeriodDate id (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        total = rebuild_series(options['period_date'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"{total} ta vaqt qatori yozildi"))
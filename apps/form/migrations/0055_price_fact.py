@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-18 09:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0054_tochkaproducthistory_is_from_period_create'),
+        ('home', '0040_code_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Narxlar soni')),
+                ('price_sum', models.FloatField(default=0.0, verbose_name="Narxlar yig'indisi")),
+                ('price_sq_sum', models.FloatField(default=0.0, verbose_name="Narxlar kvadratlari yig'indisi")),
+                ('price_min', models.FloatField(blank=True, null=True, verbose_name='Eng past narx')),
+                ('price_max', models.FloatField(blank=True, null=True, verbose_name='Eng yuqori narx')),
+                ('mavjud_count', models.PositiveIntegerField(default=0, verbose_name='Mavjud')),
+                ('chegirma_count', models.PositiveIntegerField(default=0, verbose_name='Chegirma')),
+                ('mavsumiy_count', models.PositiveIntegerField(default=0, verbose_name='Mavsumiy')),
+                ('vaqtinchalik_count', models.PositiveIntegerField(default=0, verbose_name='Vaqtinchalik')),
+                ('sotilmayapti_count', models.PositiveIntegerField(default=0, verbose_name='Sotilmayapti')),
+                ('obyekt_yopilgan_count', models.PositiveIntegerField(default=0, verbose_name='Obyekt yopilgan')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('district', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_facts', to='home.district', verbose_name='Tuman')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_facts', to='home.perioddate', verbose_name='Davr')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_facts', to='form.product', verbose_name='Mahsulot')),
+            ],
+            options={
+                'verbose_name': 'Narx fakti',
+                'verbose_name_plural': 'Narx faktlari',
+                'db_table': 'price_fact',
+                'indexes': [models.Index(fields=['product', 'period'], name='price_fact_product_d99165_idx')],
+                'unique_together': {('period', 'district', 'product')},
+            },
+        ),
+    ]
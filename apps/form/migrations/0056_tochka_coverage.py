@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-18 09:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0055_price_fact'),
+        ('home', '0040_code_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TochkaCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_products', models.PositiveIntegerField(default=0, verbose_name='Faol mahsulotlar')),
+                ('entered_products', models.PositiveIntegerField(default=0, verbose_name='Kiritilgan mahsulotlar')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverages', to='home.perioddate', verbose_name='Davr')),
+                ('tochka', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverages', to='home.tochka', verbose_name='Obyekt')),
+            ],
+            options={
+                'verbose_name': 'Obyekt qamrovi',
+                'verbose_name_plural': 'Obyektlar qamrovi',
+                'db_table': 'tochka_coverage',
+                'indexes': [models.Index(fields=['tochka', 'period'], name='tochka_cove_tochka__55e9e5_idx')],
+                'unique_together': {('period', 'tochka')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-18 09:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0056_tochka_coverage'),
+        ('home', '0040_code_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('scope', models.CharField(choices=[('product', 'Mahsulot'), ('category', 'Kategoriya')], max_length=10, verbose_name='Turi')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Narxlar soni')),
+                ('price_avg', models.FloatField(verbose_name="O'rtacha narx")),
+                ('price_min', models.FloatField(verbose_name='Eng past narx')),
+                ('price_max', models.FloatField(verbose_name='Eng yuqori narx')),
+                ('price_p25', models.FloatField(verbose_name='25% kvantil')),
+                ('price_p50', models.FloatField(verbose_name='Mediana')),
+                ('price_p75', models.FloatField(verbose_name='75% kvantil')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_series', to='form.productcategory', verbose_name='Kategoriya')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_series', to='home.perioddate', verbose_name='Davr')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_series', to='form.product', verbose_name='Mahsulot')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_series', to='home.region', verbose_name='Viloyat')),
+            ],
+            options={
+                'verbose_name': 'Narx vaqt qatori',
+                'verbose_name_plural': 'Narx vaqt qatorlari',
+                'db_table': 'price_series',
+                'indexes': [models.Index(fields=['product', 'region', 'date'], name='price_serie_product_51eac9_idx'), models.Index(fields=['category', 'region', 'date'], name='price_serie_categor_a3a123_idx'), models.Index(fields=['period'], name='price_serie_period__8a8cfc_idx')],
+            },
+        ),
+    ]
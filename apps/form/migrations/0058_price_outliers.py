@@ -0,0 +1,63 @@
+# Generated by Django 5.0 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0057_price_series'),
+        ('home', '0040_code_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricefact',
+            name='clean_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Shubhasiz narxlar soni'),
+        ),
+        migrations.AddField(
+            model_name='pricefact',
+            name='clean_sum',
+            field=models.FloatField(default=0.0, verbose_name="Shubhasiz narxlar yig'indisi"),
+        ),
+        migrations.AddField(
+            model_name='pricefact',
+            name='outlier_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Shubhali narxlar soni'),
+        ),
+        migrations.AddField(
+            model_name='pricefact',
+            name='price_mad',
+            field=models.FloatField(blank=True, null=True, verbose_name="Medianadan mutlaq og'ishlar medianasi (MAD)"),
+        ),
+        migrations.AddField(
+            model_name='pricefact',
+            name='price_median',
+            field=models.FloatField(blank=True, null=True, verbose_name='Mediana'),
+        ),
+        migrations.AddField(
+            model_name='pricefact',
+            name='price_p25',
+            field=models.FloatField(blank=True, null=True, verbose_name='25% kvantil'),
+        ),
+        migrations.AddField(
+            model_name='pricefact',
+            name='price_p75',
+            field=models.FloatField(blank=True, null=True, verbose_name='75% kvantil'),
+        ),
+        migrations.AddField(
+            model_name='tochkaproducthistory',
+            name='is_outlier',
+            field=models.BooleanField(default=False, verbose_name='Shubhali narx'),
+        ),
+        migrations.AddField(
+            model_name='tochkaproducthistory',
+            name='outlier_reason',
+            field=models.CharField(blank=True, choices=[('', '-'), ('top', 'Mahsulotning yuqori chegarasidan baland'), ('bottom', 'Mahsulotning quyi chegarasidan past'), ('high', 'Tumandagi narxlardan keskin baland'), ('low', 'Tumandagi narxlardan keskin past')], default='', max_length=10, verbose_name='Shubha sababi'),
+        ),
+        migrations.AddIndex(
+            model_name='tochkaproducthistory',
+            index=models.Index(fields=['is_outlier', 'is_checked'], name='product_his_is_outl_da9996_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-18 10:03
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0058_price_outliers'),
+        ('home', '0040_code_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='index_weight',
+            field=models.FloatField(default=1.0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Indeks vazni'),
+        ),
+        migrations.CreateModel(
+            name='PriceIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('level', models.CharField(choices=[('district', 'Tuman'), ('region', 'Viloyat'), ('country', 'Respublika')], max_length=10, verbose_name='Daraja')),
+                ('relative', models.FloatField(verbose_name='Oldingi davrga nisbati')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Mos narxlar (mahsulotlar) soni')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('district', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_indices', to='home.district', verbose_name='Tuman')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_indices', to='home.perioddate', verbose_name='Davr')),
+                ('previous', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='next_price_indices', to='home.perioddate', verbose_name='Oldingi davr')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_indices', to='form.product', verbose_name='Mahsulot')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_indices', to='home.region', verbose_name='Viloyat')),
+            ],
+            options={
+                'verbose_name': 'Narx indeksi',
+                'verbose_name_plural': 'Narx indekslari',
+                'db_table': 'price_index',
+                'indexes': [models.Index(fields=['level', 'product', 'region', 'district', 'date'], name='price_index_level_06c8b6_idx'), models.Index(fields=['period'], name='price_index_period__d791b4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0059_price_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TochkaProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tochka_product_id', models.BigIntegerField(verbose_name='Rasta mahsuloti')),
+                ('ntochka_id', models.BigIntegerField(verbose_name='Rasta')),
+                ('is_weekly', models.BooleanField(default=False, verbose_name='Haftalik')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name="O'chirilgan sana")),
+            ],
+            options={
+                'verbose_name': "O'chirilgan rasta mahsuloti",
+                'verbose_name_plural': "O'chirilgan rasta mahsulotlari",
+                'db_table': 'rasta_product_tombstone',
+                'indexes': [models.Index(fields=['ntochka_id', 'deleted_at'], name='rasta_produ_ntochka_4d41f1_idx')],
+            },
+        ),
+    ]
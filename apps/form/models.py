@@ -93,6 +93,7 @@ class Product(BaseModel):
     )
     barcode = models.CharField(max_length=20, verbose_name=_("Shtrix kodi"), null=True, blank=True)
     is_index = models.BooleanField(default=False, verbose_name=_("Indeks"))
+    index_weight = models.FloatField(default=1.0, validators=[MinValueValidator(0)], verbose_name=_("Indeks vazni"))
     is_import = models.BooleanField(default=False, verbose_name=_("Import qilinganmi?"))
     is_special = models.BooleanField(default=False, verbose_name=_("Maxsus"))
 
@@ -130,6 +131,28 @@ class TochkaProduct(BaseModel):
             models.Index(fields=['is_udalen', 'is_active']),
         ]
 
+class TochkaProductTombstone(models.Model):
+    """
+    Butunlay o'chirilgan rasta mahsuloti izi: `since` sinxronlashda mijozga o'chirilgan id
+    sifatida beriladi (nofaol qilinganlar TochkaProduct ning o'zidan olinadi).
+    Rasta o'chirilganda izlar ham qoladi, shuning uchun rasta va mahsulot oddiy id sifatida saqlanadi.
+    """
+    tochka_product_id = models.BigIntegerField(verbose_name=_("Rasta mahsuloti"))
+    ntochka_id = models.BigIntegerField(verbose_name=_("Rasta"))
+    is_weekly = models.BooleanField(default=False, verbose_name=_("Haftalik"))
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name=_("O'chirilgan sana"))
+
+    def __str__(self):
+        return f"{self.ntochka_id}/{self.tochka_product_id}"
+
+    class Meta:
+        verbose_name = "O'chirilgan rasta mahsuloti"
+        verbose_name_plural = "O'chirilgan rasta mahsulotlari"
+        db_table = 'rasta_product_tombstone'
+        indexes = [
+            models.Index(fields=['ntochka_id', 'deleted_at']),
+        ]
+
 class TochkaProductHistory(BaseModel):
     PRODUCT_STATUS_CHOICES = [
         ('mavjud', 'Mahsulot mavjud'),
@@ -139,6 +162,14 @@ class TochkaProductHistory(BaseModel):
         ('sotilmayapti', 'Mavjud emas (Mahsulot sotilmayabdi)'),
         ('obyekt_yopilgan', 'Mavjud emas (Obyekt yopilgan)'),
     ]
+    # services.price_outliers belgilaydi
+    OUTLIER_REASON_CHOICES = [
+        ('', '-'),
+        ('top', 'Mahsulotning yuqori chegarasidan baland'),
+        ('bottom', 'Mahsulotning quyi chegarasidan past'),
+        ('high', 'Tumandagi narxlardan keskin baland'),
+        ('low', 'Tumandagi narxlardan keskin past'),
+    ]
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='history', verbose_name=_("Mahsulot"))
     ntochka = models.ForeignKey('home.NTochka', on_delete=models.CASCADE, related_name='product_history', verbose_name=_("Rasta"))
     hudud = models.ForeignKey('home.Tochka', on_delete=models.CASCADE, related_name='product_history', verbose_name=_("Obyekt"))
@@ -150,6 +181,8 @@ class TochkaProductHistory(BaseModel):
     period = models.ForeignKey('home.PeriodDate', on_delete=models.CASCADE, related_name='product_history', verbose_name=_("Davr"))
     status = models.CharField(max_length=15, verbose_name=_("Status"), default='mavjud', choices=PRODUCT_STATUS_CHOICES)
     is_checked = models.BooleanField(default=False, verbose_name=_("Tekshirilgan"))
+    is_outlier = models.BooleanField(default=False, verbose_name=_("Shubhali narx"))
+    outlier_reason = models.CharField(max_length=10, blank=True, default='', choices=OUTLIER_REASON_CHOICES, verbose_name=_("Shubha sababi"))
     is_active = models.BooleanField(default=True, verbose_name=_("Faol"))
     is_alternative = models.BooleanField(default=False, verbose_name=_("Alternativ"))
     is_from_application = models.BooleanField(default=False, verbose_name=_("Ariza tomonidan yaratilgan"))
@@ -167,6 +200,7 @@ class TochkaProductHistory(BaseModel):
             models.Index(fields=['-id']),
             models.Index(fields=['employee', '-created_at']),
             models.Index(fields=['status', 'is_active', 'is_checked']),
+            models.Index(fields=['is_outlier', 'is_checked']),
             models.Index(fields=['period', 'hudud']),
             models.Index(fields=['created_at']),
         ]
@@ -214,4 +248,152 @@ class Application(BaseModel):
             models.Index(fields=['employee', '-created_at']),
             models.Index(fields=['application_type', 'is_checked']),
             models.Index(fields=['period', 'is_active']),
-        ]
\ No newline at end of file
+        ]
+
+
+class PriceFact(models.Model):
+    """
+    (davr sanasi, tuman, mahsulot) bo'yicha faol narxlar yig'indisi.
+    histories_changed signalida tranzaksiya yakunlangach yangilanadi (services.price_facts),
+    to'liq qayta qurish: `manage.py rebuild_price_facts`. Mediana/MAD/kvantillar va shubhali
+    narxlar soni alohida, kechiktirib yoziladi: `manage.py flag_price_outliers`.
+    """
+    period = models.ForeignKey('home.PeriodDate', on_delete=models.CASCADE, related_name='price_facts', verbose_name=_("Davr"))
+    district = models.ForeignKey('home.District', on_delete=models.CASCADE, related_name='price_facts', verbose_name=_("Tuman"))
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_facts', verbose_name=_("Mahsulot"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Narxlar soni"))
+    price_sum = models.FloatField(default=0.0, verbose_name=_("Narxlar yig'indisi"))
+    price_sq_sum = models.FloatField(default=0.0, verbose_name=_("Narxlar kvadratlari yig'indisi"))
+    price_min = models.FloatField(null=True, blank=True, verbose_name=_("Eng past narx"))
+    price_max = models.FloatField(null=True, blank=True, verbose_name=_("Eng yuqori narx"))
+    mavjud_count = models.PositiveIntegerField(default=0, verbose_name=_("Mavjud"))
+    chegirma_count = models.PositiveIntegerField(default=0, verbose_name=_("Chegirma"))
+    mavsumiy_count = models.PositiveIntegerField(default=0, verbose_name=_("Mavsumiy"))
+    vaqtinchalik_count = models.PositiveIntegerField(default=0, verbose_name=_("Vaqtinchalik"))
+    sotilmayapti_count = models.PositiveIntegerField(default=0, verbose_name=_("Sotilmayapti"))
+    obyekt_yopilgan_count = models.PositiveIntegerField(default=0, verbose_name=_("Obyekt yopilgan"))
+    # Barqaror ko'rsatkichlar (musbat narxlar bo'yicha), davr sanasi bo'yicha services.price_outliers yozadi
+    price_median = models.FloatField(null=True, blank=True, verbose_name=_("Mediana"))
+    price_mad = models.FloatField(null=True, blank=True, verbose_name=_("Medianadan mutlaq og'ishlar medianasi (MAD)"))
+    price_p25 = models.FloatField(null=True, blank=True, verbose_name=_("25% kvantil"))
+    price_p75 = models.FloatField(null=True, blank=True, verbose_name=_("75% kvantil"))
+    outlier_count = models.PositiveIntegerField(default=0, verbose_name=_("Shubhali narxlar soni"))
+    clean_count = models.PositiveIntegerField(default=0, verbose_name=_("Shubhasiz narxlar soni"))
+    clean_sum = models.FloatField(default=0.0, verbose_name=_("Shubhasiz narxlar yig'indisi"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+
+    def __str__(self):
+        return f"{self.period_id}/{self.district_id}/{self.product_id}"
+
+    class Meta:
+        verbose_name = "Narx fakti"
+        verbose_name_plural = "Narx faktlari"
+        unique_together = ('period', 'district', 'product')
+        db_table = 'price_fact'
+        indexes = [
+            models.Index(fields=['product', 'period']),
+        ]
+
+
+class TochkaCoverage(models.Model):
+    """
+    (davr sanasi, obyekt) bo'yicha qamrov: faol rasta mahsulotlari va shu sanada narxi
+    kiritilganlari soni. Faqat kamida bitta narx kiritilgan obyektlar uchun qator bo'ladi.
+    histories_changed va activation_changed signallarida tranzaksiya yakunlangach yangilanadi
+    (services.coverage), to'liq qayta qurish: `manage.py rebuild_coverage`.
+    """
+    period = models.ForeignKey('home.PeriodDate', on_delete=models.CASCADE, related_name='coverages', verbose_name=_("Davr"))
+    tochka = models.ForeignKey('home.Tochka', on_delete=models.CASCADE, related_name='coverages', verbose_name=_("Obyekt"))
+    active_products = models.PositiveIntegerField(default=0, verbose_name=_("Faol mahsulotlar"))
+    entered_products = models.PositiveIntegerField(default=0, verbose_name=_("Kiritilgan mahsulotlar"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+
+    def __str__(self):
+        return f"{self.period_id}/{self.tochka_id}: {self.entered_products}/{self.active_products}"
+
+    class Meta:
+        verbose_name = "Obyekt qamrovi"
+        verbose_name_plural = "Obyektlar qamrovi"
+        unique_together = ('period', 'tochka')
+        db_table = 'tochka_coverage'
+        indexes = [
+            models.Index(fields=['tochka', 'period']),
+        ]
+
+
+class PriceSeries(models.Model):
+    """
+    Narx vaqt qatori: (mahsulot yoki kategoriya, viloyat, davr sanasi) bo'yicha narxlar soni,
+    o'rtacha/eng past/eng yuqori va 25/50/75 foizlik kvantillar. region bo'sh bo'lsa butun respublika.
+    Davr sanasi bo'yicha to'liq qayta yoziladi (services.price_series), ochiq davr narx
+    kiritilganda biroz kechiktirib, yopilgan davr yopilganda bir marta.
+    """
+    SCOPE_CHOICES = (
+        ('product', 'Mahsulot'),
+        ('category', 'Kategoriya'),
+    )
+    period = models.ForeignKey('home.PeriodDate', on_delete=models.CASCADE, related_name='price_series', verbose_name=_("Davr"))
+    date = models.DateField(verbose_name=_("Sana"))
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, verbose_name=_("Turi"))
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='price_series', verbose_name=_("Mahsulot"))
+    category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='price_series', verbose_name=_("Kategoriya"))
+    region = models.ForeignKey('home.Region', on_delete=models.CASCADE, null=True, blank=True, related_name='price_series', verbose_name=_("Viloyat"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Narxlar soni"))
+    price_avg = models.FloatField(verbose_name=_("O'rtacha narx"))
+    price_min = models.FloatField(verbose_name=_("Eng past narx"))
+    price_max = models.FloatField(verbose_name=_("Eng yuqori narx"))
+    price_p25 = models.FloatField(verbose_name=_("25% kvantil"))
+    price_p50 = models.FloatField(verbose_name=_("Mediana"))
+    price_p75 = models.FloatField(verbose_name=_("75% kvantil"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+
+    def __str__(self):
+        return f"{self.scope}:{self.product_id or self.category_id}/{self.region_id}/{self.date}"
+
+    class Meta:
+        verbose_name = "Narx vaqt qatori"
+        verbose_name_plural = "Narx vaqt qatorlari"
+        db_table = 'price_series'
+        indexes = [
+            models.Index(fields=['product', 'region', 'date']),
+            models.Index(fields=['category', 'region', 'date']),
+            models.Index(fields=['period']),
+        ]
+
+
+class PriceIndex(models.Model):
+    """
+    Narx indeksi zanjiri bo'g'ini: davr sanasining shu turdagi oldingi sanaga nisbati
+    (1.0 - o'zgarishsiz). Mahsulot bo'yicha - mos rasta narxlari nisbatlarining o'rta geometrigi
+    (Jevons), product bo'sh bo'lsa barcha indeks mahsulotlari bo'yicha vaznli o'rta arifmetik
+    (Laspeyres, Product.index_weight). Daraja: tuman, viloyat yoki respublika.
+    Davr sanasi bo'yicha to'liq qayta yoziladi (services.price_index), indeks qatori
+    bo'g'inlarni ko'paytirib olinadi.
+    """
+    LEVEL_CHOICES = (
+        ('district', 'Tuman'),
+        ('region', 'Viloyat'),
+        ('country', 'Respublika'),
+    )
+    period = models.ForeignKey('home.PeriodDate', on_delete=models.CASCADE, related_name='price_indices', verbose_name=_("Davr"))
+    previous = models.ForeignKey('home.PeriodDate', on_delete=models.CASCADE, related_name='next_price_indices', verbose_name=_("Oldingi davr"))
+    date = models.DateField(verbose_name=_("Sana"))
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES, verbose_name=_("Daraja"))
+    region = models.ForeignKey('home.Region', on_delete=models.CASCADE, null=True, blank=True, related_name='price_indices', verbose_name=_("Viloyat"))
+    district = models.ForeignKey('home.District', on_delete=models.CASCADE, null=True, blank=True, related_name='price_indices', verbose_name=_("Tuman"))
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='price_indices', verbose_name=_("Mahsulot"))
+    relative = models.FloatField(verbose_name=_("Oldingi davrga nisbati"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Mos narxlar (mahsulotlar) soni"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+
+    def __str__(self):
+        return f"{self.level}:{self.district_id or self.region_id}/{self.product_id}/{self.date}"
+
+    class Meta:
+        verbose_name = "Narx indeksi"
+        verbose_name_plural = "Narx indekslari"
+        db_table = 'price_index'
+        indexes = [
+            models.Index(fields=['level', 'product', 'region', 'district', 'date']),
+            models.Index(fields=['period']),
+        ]
@@ -0,0 +1,76 @@
+import threading
+
+from apps.common.services.cache_versions import get_version, bump_version
+from apps.form.models import Product
+
+VERSION_NAME = 'product_catalog'
+
+_lock = threading.Lock()
+_index = None
+
+
+class CatalogIndex:
+    """
+    Mahsulot katalogining jarayon ichidagi indeksi.
+
+    - by_uuid: uuid -> (id, category_id)
+    - unit_miqdor: product_id -> o'lchov birligi miqdori
+    - category_index: category_id -> [(product_id, serializatsiya qilingan dict), ...] (faqat is_index)
+    - special: is_special mahsulotlar ro'yxati (ProductListSerializer ko'rinishida)
+    """
+
+    def __init__(self, version):
+        from apps.form.api.ProductView.serializers import ProductSerializer, ProductListSerializer
+
+        self.version = version
+        self.by_uuid = {}
+        self.unit_miqdor = {}
+        self.category_index = {}
+
+        products = list(Product.objects.select_related('category', 'unit'))
+        index_products = [product for product in products if product.is_index]
+        index_data = ProductSerializer(index_products, many=True).data
+        for product, data in zip(index_products, index_data):
+            self.category_index.setdefault(product.category_id, []).append((product.id, dict(data)))
+
+        for product in products:
+            self.by_uuid[str(product.uuid)] = (product.id, product.category_id)
+            self.unit_miqdor[product.id] = product.unit.miqdor
+
+        special = [product for product in products if product.is_special]
+        self.special = [dict(data) for data in ProductListSerializer(special, many=True).data]
+
+    def get_product(self, uuid):
+        """
+        uuid bo'yicha (id, category_id). Topilmasa None.
+        """
+        return self.by_uuid.get(str(uuid))
+
+    def alternatives(self, category_id, existing_product_ids):
+        """
+        Kategoriyadagi indeks mahsulotlardan rastada yo'qlari.
+        """
+        existing_product_ids = set(existing_product_ids)
+        return [
+            data for product_id, data in self.category_index.get(category_id, [])
+            if product_id not in existing_product_ids
+        ]
+
+
+def get_catalog():
+    """
+    Joriy katalog indeksi. Versiya o'zgargan bo'lsa (Product/ProductCategory saqlangan) qayta quriladi.
+    """
+    global _index
+    version = get_version(VERSION_NAME)
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = CatalogIndex(version)
+            index = _index
+    return index
+
+
+def invalidate_catalog():
+    bump_version(VERSION_NAME)
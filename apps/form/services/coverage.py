@@ -0,0 +1,243 @@
+import logging
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from apps.form.models import TochkaCoverage, TochkaProduct, TochkaProductHistory
+from apps.home.models import Tochka
+
+logger = logging.getLogger(__name__)
+
+
+def _supports_upsert():
+    return connections[router.db_for_write(TochkaCoverage)].features.supports_update_conflicts_with_target
+
+
+def _lock_keys(keys):
+    """
+    Qamrov qatorlarini (yo'q bo'lsa bo'sh holda yaratib) kalitlar tartibida qulflash,
+    parallel yuborilgan narxlar bir-birining sonini yo'qotmasligi uchun.
+    """
+    placeholders = [
+        TochkaCoverage(period_id=period_id, tochka_id=tochka_id) for period_id, tochka_id in sorted(keys)
+    ]
+    if _supports_upsert():
+        TochkaCoverage.objects.bulk_create(
+            placeholders,
+            update_conflicts=True,
+            unique_fields=['period', 'tochka'],
+            update_fields=['updated_at'],
+        )
+        return
+    for coverage in placeholders:
+        TochkaCoverage.objects.select_for_update().get_or_create(
+            period_id=coverage.period_id, tochka_id=coverage.tochka_id
+        )
+
+
+def _active_counts(tochka_ids):
+    return dict(
+        TochkaProduct.objects.filter(hudud_id__in=tochka_ids, is_active=True).order_by().values(
+            'hudud_id'
+        ).annotate(total=Count('id')).values_list('hudud_id', 'total')
+    )
+
+
+def _upsert(coverages):
+    if _supports_upsert():
+        TochkaCoverage.objects.bulk_create(
+            coverages,
+            update_conflicts=True,
+            unique_fields=['period', 'tochka'],
+            update_fields=['active_products', 'entered_products', 'updated_at'],
+        )
+        return
+    for coverage in coverages:
+        TochkaCoverage.objects.update_or_create(
+            period_id=coverage.period_id,
+            tochka_id=coverage.tochka_id,
+            defaults={
+                'active_products': coverage.active_products,
+                'entered_products': coverage.entered_products,
+            },
+        )
+
+
+def _sync_active(active):
+    """
+    Obyektning boshqa sanalardagi qatorlarida ham faol mahsulotlar sonini yangilash
+    (bitta UPDATE, odatda hech qaysi qator o'zgarmaydi).
+    """
+    if not active:
+        return
+    TochkaCoverage.objects.filter(reduce(or_, (
+        Q(tochka_id=tochka_id) & ~Q(active_products=total) for tochka_id, total in active.items()
+    ))).update(active_products=Case(
+        *[When(tochka_id=tochka_id, then=Value(total)) for tochka_id, total in active.items()],
+        output_field=IntegerField(),
+    ))
+
+
+def refresh_coverage(keys):
+    """
+    Berilgan (period_id, tochka_id) kalitlari uchun qamrovni qayta hisoblash.
+    Kiritilgan = shu sanada historysi bor faol rasta mahsulotlari (distinct).
+    Hech narsa kiritilmagan kalitlarning qatori o'chiriladi.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    period_ids, tochka_ids = (set(column) for column in zip(*keys))
+    with transaction.atomic(savepoint=False):
+        _lock_keys(keys)
+        entered = {
+            (row['period_id'], row['hudud_id']): row['entered']
+            for row in TochkaProductHistory.objects.filter(
+                period_id__in=period_ids,
+                hudud_id__in=tochka_ids,
+                tochka_product__is_active=True,
+            ).order_by().values('period_id', 'hudud_id').annotate(
+                entered=Count('tochka_product_id', distinct=True)
+            )
+            if (row['period_id'], row['hudud_id']) in keys
+        }
+        active = _active_counts(tochka_ids)
+        if entered:
+            _upsert([
+                TochkaCoverage(
+                    period_id=period_id,
+                    tochka_id=tochka_id,
+                    active_products=active.get(tochka_id, 0),
+                    entered_products=count,
+                )
+                for (period_id, tochka_id), count in entered.items()
+            ])
+        _sync_active(active)
+        missing = keys - set(entered)
+        if missing:
+            TochkaCoverage.objects.filter(reduce(or_, (
+                Q(period_id=period_id, tochka_id=tochka_id) for period_id, tochka_id in missing
+            ))).delete()
+
+
+def refresh_for_histories(histories):
+    """
+    O'zgargan historylarga tegishli qamrov qatorlarini yangilash (histories_changed receiveri).
+    """
+    refresh_coverage({(history.period_id, history.hudud_id) for history in histories})
+
+
+def refresh_for_tochkas(tochka_ids):
+    """
+    Obyektlarning barcha sanalardagi qamrovini yangilash (mahsulot/rasta/obyekt faolligi o'zgarganda).
+    """
+    tochka_ids = set(tochka_ids)
+    if not tochka_ids:
+        return
+    keys = set(
+        TochkaProductHistory.objects.filter(hudud_id__in=tochka_ids).order_by().values_list(
+            'period_id', 'hudud_id'
+        ).distinct()
+    ) | set(
+        TochkaCoverage.objects.filter(tochka_id__in=tochka_ids).values_list('period_id', 'tochka_id')
+    )
+    refresh_coverage(keys)
+
+
+def rebuild_coverage(period_ids=None, stdout=None):
+    """
+    Qamrov jadvalini to'liq qayta qurish (backfill). Har bir davr sanasi alohida tranzaksiyada.
+
+    :param period_ids: PeriodDate id lari, berilmasa historysi bor barcha davrlar
+    :return: yozilgan qatorlar soni
+    """
+    if period_ids is None:
+        period_ids = list(
+            TochkaProductHistory.objects.order_by().values_list('period_id', flat=True).distinct()
+        )
+    active = dict(
+        TochkaProduct.objects.filter(is_active=True).order_by().values('hudud_id').annotate(
+            total=Count('id')
+        ).values_list('hudud_id', 'total')
+    )
+    total = 0
+    for period_id in sorted(period_ids):
+        coverages = [
+            TochkaCoverage(
+                period_id=period_id,
+                tochka_id=tochka_id,
+                active_products=active.get(tochka_id, 0),
+                entered_products=entered,
+            )
+            for tochka_id, entered in TochkaProductHistory.objects.filter(
+                period_id=period_id, tochka_product__is_active=True
+            ).order_by().values('hudud_id').annotate(
+                entered=Count('tochka_product_id', distinct=True)
+            ).values_list('hudud_id', 'entered')
+        ]
+        with transaction.atomic():
+            TochkaCoverage.objects.filter(period_id=period_id).delete()
+            TochkaCoverage.objects.bulk_create(coverages, batch_size=1000)
+        total += len(coverages)
+        logger.info(f"Davr sanasi {period_id}: {len(coverages)} ta obyekt qamrovi qayta qurildi")
+        if stdout is not None:
+            stdout.write(f"Davr sanasi {period_id}: {len(coverages)} ta obyekt")
+    return total
+
+
+def coverage_rows(periods, **filters):
+    """
+    Tanlangan sanalar bo'yicha faol obyektlar qamrovi: {tochka_id: (faol, kiritilgan)}.
+    Bir nechta sana bo'lsa kiritilgan = sanalarning birortasida narxi bor faol rasta mahsulotlari
+    (distinct): turli sanalarda kiritilgan mahsulotlar birlashtiriladi, shuning uchun sonlar
+    historydan olinadi, qamrov qatorlari faqat obyektlar va faol mahsulotlar sonini beradi.
+
+    :param periods: PeriodDate obyektlari yoki id lari
+
+    :param filters: TochkaCoverage filtrlari, masalan tochka__district_id=...
+    """
+    period_ids = {getattr(period, 'id', period) for period in periods}
+    rows = {}
+    for tochka_id, active, entered in TochkaCoverage.objects.filter(
+        period_id__in=period_ids, tochka__is_active=True, entered_products__gt=0, **filters
+    ).order_by().values_list('tochka_id', 'active_products', 'entered_products'):
+        if tochka_id not in rows or entered > rows[tochka_id][1]:
+            rows[tochka_id] = (active, entered)
+    if len(period_ids) < 2 or not rows:
+        return rows
+
+    entered = dict(
+        TochkaProductHistory.objects.filter(
+            period_id__in=period_ids, hudud_id__in=list(rows), tochka_product__is_active=True
+        ).order_by().values('hudud_id').annotate(
+            entered=Count('tochka_product_id', distinct=True)
+        ).values_list('hudud_id', 'entered')
+    )
+    return {tochka_id: (active, entered.get(tochka_id, 0)) for tochka_id, (active, _) in rows.items()}
+
+
+def district_coverage(periods, **filters):
+    """
+    Tumanlar bo'yicha: {district_id: (faol obyektlar, kiritilgan obyektlar)}.
+    Obyekt tanlangan sanalarning birortasida kamida bitta narx kiritilgan bo'lsa kiritilgan hisoblanadi.
+
+    :param filters: Tochka filtrlari, masalan district__region_id=...
+    """
+    totals = dict(
+        Tochka.objects.filter(is_active=True, **filters).order_by().values(
+            'district_id'
+        ).annotate(total=Count('id')).values_list('district_id', 'total')
+    )
+    entered = dict(
+        TochkaCoverage.objects.filter(
+            period__in=periods,
+            entered_products__gt=0,
+            tochka__is_active=True,
+            **{f'tochka__{key}': value for key, value in filters.items()}
+        ).order_by().values('tochka__district_id').annotate(
+            entered=Count('tochka_id', distinct=True)
+        ).values_list('tochka__district_id', 'entered')
+    )
+    return {district_id: (total, entered.get(district_id, 0)) for district_id, total in totals.items()}
@@ -0,0 +1,75 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _to_int(inn):
+    try:
+        return int(str(inn).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class DSQRegistry:
+    """
+    DSQ tashkilotlari INN ro'yxati: CSV bir marta o'qilib saralangan int64 massivda saqlanadi.
+    Fayl o'zgarganda (mtime) qayta yuklanadi. Tekshiruv np.searchsorted bilan.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._inns = np.empty(0, dtype=np.int64)
+
+    def get_path(self):
+        return self.path or getattr(settings, 'DSQ_ORGS_FILE', os.path.join(settings.BASE_DIR, 'datas', 'DSQ_orgs.csv'))
+
+    def _load(self, path):
+        df = pd.read_csv(path, usecols=['INN'], dtype=str)
+        inns = pd.to_numeric(df['INN'].str.strip(), errors='coerce').dropna()
+        return np.unique(inns.to_numpy(dtype=np.int64))
+
+    def inns(self):
+        path = self.get_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            logger.error(f"DSQ fayli topilmadi: {path}")
+            return self._inns
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._inns = self._load(path)
+                    self._mtime = mtime
+                    logger.info(f"DSQ ro'yxati yuklandi: {len(self._inns)} ta INN")
+        return self._inns
+
+    def contains(self, inn):
+        return self.contains_many([inn])[0]
+
+    def contains_many(self, inns):
+        """
+        :param inns: INN lar ro'yxati (int yoki str)
+        :return: har bir INN uchun bool ro'yxati (kiritilgan tartibda)
+        """
+        registry = self.inns()
+        values = [_to_int(inn) for inn in inns]
+        valid = [value for value in values if value is not None]
+        if not len(registry) or not valid:
+            return [False] * len(values)
+
+        lookup = np.asarray(valid, dtype=np.int64)
+        positions = np.searchsorted(registry, lookup)
+        positions[positions >= len(registry)] = len(registry) - 1
+        found = iter((registry[positions] == lookup).tolist())
+        return [False if value is None else next(found) for value in values]
+
+
+dsq_registry = DSQRegistry()
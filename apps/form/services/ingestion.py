@@ -0,0 +1,454 @@
+import json
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError
+from django.utils import timezone
+
+from apps.common.services import job_lock
+
+from .price_submission import save_prices
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_PERSISTED = 'persisted'
+STATUS_FAILED = 'failed'
+
+DRAIN_SCHEDULED_KEY = 'price_ingestion:drain_scheduled'
+DRAIN_LOCK_NAME = 'price_ingestion:drain'
+STATS_COUNTERS = ('persisted_total', 'failed_total', 'dead_letter_total')
+# Baza bilan aloqa xatolarida partiya bo'linmaydi va dead-letter ga tushmaydi: task qayta urinadi
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+_queues = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _status_timeout():
+    return _setting('PRICE_INGESTION_STATUS_TIMEOUT', 60 * 60 * 24)
+
+
+def is_enabled():
+    return _setting('PRICE_INGESTION_MODE', 'sync') == 'queue'
+
+
+def _write_json(directory, name, data):
+    tmp_path = directory / f'.{name}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, directory / name)
+
+
+def _status_name(submission_id):
+    # Id so'rovdan keladi: fayl/kalit nomiga faqat oddiy belgilar tushadi
+    if submission_id is None:
+        return None
+    submission_id = str(submission_id)
+    return submission_id if re.fullmatch(r'[\w-]+', submission_id) else None
+
+
+class FileQueue:
+    """
+    Redis bo'lmagan muhit (lokal, testlar) uchun fayl asosidagi navbat.
+    Har bir yozuv pending/ papkasida alohida JSON fayl, ack qilinganda o'chiriladi.
+    Saqlab bo'lmagan yozuvlar xatosi bilan dead/ papkasiga yoziladi.
+    Yozuv holatlari status/ papkasida, statistika stats.json da: navbatni o'qiydigan
+    barcha jarayonlar ularni keshdan qat'i nazar ko'radi.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory) / 'pending'
+        self.dead_directory = Path(directory) / 'dead'
+        self.status_directory = Path(directory) / 'status'
+        self.stats_path = Path(directory) / 'stats.json'
+        for path in (self.directory, self.dead_directory, self.status_directory):
+            path.mkdir(parents=True, exist_ok=True)
+
+    def append(self, entry):
+        _write_json(self.directory, f"{time.time_ns():020d}-{entry['id']}.json", entry)
+
+    def _names(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+
+    def read(self, count):
+        batch = []
+        for name in self._names()[:count]:
+            try:
+                with open(self.directory / name, encoding='utf-8') as f:
+                    batch.append((name, json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.error(f"Navbat yozuvini o'qishda xatolik {name}: {e}")
+        return batch
+
+    def ack(self, handles):
+        for name in handles:
+            try:
+                os.remove(self.directory / name)
+            except FileNotFoundError:
+                pass
+
+    def dead_letter(self, items):
+        """
+        :param items: [(handle, entry, xato matni), ...] - ack alohida qilinadi
+        """
+        for name, entry, error in items:
+            _write_json(self.dead_directory, name, {'entry': entry, 'error': error})
+
+    def pending(self):
+        return len(self._names())
+
+    def oldest_age(self):
+        names = self._names()
+        if not names:
+            return None
+        return max(0.0, time.time() - int(names[0].split('-', 1)[0]) / 1e9)
+
+    def set_statuses(self, statuses, timeout):
+        for submission_id, data in statuses.items():
+            name = _status_name(submission_id)
+            if name:
+                _write_json(self.status_directory, f'{name}.json', data)
+
+    def get_status(self, submission_id, timeout):
+        name = _status_name(submission_id)
+        if not name:
+            return None
+        path = self.status_directory / f'{name}.json'
+        try:
+            if time.time() - path.stat().st_mtime > timeout:
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def prune_statuses(self, timeout):
+        """
+        Muddati o'tgan holat fayllarini o'chirish (drain boshida bir marta).
+        """
+        expired_before = time.time() - timeout
+        for entry in os.scandir(self.status_directory):
+            try:
+                if entry.stat().st_mtime < expired_before:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def add_stats(self, counters, values):
+        # Faqat drain qulfini egallagan ishlovchi yozadi
+        stats = self.stats()
+        for name, value in counters.items():
+            stats[name] = stats.get(name, 0) + value
+        stats.update(values)
+        _write_json(self.stats_path.parent, self.stats_path.name, stats)
+
+    def stats(self):
+        try:
+            with open(self.stats_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+class RedisStreamQueue:
+    """
+    Redis stream + consumer group. Ack qilinmagan (ishlovchi jarayon yiqilgan) yozuvlar
+    CLAIM_IDLE_MS dan keyin boshqa ishlovchi tomonidan qayta olinadi.
+    Saqlab bo'lmagan yozuvlar `<stream>:dead` streamiga yoziladi.
+    Yozuv holatlari `<stream>:status:<id>` kalitlarida (muddati bilan), statistika
+    `<stream>:stats` hashida.
+    """
+    GROUP = 'price_ingestion'
+    CLAIM_IDLE_MS = 60 * 1000
+
+    def __init__(self, url, stream):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.stream = stream
+        self._group_ready = False
+
+    @property
+    def consumer(self):
+        # Obyekt fork dan oldin yaratilgan bo'lishi mumkin (Celery prefork)
+        return f'{socket.gethostname()}-{os.getpid()}'
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        import redis
+
+        try:
+            self.client.xgroup_create(self.stream, self.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def append(self, entry):
+        self.client.xadd(self.stream, {'data': json.dumps(entry)})
+
+    def read(self, count):
+        self._ensure_group()
+        _, claimed, *_ = self.client.xautoclaim(
+            self.stream, self.GROUP, self.consumer, self.CLAIM_IDLE_MS, '0-0', count=count
+        )
+        messages = list(claimed)
+        if len(messages) < count:
+            for _, stream_messages in self.client.xreadgroup(
+                self.GROUP, self.consumer, {self.stream: '>'}, count=count - len(messages)
+            ) or []:
+                messages.extend(stream_messages)
+        return [
+            (message_id, json.loads(fields[b'data']))
+            for message_id, fields in messages if fields
+        ]
+
+    def ack(self, handles):
+        if handles:
+            self.client.xack(self.stream, self.GROUP, *handles)
+            self.client.xdel(self.stream, *handles)
+
+    def dead_letter(self, items):
+        for _, entry, error in items:
+            self.client.xadd(f'{self.stream}:dead', {'data': json.dumps(entry), 'error': error})
+
+    def pending(self):
+        return self.client.xlen(self.stream)
+
+    def oldest_age(self):
+        first = self.client.xrange(self.stream, count=1)
+        if not first:
+            return None
+        millis = int(first[0][0].split(b'-')[0])
+        return max(0.0, time.time() - millis / 1000)
+
+    def _status_key(self, submission_id):
+        return f'{self.stream}:status:{submission_id}'
+
+    def set_statuses(self, statuses, timeout):
+        pipeline = self.client.pipeline(transaction=False)
+        for submission_id, data in statuses.items():
+            pipeline.set(self._status_key(submission_id), json.dumps(data), ex=timeout)
+        pipeline.execute()
+
+    def get_status(self, submission_id, timeout):
+        data = self.client.get(self._status_key(submission_id))
+        return json.loads(data) if data else None
+
+    def prune_statuses(self, timeout):
+        # Kalitlar muddati Redis tomonidan o'chiriladi
+        pass
+
+    def add_stats(self, counters, values):
+        key = f'{self.stream}:stats'
+        pipeline = self.client.pipeline(transaction=False)
+        for name, value in counters.items():
+            pipeline.hincrby(key, name, value)
+        if values:
+            pipeline.hset(key, mapping=values)
+        pipeline.execute()
+
+    def stats(self):
+        stats = {
+            name.decode(): value.decode()
+            for name, value in self.client.hgetall(f'{self.stream}:stats').items()
+        }
+        for name, value in stats.items():
+            if name in STATS_COUNTERS or name == 'last_batch':
+                stats[name] = int(value)
+        return stats
+
+
+def get_queue():
+    """
+    Jarayon uchun bitta navbat obyekti: Redis klienti (ulanishlar puli) har so'rovda qayta yaratilmaydi.
+    """
+    if _setting('PRICE_INGESTION_BACKEND', 'file') == 'redis':
+        config = (
+            'redis',
+            _setting('PRICE_INGESTION_REDIS_URL', 'redis://127.0.0.1:6379/2'),
+            _setting('PRICE_INGESTION_STREAM', 'price_submissions'),
+        )
+    else:
+        config = ('file', str(_setting('PRICE_INGESTION_DIR', settings.BASE_DIR / 'ingestion')))
+    queue = _queues.get(config)
+    if queue is None:
+        queue = RedisStreamQueue(*config[1:]) if config[0] == 'redis' else FileQueue(config[1])
+        _queues[config] = queue
+    return queue
+
+
+# --- Yozish tomoni ---
+
+def is_overloaded(queue=None):
+    """
+    Back-pressure: navbatda PRICE_INGESTION_MAX_PENDING dan ko'p yozuv bo'lsa True.
+    """
+    queue = queue or get_queue()
+    return queue.pending() >= _setting('PRICE_INGESTION_MAX_PENDING', 50000)
+
+
+def enqueue_price(employee, tochka_product, period, price, status):
+    """
+    Narxni navbatga qo'yish. Bazaga yozilmaydi, submission id qaytadi.
+    """
+    submission_id = uuid.uuid4().hex
+    queue = get_queue()
+    queue.append({
+        'id': submission_id,
+        'employee_id': employee.id,
+        'tochka_product_id': tochka_product.id,
+        'period_id': period.id,
+        'price': price,
+        'status': status,
+        'queued_at': timezone.now().isoformat(),
+    })
+    queue.set_statuses({submission_id: {'state': STATUS_QUEUED}}, _status_timeout())
+    schedule_drain()
+    return submission_id
+
+
+def schedule_drain():
+    """
+    Navbatni bo'shatish taskini (bir necha soniyada bir martadan ko'p emas) yuborish.
+    """
+    delay = _setting('PRICE_INGESTION_DRAIN_DELAY', 2)
+    if not cache.add(DRAIN_SCHEDULED_KEY, True, delay + 30):
+        return
+    from apps.form.tasks import drain_price_ingestion_task
+
+    try:
+        drain_price_ingestion_task.apply_async(countdown=delay)
+    except Exception as e:
+        cache.delete(DRAIN_SCHEDULED_KEY)
+        logger.error(f"Navbat taskini yuborishda xatolik: {e}")
+
+
+def get_status(submission_id):
+    """
+    Holat navbat backendida saqlanadi: drain Celery ishlovchisida, so'rov esa web jarayonda
+    bo'lsa ham (kesh umumiy bo'lmasa ham) ko'rinadi.
+    """
+    return get_queue().get_status(submission_id, _status_timeout())
+
+
+# --- O'qish (consumer) tomoni ---
+
+
+def _save_batch(batch):
+    """
+    Partiyani yozish. Xato bo'lsa partiya ikkiga bo'linib qayta yoziladi, shunda bitta buzuq
+    yozuv butun partiyani to'xtatmaydi: u dead-letter ga tushadi, qolganlari yoziladi.
+
+    :param batch: [(handle, entry), ...]
+    :return: (save_prices natijalari, [(handle, entry, xato matni), ...])
+    """
+    try:
+        return save_prices([entry for _, entry in batch]), []
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception as e:
+        if len(batch) == 1:
+            handle, entry = batch[0]
+            logger.error(f"Navbat yozuvini saqlab bo'lmadi ({entry.get('id')}): {e}")
+            return {}, [(handle, entry, str(e))]
+
+    middle = len(batch) // 2
+    results, dead = _save_batch(batch[:middle])
+    tail_results, tail_dead = _save_batch(batch[middle:])
+    results.update(tail_results)
+    return results, dead + tail_dead
+
+
+def drain(batch_size=None, max_batches=None):
+    """
+    Navbatdagi narxlarni partiyalab bazaga yozish. Saqlab bo'lmagan yozuvlar dead-letter ga
+    o'tkaziladi va ack qilinadi, holati 'failed' bo'ladi.
+
+    :return: yozilgan yozuvlar soni
+    """
+    batch_size = batch_size or _setting('PRICE_INGESTION_BATCH_SIZE', 500)
+    max_batches = max_batches or _setting('PRICE_INGESTION_MAX_BATCHES', 100)
+    cache.delete(DRAIN_SCHEDULED_KEY)
+    owner = job_lock.acquire(DRAIN_LOCK_NAME, 60 * 10)
+    if owner is None:
+        return 0
+
+    queue = get_queue()
+    total = 0
+    try:
+        queue.prune_statuses(_status_timeout())
+        for _ in range(max_batches):
+            batch = queue.read(batch_size)
+            if not batch:
+                break
+            results, dead = _save_batch(batch)
+            dead_handles = {handle for handle, _, _ in dead}
+
+            statuses = {}
+            persisted = failed = 0
+            for handle, entry in batch:
+                if handle in dead_handles:
+                    statuses[entry.get('id')] = {
+                        'state': STATUS_FAILED,
+                        'errors': ["Narxni saqlashda xatolik."],
+                    }
+                    failed += 1
+                    continue
+                history = results.get((entry['tochka_product_id'], entry['period_id']))
+                if history is None:
+                    statuses[entry['id']] = {
+                        'state': STATUS_FAILED,
+                        'errors': ["Rasta mahsuloti topilmadi."],
+                    }
+                    failed += 1
+                else:
+                    statuses[entry['id']] = {
+                        'state': STATUS_PERSISTED,
+                        'history_id': history.id,
+                        'price': history.price,
+                    }
+                    persisted += 1
+            queue.set_statuses(statuses, _status_timeout())
+            if dead:
+                queue.dead_letter(dead)
+            queue.ack([handle for handle, _ in batch])
+            total += len(batch)
+
+            queue.add_stats(
+                {'persisted_total': persisted, 'failed_total': failed, 'dead_letter_total': len(dead)},
+                {'last_batch': len(batch), 'last_drain_at': timezone.now().isoformat()},
+            )
+    finally:
+        job_lock.release(DRAIN_LOCK_NAME, owner)
+    return total
+
+
+def queue_stats(queue=None):
+    """
+    Back-pressure ko'rsatkichlari: navbat uzunligi, eng eski yozuv yoshi, oxirgi bo'shatish.
+    """
+    queue = queue or get_queue()
+    pending = queue.pending()
+    oldest_age = queue.oldest_age()
+    return {
+        'mode': _setting('PRICE_INGESTION_MODE', 'sync'),
+        'pending': pending,
+        'max_pending': _setting('PRICE_INGESTION_MAX_PENDING', 50000),
+        'oldest_age_seconds': round(oldest_age, 1) if oldest_age is not None else None,
+        **queue.stats(),
+    }
@@ -0,0 +1,181 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.form.models import Application, TochkaProduct
+from apps.form.signals import activation_changed
+from apps.home.models import Tochka, NTochka
+
+logger = logging.getLogger(__name__)
+
+RESULT_APPROVED = 'approved'
+RESULT_REJECTED = 'rejected'
+RESULT_ALREADY_CHECKED = 'already_checked'
+RESULT_NOT_FOUND = 'not_found'
+
+
+def _related_ids(through, field, application_ids):
+    """
+    M2M bog'lanishlarni bitta so'rovda olish: {application_id: [id, ...]}
+    """
+    related = {}
+    rows = through.objects.filter(application_id__in=application_ids).values_list('application_id', field)
+    for application_id, related_id in rows:
+        related.setdefault(application_id, []).append(related_id)
+    return related
+
+
+def _open_rasta_products(products, now):
+    """
+    Ochilgan rastalarning arizadagi mahsulotlarini (narx, miqdor) upsert qilish.
+    (product, ntochka) bo'yicha unique cheklov yo'q, shuning uchun mavjudlari bitta so'rovda
+    olinib bitta bulk_update, yangilari bitta bulk_create bilan yoziladi.
+
+    :param products: {(product_id, ntochka_id): arizadagi mahsulot dict}
+    """
+    hudud_ids = dict(
+        NTochka.objects.filter(id__in={ntochka_id for _, ntochka_id in products}).values_list('id', 'hudud_id')
+    )
+    existing = {
+        (tochka_product.product_id, tochka_product.ntochka_id): tochka_product
+        for tochka_product in TochkaProduct.objects.filter(
+            ntochka_id__in=hudud_ids.keys(),
+            product_id__in={product_id for product_id, _ in products},
+        )
+    }
+
+    to_create, to_update = [], []
+    for (product_id, ntochka_id), product_data in products.items():
+        if ntochka_id not in hudud_ids:
+            continue
+        values = {
+            'is_active': True,
+            'last_price': product_data.get('price') or 0,
+            'miqdor': product_data.get('miqdor') or 0,
+        }
+        tochka_product = existing.get((product_id, ntochka_id))
+        if tochka_product is None:
+            to_create.append(TochkaProduct(
+                product_id=product_id,
+                ntochka_id=ntochka_id,
+                hudud_id=hudud_ids[ntochka_id],
+                is_weekly=product_data.get('is_weekly', True),
+                **values
+            ))
+            continue
+        for field, value in values.items():
+            setattr(tochka_product, field, value)
+        tochka_product.updated_at = now
+        to_update.append(tochka_product)
+
+    TochkaProduct.objects.bulk_update(to_update, ['is_active', 'last_price', 'miqdor', 'updated_at'], batch_size=500)
+    TochkaProduct.objects.bulk_create(to_create, batch_size=500)
+
+
+def moderate_applications(application_ids, approve, user, comment=None):
+    """
+    Bir nechta arizani bitta tranzaksiyada tasdiqlash yoki rad etish.
+
+    Tasdiqlashda barcha arizalardagi obyekt/rasta id lari yig'iladi va faollik
+    bir nechta `UPDATE ... WHERE id IN (...)` bilan o'zgartiriladi:
+      - for_close_rasta: rastalar va ularning mahsulotlari nofaol
+      - for_close_obyekt: obyektlar, ularning rastalari va mahsulotlari nofaol
+      - for_open_rasta / for_open_obyekt: yaratilgan rasta/obyekt faol, ochilgan rastalarning
+        arizadagi mahsulotlari (narx, miqdor) bitta bulk upsert bilan yoziladi
+
+    :param application_ids: Application id lari
+    :param approve: True - tasdiqlash, False - rad etish
+    :param user: tekshiruvchi (auth.User)
+    :param comment: rad etish sababi
+    :return: har bir id uchun {'id', 'status'} (kiritilgan tartibda)
+    """
+    application_ids = list(dict.fromkeys(int(application_id) for application_id in application_ids))
+    now = timezone.now()
+
+    with transaction.atomic():
+        applications = Application.objects.select_for_update().only(
+            'id', 'application_type', 'is_checked', 'tochka_id', 'ntochka_id', 'products'
+        ).in_bulk(application_ids)
+        pending = [
+            application for application in applications.values() if not application.is_checked
+        ]
+        pending_ids = [application.id for application in pending]
+
+        close_ntochka_ids, close_tochka_ids = set(), set()
+        open_ntochka_ids, open_tochka_ids = set(), set()
+        open_products = {}
+        if approve and pending_ids:
+            ntochkas = _related_ids(Application.ntochkas.through, 'ntochka_id', pending_ids)
+            tochkas = _related_ids(Application.tochkas.through, 'tochka_id', pending_ids)
+            for application in pending:
+                application_ntochka_ids = set(ntochkas.get(application.id, []))
+                application_tochka_ids = set(tochkas.get(application.id, []))
+                if application.ntochka_id:
+                    application_ntochka_ids.add(application.ntochka_id)
+                if application.tochka_id:
+                    application_tochka_ids.add(application.tochka_id)
+
+                if application.application_type == 'for_close_rasta':
+                    close_ntochka_ids |= application_ntochka_ids
+                elif application.application_type == 'for_close_obyekt':
+                    close_tochka_ids |= application_tochka_ids
+                elif application.application_type == 'for_open_rasta':
+                    open_ntochka_ids |= application_ntochka_ids
+                    for product_data in application.products or []:
+                        product_id = product_data.get('product_id')
+                        if product_id:
+                            for ntochka_id in application_ntochka_ids:
+                                open_products[(int(product_id), ntochka_id)] = product_data
+                elif application.application_type == 'for_open_obyekt':
+                    open_tochka_ids |= application_tochka_ids
+
+        if pending_ids:
+            fields = {
+                'is_checked': True,
+                'is_active': approve,
+                'checked_by': user,
+                'checked_at': now,
+                'updated_at': now,
+            }
+            if not approve and comment:
+                fields['comment'] = f"Rad etish sababi: {comment}"[:255]
+            Application.objects.filter(id__in=pending_ids).update(**fields)
+
+        if close_ntochka_ids or close_tochka_ids:
+            NTochka.objects.filter(
+                Q(id__in=close_ntochka_ids) | Q(hudud_id__in=close_tochka_ids)
+            ).update(is_active=False, updated_at=now)
+            Tochka.objects.filter(id__in=close_tochka_ids).update(is_active=False, updated_at=now)
+            TochkaProduct.objects.filter(
+                Q(ntochka_id__in=close_ntochka_ids) | Q(hudud_id__in=close_tochka_ids)
+            ).update(is_active=False, updated_at=now)
+        if open_ntochka_ids:
+            NTochka.objects.filter(id__in=open_ntochka_ids).update(is_active=True, updated_at=now)
+        if open_products:
+            _open_rasta_products(open_products, now)
+        if open_tochka_ids:
+            Tochka.objects.filter(id__in=open_tochka_ids).update(is_active=True, updated_at=now)
+
+        tochka_ids = close_tochka_ids | open_tochka_ids
+        ntochka_ids = close_ntochka_ids | open_ntochka_ids
+        if tochka_ids or ntochka_ids:
+            activation_changed.send(sender=Application, tochka_ids=tochka_ids, ntochka_ids=ntochka_ids)
+
+    logger.info(
+        f"{len(pending_ids)} ta ariza {'tasdiqlandi' if approve else 'rad etildi'} "
+        f"({len(tochka_ids)} obyekt, {len(ntochka_ids)} rasta)"
+    )
+
+    results = []
+    for application_id in application_ids:
+        application = applications.get(application_id)
+        if application is None:
+            result = RESULT_NOT_FOUND
+        elif application.is_checked:
+            result = RESULT_ALREADY_CHECKED
+        else:
+            result = RESULT_APPROVED if approve else RESULT_REJECTED
+        results.append({'id': application_id, 'status': result})
+    return results
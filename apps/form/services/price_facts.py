@@ -0,0 +1,179 @@
+import logging
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from apps.form.models import PriceFact, TochkaProductHistory
+from apps.home.models import Tochka
+
+logger = logging.getLogger(__name__)
+
+STATUS_FIELDS = {
+    status: f'{status}_count' for status, _ in TochkaProductHistory.PRODUCT_STATUS_CHOICES
+}
+FACT_FIELDS = [
+    'count', 'price_sum', 'price_sq_sum', 'price_min', 'price_max', *STATUS_FIELDS.values(),
+]
+
+# Monitoring filtri (history lookup) -> PriceFact lookup. Boshqa filtrlar (status, xodim)
+# bo'lsa faktlar yetarli emas va xom historydan hisoblanadi.
+FACT_LOOKUPS = {
+    'hudud__district__region_id': 'district__region_id',
+    'hudud__district_id': 'district_id',
+    'period__period_id': 'period__period_id',
+    'period__date__range': 'period__date__range',
+    'product__category_id': 'product__category_id',
+    'product_id': 'product_id',
+}
+
+
+def fact_filters(filters):
+    """
+    History filtrlarini PriceFact filtrlariga o'tkazish. Imkoni bo'lmasa None.
+    """
+    if any(key not in FACT_LOOKUPS for key in filters):
+        return None
+    return {FACT_LOOKUPS[key]: value for key, value in filters.items()}
+
+
+def _aggregate(histories):
+    """
+    Faol historylarni (davr sanasi, tuman, mahsulot) bo'yicha guruhlab PriceFact obyektlari.
+    """
+    rows = histories.filter(is_active=True).order_by().values(
+        'period_id', 'hudud__district_id', 'product_id'
+    ).annotate(
+        fact_count=Count('id'),
+        fact_price_sum=Sum('price'),
+        fact_price_sq_sum=Sum(F('price') * F('price')),
+        fact_price_min=Min('price'),
+        fact_price_max=Max('price'),
+        **{
+            f'fact_{field}': Count('id', filter=Q(status=status))
+            for status, field in STATUS_FIELDS.items()
+        }
+    )
+    return [
+        PriceFact(
+            period_id=row['period_id'],
+            district_id=row['hudud__district_id'],
+            product_id=row['product_id'],
+            **{field: row[f'fact_{field}'] for field in FACT_FIELDS}
+        )
+        for row in rows
+    ]
+
+
+def _upsert(facts):
+    connection = connections[router.db_for_write(PriceFact)]
+    if connection.features.supports_update_conflicts_with_target:
+        PriceFact.objects.bulk_create(
+            facts,
+            update_conflicts=True,
+            unique_fields=['period', 'district', 'product'],
+            update_fields=FACT_FIELDS + ['updated_at'],
+        )
+        return
+    for fact in facts:
+        PriceFact.objects.update_or_create(
+            period_id=fact.period_id,
+            district_id=fact.district_id,
+            product_id=fact.product_id,
+            defaults={field: getattr(fact, field) for field in FACT_FIELDS},
+        )
+
+
+def _lock_keys(keys):
+    """
+    Fakt qatorlarini (yo'q bo'lsa bo'sh holda yaratib) qulflash. Bir xil kalitni yangilayotgan
+    parallel tranzaksiya birinchisi tugaguncha kutadi va keyin uning historysini ham ko'radi.
+    Deadlock bo'lmasligi uchun kalitlar doim bir xil tartibda qulflanadi.
+    """
+    placeholders = [
+        PriceFact(period_id=period_id, district_id=district_id, product_id=product_id)
+        for period_id, district_id, product_id in sorted(keys)
+    ]
+    connection = connections[router.db_for_write(PriceFact)]
+    if connection.features.supports_update_conflicts_with_target:
+        PriceFact.objects.bulk_create(
+            placeholders,
+            update_conflicts=True,
+            unique_fields=['period', 'district', 'product'],
+            update_fields=['updated_at'],
+        )
+        return
+    for fact in placeholders:
+        PriceFact.objects.select_for_update().get_or_create(
+            period_id=fact.period_id, district_id=fact.district_id, product_id=fact.product_id
+        )
+
+
+def refresh_facts(keys):
+    """
+    Berilgan (period_id, district_id, product_id) kalitlari uchun faktlarni xom historydan
+    qayta hisoblash. Faol history qolmagan kalitlarning fakti o'chiriladi.
+
+    Kalitlar qulflanadi, so'ng bitta guruhlangan so'rov (kalitlar ustma-ust to'plami
+    bo'yicha) va faqat berilgan kalitlar uchun bitta upsert.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    period_ids, district_ids, product_ids = (set(column) for column in zip(*keys))
+    with transaction.atomic(savepoint=False):
+        _lock_keys(keys)
+        facts = _aggregate(
+            TochkaProductHistory.objects.filter(
+                period_id__in=period_ids,
+                product_id__in=product_ids,
+                hudud__district_id__in=district_ids,
+            )
+        )
+        # Ustma-ust to'plamda qulflanmagan kalitlar ham bo'ladi, ularga tegilmaydi
+        facts = [fact for fact in facts if (fact.period_id, fact.district_id, fact.product_id) in keys]
+        if facts:
+            _upsert(facts)
+        missing = keys - {(fact.period_id, fact.district_id, fact.product_id) for fact in facts}
+        if missing:
+            PriceFact.objects.filter(reduce(or_, (
+                Q(period_id=period_id, district_id=district_id, product_id=product_id)
+                for period_id, district_id, product_id in missing
+            ))).delete()
+
+
+def refresh_for_histories(histories):
+    """
+    O'zgargan historylarga tegishli faktlarni yangilash (histories_changed receiveri).
+    """
+    hudud_ids = {history.hudud_id for history in histories}
+    districts = dict(Tochka.objects.filter(id__in=hudud_ids).order_by().values_list('id', 'district_id'))
+    refresh_facts({
+        (history.period_id, districts[history.hudud_id], history.product_id)
+        for history in histories if history.hudud_id in districts
+    })
+
+
+def rebuild_facts(period_ids=None, stdout=None):
+    """
+    Faktlarni to'liq qayta qurish (backfill). Har bir davr sanasi alohida tranzaksiyada.
+
+    :param period_ids: PeriodDate id lari, berilmasa historysi bor barcha davrlar
+    :return: yozilgan faktlar soni
+    """
+    if period_ids is None:
+        period_ids = list(
+            TochkaProductHistory.objects.order_by().values_list('period_id', flat=True).distinct()
+        )
+    total = 0
+    for period_id in sorted(period_ids):
+        facts = _aggregate(TochkaProductHistory.objects.filter(period_id=period_id))
+        with transaction.atomic():
+            PriceFact.objects.filter(period_id=period_id).delete()
+            PriceFact.objects.bulk_create(facts, batch_size=1000)
+        total += len(facts)
+        logger.info(f"Davr sanasi {period_id}: {len(facts)} ta narx fakti qayta qurildi")
+        if stdout is not None:
+            stdout.write(f"Davr sanasi {period_id}: {len(facts)} ta fakt")
+    return total
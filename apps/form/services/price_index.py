@@ -0,0 +1,228 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from apps.common.services.delayed_job import DelayedJob
+from apps.form.models import PriceIndex, TochkaProductHistory
+from apps.home.models import PeriodDate
+from apps.home.services.period_calendar import normalize_period_type
+
+logger = logging.getLogger(__name__)
+
+_job = DelayedJob(
+    'price_index', 'apps.form.tasks.build_price_index_task',
+    delay_setting='PRICE_INDEX_DELAY',
+    lock_timeout_setting='PRICE_INDEX_LOCK_TIMEOUT',
+    title="Narx indeksi",
+)
+
+COLUMNS = ['period_id', 'tochka_product_id', 'price', 'product_id', 'weight', 'district_id', 'region_id']
+# Daraja -> guruhlash kalitlari (tuman qatorida viloyati ham saqlanadi)
+LEVELS = (
+    ('district', ['region_id', 'district_id']),
+    ('region', ['region_id']),
+    ('country', []),
+)
+
+
+def _matched_relatives(period_date_id, previous_id):
+    """
+    Ikki sananing indeks mahsulotlari narxlari bitta so'rovda; ikkalasida ham narxi bor
+    rasta mahsulotlari juftlanadi va narx nisbatining logarifmi olinadi. Shubhali narxlar
+    faqat tekshirilgan (is_checked) bo'lsa qatnashadi.
+    """
+    records = list(
+        TochkaProductHistory.objects.filter(
+            Q(is_outlier=False) | Q(is_checked=True),
+            period_id__in=[previous_id, period_date_id],
+            is_active=True,
+            price__gt=0,
+            product__is_index=True,
+        ).order_by().values_list(
+            'period_id', 'tochka_product_id', 'price', 'product_id', 'product__index_weight',
+            'hudud__district_id', 'hudud__district__region_id',
+        )
+    )
+    if not records:
+        return None
+    frame = pd.DataFrame.from_records(records, columns=COLUMNS).astype({'price': np.float64})
+    current = frame[frame['period_id'] == period_date_id]
+    previous = frame.loc[frame['period_id'] == previous_id, ['tochka_product_id', 'price']]
+    matched = current.merge(previous, on='tochka_product_id', suffixes=('', '_previous'))
+    if matched.empty:
+        return None
+    matched['log_relative'] = np.log(matched['price'].to_numpy() / matched['price_previous'].to_numpy())
+    return matched
+
+
+def _level_frames(matched, keys):
+    """
+    Bitta daraja uchun: mahsulotlar bo'yicha Jevons (log nisbatlar o'rtachasining eksponentasi)
+    va barcha mahsulotlar bo'yicha vaznli o'rta arifmetik (Laspeyres).
+    """
+    products = matched.groupby(['product_id'] + keys, sort=False).agg(
+        log_relative=('log_relative', 'mean'),
+        count=('log_relative', 'size'),
+        weight=('weight', 'first'),
+    ).reset_index()
+    products['relative'] = np.exp(products['log_relative'].to_numpy())
+
+    weighted = products[products['weight'] > 0].copy()
+    weighted['weighted'] = weighted['weight'] * weighted['relative']
+    if keys:
+        totals = weighted.groupby(keys, sort=False).agg(
+            weighted=('weighted', 'sum'), weight=('weight', 'sum'), count=('product_id', 'size'),
+        ).reset_index()
+    else:
+        totals = pd.DataFrame([{
+            'weighted': weighted['weighted'].sum(), 'weight': weighted['weight'].sum(), 'count': len(weighted),
+        }]) if len(weighted) else pd.DataFrame(columns=['weighted', 'weight', 'count'])
+    totals['relative'] = totals['weighted'] / totals['weight']
+    return products, totals
+
+
+def _rows(period_date, previous_id, matched):
+    rows = []
+    for level, keys in LEVELS:
+        products, totals = _level_frames(matched, keys)
+        for frame, by_product in ((products, True), (totals, False)):
+            for values in frame.to_dict('records'):
+                rows.append(PriceIndex(
+                    period_id=period_date.id,
+                    previous_id=previous_id,
+                    date=period_date.date,
+                    level=level,
+                    region_id=int(values['region_id']) if 'region_id' in keys else None,
+                    district_id=int(values['district_id']) if 'district_id' in keys else None,
+                    product_id=int(values['product_id']) if by_product else None,
+                    relative=float(values['relative']),
+                    count=int(values['count']),
+                ))
+    return rows
+
+
+def _with_neighbours(period_date_id):
+    """
+    PeriodDate va shu turdagi (sana, id bo'yicha) oldingi/keyingi sana id lari bitta so'rovda.
+    Jarayon kalendari ishlatilmaydi: LocMemCache da ishchi yangi sanalarni ko'rmasligi mumkin.
+
+    :return: PeriodDate (previous_id, following_id annotatsiyalari bilan) yoki None
+    """
+    same_type = PeriodDate.objects.filter(period__period_type=OuterRef('period__period_type'))
+    previous = same_type.filter(
+        Q(date__lt=OuterRef('date')) | Q(date=OuterRef('date'), id__lt=OuterRef('id'))
+    ).order_by('-date', '-id').values('id')[:1]
+    following = same_type.filter(
+        Q(date__gt=OuterRef('date')) | Q(date=OuterRef('date'), id__gt=OuterRef('id'))
+    ).order_by('date', 'id').values('id')[:1]
+    return PeriodDate.objects.annotate(
+        previous_id=Subquery(previous), following_id=Subquery(following)
+    ).filter(id=period_date_id).first()
+
+
+def build_period(period_date_id, period_date=None):
+    """
+    Davr sanasining indeks bo'g'inlarini (shu turdagi oldingi sanaga nisbatan) qayta yozish.
+    Oldingi sanasi yo'q (bazaviy) sana uchun qator bo'lmaydi.
+
+    :param period_date: _with_neighbours natijasi (berilmasa bazadan olinadi)
+    :return: yozilgan qatorlar soni
+    """
+    if period_date is None:
+        period_date = _with_neighbours(period_date_id)
+    if period_date is None:
+        return 0
+    rows = []
+    if period_date.previous_id is not None:
+        matched = _matched_relatives(period_date_id, period_date.previous_id)
+        if matched is not None:
+            rows = _rows(period_date, period_date.previous_id, matched)
+
+    with transaction.atomic():
+        PriceIndex.objects.filter(period_id=period_date_id).delete()
+        PriceIndex.objects.bulk_create(rows, batch_size=1000)
+    logger.info(f"Davr sanasi {period_date_id}: {len(rows)} ta narx indeksi bo'g'ini yozildi")
+    return len(rows)
+
+
+def _build_with_following(period_date_id):
+    period_date = _with_neighbours(period_date_id)
+    total = build_period(period_date_id, period_date)
+    if period_date is not None and period_date.following_id is not None:
+        total += build_period(period_date.following_id)
+    return total
+
+
+def refresh_period(period_date_id):
+    """
+    Task uchun: sananing o'z bo'g'ini va uning narxlariga tayanadigan keyingi sana bo'g'ini
+    qayta hisoblanadi (kechikib kiritilgan narxlar ham shu yo'l bilan hisobga olinadi).
+
+    :return: yozilgan qatorlar soni yoki None (boshqa ishchi band)
+    """
+    return _job.run(period_date_id, _build_with_following)
+
+
+def schedule_refresh(period_date_id):
+    """
+    Indeksni qayta hisoblash taskini PRICE_INDEX_DELAY soniyadan keyin yuborish (DelayedJob.schedule).
+    """
+    _job.schedule(period_date_id)
+
+
+def rebuild_index(period_ids=None, stdout=None):
+    """
+    Indeks bo'g'inlarini to'liq qayta hisoblash (backfill), har bir davr sanasi alohida.
+
+    :return: yozilgan qatorlar soni
+    """
+    if period_ids is None:
+        period_ids = list(
+            TochkaProductHistory.objects.order_by().values_list('period_id', flat=True).distinct()
+        )
+    total = 0
+    for period_id in sorted(period_ids):
+        written = build_period(period_id)
+        total += written
+        if stdout is not None:
+            stdout.write(f"Davr sanasi {period_id}: {written} ta qator")
+    return total
+
+
+def get_index(level='country', region_id=None, district_id=None, product_id=None,
+              period_type='weekly', date_from=None, date_to=None):
+    """
+    Indeks qatori: bo'g'inlar sana bo'yicha ko'paytiriladi, birinchi bo'g'inning oldingi sanasi
+    baza (100). Bo'g'ini yo'q sanalar o'tkazib yuboriladi (o'zgarishsiz deb olinadi).
+
+    :param product_id: berilmasa barcha indeks mahsulotlari (Laspeyres)
+    :return: {'labels': [...], 'index': [...], 'relative': [...], 'count': [...]}
+    """
+    queryset = PriceIndex.objects.filter(
+        level=level,
+        product_id=product_id,
+        period__period__period_type=normalize_period_type(period_type),
+    )
+    if level == 'district':
+        queryset = queryset.filter(district_id=district_id)
+    elif level == 'region':
+        queryset = queryset.filter(region_id=region_id)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+
+    rows = list(queryset.order_by('date', 'period_id').values_list('previous__date', 'date', 'relative', 'count'))
+    if not rows:
+        return {'labels': [], 'index': [], 'relative': [], 'count': []}
+    base_date, dates, relatives, counts = zip(*rows)
+    levels = np.cumprod(np.asarray(relatives, dtype=np.float64)) * 100
+    return {
+        'labels': [date.strftime('%Y-%m-%d') for date in (base_date[0],) + dates],
+        'index': [100.0] + [round(float(value), 4) for value in levels],
+        'relative': [None] + [float(value) for value in relatives],
+        'count': [None] + list(counts),
+    }
@@ -0,0 +1,261 @@
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.services.delayed_job import DelayedJob
+from apps.common.services.result_cache import invalidate_periods
+from apps.form.models import PriceFact, TochkaProductHistory
+from apps.form.services import price_index
+
+logger = logging.getLogger(__name__)
+
+_job = DelayedJob(
+    'price_outliers', 'apps.form.tasks.flag_price_outliers_task',
+    delay_setting='PRICE_OUTLIER_DELAY',
+    lock_timeout_setting='PRICE_OUTLIER_LOCK_TIMEOUT',
+    title="Shubhali narxlarni tekshirish",
+)
+
+# MAD ni normal taqsimotdagi standart og'ishga o'tkazish koeffitsienti
+MAD_SCALE = 1.4826
+ROBUST_FIELDS = [
+    'price_median', 'price_mad', 'price_p25', 'price_p75', 'outlier_count', 'clean_count', 'clean_sum',
+]
+UPDATE_CHUNK = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _group_bounds(groups):
+    """
+    Saralangan guruh raqamlari massividan har bir guruhning boshlanishi va uzunligi.
+    """
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    return starts, np.diff(np.r_[starts, groups.size])
+
+
+def _group_quantile(values, starts, counts, q):
+    """
+    Guruh ichida o'sish tartibida saralangan values dan har bir guruhning q-kvantili
+    (np.quantile ning 'linear' usuli bilan bir xil), sikl ishlatmasdan.
+    """
+    position = starts + q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def robust_stats(products, districts, prices):
+    """
+    (mahsulot, tuman) guruhlari bo'yicha mediana, MAD va 25/75 kvantillar.
+
+    :return: (guruh raqamlari - kirish tartibida, guruhlar lug'ati: product, district, count,
+              median, mad, p25, p75 massivlari)
+    """
+    order = np.lexsort((prices, districts, products))
+    sorted_products, sorted_districts, values = products[order], districts[order], prices[order]
+    boundary = np.r_[True, (sorted_products[1:] != sorted_products[:-1]) | (sorted_districts[1:] != sorted_districts[:-1])]
+    sorted_groups = np.cumsum(boundary) - 1
+    starts, counts = _group_bounds(sorted_groups)
+
+    median = _group_quantile(values, starts, counts, 0.5)
+    deviations = np.abs(values - median[sorted_groups])
+    # Og'ishlar guruh ichida qayta saralanadi (guruhlar tartibi o'zgarmaydi)
+    deviations = deviations[np.lexsort((deviations, sorted_groups))]
+
+    groups = np.empty_like(sorted_groups)
+    groups[order] = sorted_groups
+    return groups, {
+        'product': sorted_products[starts],
+        'district': sorted_districts[starts],
+        'count': counts,
+        'median': median,
+        'mad': _group_quantile(deviations, starts, counts, 0.5),
+        'p25': _group_quantile(values, starts, counts, 0.25),
+        'p75': _group_quantile(values, starts, counts, 0.75),
+    }
+
+
+def bands(stats):
+    """
+    Guruhlar uchun ruxsat etilgan narx oralig'i: IQR (Tukey) yoki MAD chegarasidan chiqqan narx
+    shubhali, lekin medianadan PRICE_OUTLIER_MIN_SPREAD ulushgacha farq hech qachon shubhali emas
+    (narxlarning ko'pi bir xil bo'lsa IQR va MAD nolga teng bo'ladi).
+    Kichik guruhlar (PRICE_OUTLIER_MIN_GROUP dan kam) uchun oraliq cheksiz.
+
+    :return: (quyi, yuqori) massivlari
+    """
+    median = stats['median']
+    iqr = stats['p75'] - stats['p25']
+    iqr_k = _setting('PRICE_OUTLIER_IQR_K', 3.0)
+    mad_width = _setting('PRICE_OUTLIER_MAD_Z', 3.5) * MAD_SCALE * stats['mad']
+    spread = _setting('PRICE_OUTLIER_MIN_SPREAD', 0.2) * median
+
+    lower = np.minimum(np.maximum(stats['p25'] - iqr_k * iqr, median - mad_width), median - spread)
+    upper = np.maximum(np.minimum(stats['p75'] + iqr_k * iqr, median + mad_width), median + spread)
+    small = stats['count'] < _setting('PRICE_OUTLIER_MIN_GROUP', 5)
+    lower[small] = -np.inf
+    upper[small] = np.inf
+    return lower, upper
+
+
+def classify(prices, groups, lower, upper, tops, bottoms):
+    """
+    Har bir narx uchun shubha sababi ('' - shubhasiz). Mahsulot chegaralari (top/bottom,
+    0 - belgilanmagan) guruh oralig'idan ustun. Musbat bo'lmagan narxlar belgilanmaydi.
+    """
+    reasons = np.full(prices.size, '', dtype='<U6')
+    reasons[prices > upper[groups]] = 'high'
+    reasons[prices < lower[groups]] = 'low'
+    reasons[(tops > 0) & (prices > tops)] = 'top'
+    reasons[(bottoms > 0) & (prices < bottoms)] = 'bottom'
+    reasons[prices <= 0] = ''
+    return reasons
+
+
+def _write_flags(ids, reasons, current_reasons, current_flags):
+    """
+    Faqat o'zgargan historylarni sabab bo'yicha guruhlab UPDATE qilish (post_save chaqirilmaydi).
+
+    :return: o'zgargan qatorlar soni
+    """
+    changed = (reasons != current_reasons) | (current_flags != (reasons != ''))
+    for reason in np.unique(reasons[changed]).tolist():
+        reason_ids = ids[changed & (reasons == reason)].tolist()
+        for start in range(0, len(reason_ids), UPDATE_CHUNK):
+            TochkaProductHistory.objects.filter(id__in=reason_ids[start:start + UPDATE_CHUNK]).update(
+                is_outlier=bool(reason), outlier_reason=reason
+            )
+    return int(changed.sum())
+
+
+def _computed_stats(stats, clean_counts, clean_sums):
+    """
+    Guruhlar massivlaridan {(district_id, product_id): PriceFact barqaror ustunlari}.
+    """
+    return {
+        (district, product): dict(zip(ROBUST_FIELDS, values))
+        for district, product, *values in zip(
+            stats['district'].tolist(), stats['product'].tolist(), stats['median'].tolist(),
+            stats['mad'].tolist(), stats['p25'].tolist(), stats['p75'].tolist(),
+            (stats['count'] - clean_counts).tolist(), clean_counts.tolist(), clean_sums.tolist(),
+        )
+    }
+
+
+def _write_stats(period_date_id, computed):
+    """
+    PriceFact barqaror ustunlarini yangilash: faqat qiymati o'zgargan faktlar, bitta bulk_update.
+    Musbat narxi yo'q faktlarning ustunlari bo'shatiladi.
+
+    :return: yangilangan faktlar soni
+    """
+    empty = dict(zip(ROBUST_FIELDS, [None, None, None, None, 0, 0, 0.0]))
+    facts = []
+    for row in PriceFact.objects.filter(period_id=period_date_id).values('id', 'district_id', 'product_id', *ROBUST_FIELDS):
+        values = computed.get((row['district_id'], row['product_id']), empty)
+        if any(row[field] != values[field] for field in ROBUST_FIELDS):
+            facts.append(PriceFact(id=row['id'], **values))
+    now = timezone.now()
+    for fact in facts:
+        fact.updated_at = now
+    # updated_at yopiq davr natijalari keshi kalitiga kiradi (result_cache._data_stamp)
+    PriceFact.objects.bulk_update(facts, ROBUST_FIELDS + ['updated_at'], batch_size=500)
+    return len(facts)
+
+
+def flag_period(period_date_id):
+    """
+    Davr sanasining faol narxlarini bitta ustunli o'qish bilan olib, (mahsulot, tuman)
+    bo'yicha barqaror ko'rsatkichlarni NumPy da hisoblash, shubhali narxlarni belgilash va
+    natijani bir necha guruhli UPDATE bilan yozish.
+
+    :return: belgisi o'zgargan historylar soni
+    """
+    rows = list(
+        TochkaProductHistory.objects.filter(period_id=period_date_id, is_active=True).order_by().values_list(
+            'id', 'price', 'product_id', 'hudud__district_id', 'product__top', 'product__bottom',
+            'is_outlier', 'outlier_reason',
+        )
+    )
+    flagged = changed = 0
+    computed = {}
+    with transaction.atomic():
+        if rows:
+            ids, prices, products, districts, tops, bottoms, flags, current = (
+                np.asarray(column) for column in zip(*rows)
+            )
+            prices = prices.astype(np.float64)
+            reasons = np.full(prices.size, '', dtype='<U6')
+            positive = prices > 0
+            if positive.any():
+                groups, stats = robust_stats(products[positive], districts[positive], prices[positive])
+                lower, upper = bands(stats)
+                reasons[positive] = classify(prices[positive], groups, lower, upper, tops[positive], bottoms[positive])
+                clean = reasons[positive] == ''
+                size = stats['count'].size
+                computed = _computed_stats(
+                    stats,
+                    np.bincount(groups, weights=clean, minlength=size).astype(np.int64),
+                    np.bincount(groups, weights=prices[positive] * clean, minlength=size),
+                )
+            flagged = int((reasons != '').sum())
+            changed = _write_flags(ids, reasons, current.astype('<U6'), flags.astype(bool))
+        # Nofaol qilingan historylar navbatdan chiqadi
+        TochkaProductHistory.objects.filter(period_id=period_date_id, is_active=False, is_outlier=True).update(
+            is_outlier=False, outlier_reason=''
+        )
+        updated = _write_stats(period_date_id, computed)
+    # Dashboard mediana/shubhali narxlar sonini ham ko'rsatadi
+    invalidate_periods([period_date_id])
+    logger.info(
+        f"Davr sanasi {period_date_id}: {flagged} ta shubhali narx, "
+        f"{changed} ta belgi o'zgardi, {updated} ta fakt yangilandi"
+    )
+    return changed
+
+
+def refresh_period(period_date_id):
+    """
+    Task uchun: bir davr sanasini bir vaqtda faqat bitta ishchi tekshiradi (bazadagi qulf).
+
+    :return: belgisi o'zgargan historylar soni yoki None (boshqa ishchi band)
+    """
+    changed = _job.run(period_date_id, flag_period)
+    if changed is None:
+        return None
+    # Indeks shubhali narxlarsiz hisoblanadi, shuning uchun belgilashdan keyin
+    price_index.schedule_refresh(period_date_id)
+    return changed
+
+
+def schedule_refresh(period_date_id):
+    """
+    Tekshirish taskini PRICE_OUTLIER_DELAY soniyadan keyin yuborish (DelayedJob.schedule).
+    """
+    _job.schedule(period_date_id)
+
+
+def rebuild_outliers(period_ids=None, stdout=None):
+    """
+    Barcha (yoki berilgan) davr sanalarini qayta tekshirish, masalan mahsulot chegaralari
+    o'zgarganda yoki `rebuild_price_facts` dan keyin.
+
+    :return: belgisi o'zgargan historylar soni
+    """
+    if period_ids is None:
+        period_ids = list(
+            TochkaProductHistory.objects.order_by().values_list('period_id', flat=True).distinct()
+        )
+    total = 0
+    for period_id in sorted(period_ids):
+        changed = flag_period(period_id)
+        total += changed
+        if stdout is not None:
+            stdout.write(f"Davr sanasi {period_id}: {changed} ta belgi o'zgardi")
+    return total
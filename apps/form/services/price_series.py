@@ -0,0 +1,207 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from apps.common.services.delayed_job import DelayedJob
+from apps.common.services.result_cache import invalidate_periods
+from apps.form.models import PriceSeries, TochkaProductHistory
+from apps.home.models import PeriodDate
+
+logger = logging.getLogger(__name__)
+
+_job = DelayedJob(
+    'price_series', 'apps.form.tasks.build_price_series_task',
+    delay_setting='PRICE_SERIES_DELAY',
+    lock_timeout_setting='PRICE_SERIES_LOCK_TIMEOUT',
+    title="Narx vaqt qatori",
+)
+
+QUANTILES = (0.25, 0.5, 0.75)
+VALUE_FIELDS = ('count', 'price_avg', 'price_min', 'price_max', 'price_p25', 'price_p50', 'price_p75')
+
+
+def _summarize(frame, keys):
+    """
+    keys bo'yicha guruhlab soni, o'rtacha, min, max va kvantillar (lug'atlar ro'yxati).
+    """
+    grouped = frame.groupby(keys, sort=False)['price']
+    summary = grouped.agg(['count', 'mean', 'min', 'max'])
+    quantiles = grouped.quantile(list(QUANTILES)).unstack()
+    quantiles.columns = ['p25', 'p50', 'p75']
+    return summary.join(quantiles).reset_index().to_dict('records')
+
+
+def _rows(period_date, frame):
+    """
+    Bitta davr sanasining PriceSeries qatorlari: mahsulot/kategoriya x (viloyat, respublika).
+    """
+    rows = []
+    for scope, key in (('product', 'product_id'), ('category', 'category_id')):
+        for keys in ([key, 'region_id'], [key]):
+            for values in _summarize(frame, keys):
+                rows.append(PriceSeries(
+                    period_id=period_date.id,
+                    date=period_date.date,
+                    scope=scope,
+                    product_id=int(values[key]) if scope == 'product' else None,
+                    category_id=int(values[key]) if scope == 'category' else None,
+                    region_id=int(values['region_id']) if 'region_id' in values else None,
+                    count=int(values['count']),
+                    price_avg=float(values['mean']),
+                    price_min=float(values['min']),
+                    price_max=float(values['max']),
+                    price_p25=float(values['p25']),
+                    price_p50=float(values['p50']),
+                    price_p75=float(values['p75']),
+                ))
+    return rows
+
+
+def build_period(period_date_id):
+    """
+    Davr sanasining vaqt qatori qatorlarini xom historydan qayta yozish (bitta ustunli o'qish,
+    pandas bilan guruhlash, bitta tranzaksiyada almashtirish).
+
+    :return: yozilgan qatorlar soni
+    """
+    period_date = PeriodDate.objects.filter(id=period_date_id).first()
+    if period_date is None:
+        return 0
+
+    records = list(
+        TochkaProductHistory.objects.filter(period_id=period_date_id, is_active=True).order_by().values_list(
+            'price', 'product_id', 'product__category_id', 'hudud__district__region_id'
+        )
+    )
+    rows = []
+    if records:
+        frame = pd.DataFrame.from_records(
+            records, columns=['price', 'product_id', 'category_id', 'region_id']
+        ).astype({'price': np.float64})
+        rows = _rows(period_date, frame)
+
+    with transaction.atomic():
+        PriceSeries.objects.filter(period_id=period_date_id).delete()
+        PriceSeries.objects.bulk_create(rows, batch_size=1000)
+    # Vaqt qatoridan o'qiydigan monitoring natijalari keshini eskirtirish
+    invalidate_periods([period_date_id])
+    logger.info(f"Davr sanasi {period_date_id}: {len(rows)} ta narx vaqt qatori yozildi")
+    return len(rows)
+
+
+def refresh_period(period_date_id):
+    """
+    Task uchun: bir davr sanasini bir vaqtda faqat bitta ishchi qayta quradi (bazadagi qulf).
+
+    :return: yozilgan qatorlar soni yoki None (boshqa ishchi band)
+    """
+    return _job.run(period_date_id, build_period)
+
+
+def schedule_refresh(period_date_id):
+    """
+    Ochiq davr: qayta qurish taskini PRICE_SERIES_DELAY soniyadan keyin yuborish (DelayedJob.schedule).
+    """
+    _job.schedule(period_date_id)
+
+
+def close_previous_period(period_date):
+    """
+    Yangi davr sanasi ochilganda shu turdagi oldingi sanani yakuniy qurish uchun rejalashtirish.
+    """
+    previous = PeriodDate.objects.filter(
+        period__period_type=period_date.period.period_type,
+        date__lt=period_date.date,
+    ).order_by('-date', '-id').values_list('id', flat=True).first()
+    if previous:
+        schedule_refresh(previous)
+
+
+def rebuild_series(period_ids=None, stdout=None):
+    """
+    Vaqt qatorini to'liq qayta qurish (backfill), har bir davr sanasi alohida.
+
+    :return: yozilgan qatorlar soni
+    """
+    if period_ids is None:
+        period_ids = list(
+            TochkaProductHistory.objects.order_by().values_list('period_id', flat=True).distinct()
+        )
+    total = 0
+    for period_id in sorted(period_ids):
+        written = build_period(period_id)
+        total += written
+        if stdout is not None:
+            stdout.write(f"Davr sanasi {period_id}: {written} ta qator")
+    return total
+
+
+def _downsample(rows, points):
+    """
+    Uzun oraliqni points ta ketma-ket bo'lakka bo'lish: soni yig'indi, o'rtacha soni bo'yicha
+    tortilgan, min/max chegaraviy, kvantillar soni bo'yicha tortilgan o'rtacha (taxminiy).
+    """
+    buckets = []
+    for chunk in np.array_split(np.arange(len(rows)), points):
+        part = [rows[index] for index in chunk]
+        counts = np.array([row['count'] for row in part], dtype=np.float64)
+        total = counts.sum()
+
+        def weighted(field):
+            return float(np.dot(counts, [row[field] for row in part]) / total) if total else 0.0
+
+        buckets.append({
+            'date': part[-1]['date'],
+            'count': int(total),
+            'price_avg': weighted('price_avg'),
+            'price_min': min(row['price_min'] for row in part),
+            'price_max': max(row['price_max'] for row in part),
+            'price_p25': weighted('price_p25'),
+            'price_p50': weighted('price_p50'),
+            'price_p75': weighted('price_p75'),
+        })
+    return buckets
+
+
+def get_series(product_id=None, category_id=None, region_id=None, date_from=None, date_to=None, points=None):
+    """
+    Grafik uchun vaqt qatori (sana bo'yicha). Bir sanada bir nechta davr sanasi bo'lsa
+    soni bo'yicha birlashtiriladi. points berilsa va qatorlar ko'p bo'lsa bo'laklanadi.
+
+    :return: {'labels': [...], 'count': [...], 'avg': [...], 'min': [...], 'max': [...],
+              'p25': [...], 'p50': [...], 'p75': [...]}
+    """
+    if product_id:
+        queryset = PriceSeries.objects.filter(scope='product', product_id=product_id)
+    else:
+        queryset = PriceSeries.objects.filter(scope='category', category_id=category_id)
+    if region_id:
+        queryset = queryset.filter(region_id=region_id)
+    else:
+        queryset = queryset.filter(region__isnull=True)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+
+    rows = []
+    for values in queryset.order_by('date', 'period_id').values('date', *VALUE_FIELDS):
+        if rows and rows[-1]['date'] == values['date']:
+            rows[-1] = _downsample([rows[-1], values], 1)[0]
+        else:
+            rows.append(values)
+    if points and len(rows) > points:
+        rows = _downsample(rows, points)
+
+    return {
+        'labels': [row['date'].strftime('%Y-%m-%d') for row in rows],
+        'count': [row['count'] for row in rows],
+        'avg': [row['price_avg'] for row in rows],
+        'min': [row['price_min'] for row in rows],
+        'max': [row['price_max'] for row in rows],
+        'p25': [row['price_p25'] for row in rows],
+        'p50': [row['price_p50'] for row in rows],
+        'p75': [row['price_p75'] for row in rows],
+    }
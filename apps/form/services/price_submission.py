@@ -0,0 +1,365 @@
+import logging
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.form.models import TochkaProduct, TochkaProductHistory
+from apps.form.signals import histories_changed
+
+logger = logging.getLogger(__name__)
+
+
+def save_rasta_prices(employee, ntochka, period, items):
+    """
+    Bitta rasta uchun bir nechta narxni bitta tranzaksiyada saqlash.
+
+    Historylar (tochka_product, period) bo'yicha ON CONFLICT DO UPDATE bilan yoziladi:
+    shu davrda kiritilgan narx tuzatiladi, bir xil paketning parallel qayta yuborilishi
+    IntegrityError bermaydi.
+
+    :param employee: Employee (yoki id ga ega principal)
+    :param ntochka: NTochka instance
+    :param period: PeriodDate instance
+    :param items: [{'tochka_product': id, 'price': float, 'status': str}, ...]
+    :return: har bir element uchun natija ro'yxati (kiritilgan tartibda)
+    """
+    ids = [item['tochka_product'] for item in items]
+    tochka_products = TochkaProduct.objects.in_bulk(ids)
+    # Faqat previous_price uchun: tuzatishda oldingi davr narxi saqlanib qoladi
+    entered = set(
+        TochkaProductHistory.objects.filter(
+            tochka_product_id__in=ids,
+            period=period
+        ).values_list('tochka_product_id', flat=True)
+    )
+
+    now = timezone.now()
+    results = []
+    histories = []
+    to_update = []
+    seen = set()
+
+    for item in items:
+        tochka_product_id = item['tochka_product']
+        tochka_product = tochka_products.get(tochka_product_id)
+        result = {'tochka_product': tochka_product_id}
+
+        if tochka_product is None or tochka_product.ntochka_id != ntochka.id:
+            result['errors'] = ["Rasta mahsuloti topilmadi."]
+        elif tochka_product_id in seen:
+            result['errors'] = ["Mahsulot so'rovda takrorlangan."]
+        elif item['status'] == 'sotilmayapti':
+            result['errors'] = ["Alternativ mahsulot bilan narx tochka-product-history/ orqali yuboriladi."]
+
+        seen.add(tochka_product_id)
+        results.append(result)
+        if 'errors' in result:
+            continue
+
+        history = TochkaProductHistory(
+            product_id=tochka_product.product_id,
+            ntochka_id=tochka_product.ntochka_id,
+            hudud_id=tochka_product.hudud_id,
+            tochka_product=tochka_product,
+            employee_id=employee.id,
+            period=period,
+            price=item['price'],
+            status=item['status'],
+            updated_at=now,
+        )
+        histories.append(history)
+        result['history'] = history
+
+        if tochka_product_id not in entered:
+            tochka_product.previous_price = tochka_product.last_price
+        tochka_product.last_price = item['price']
+        tochka_product.updated_at = now
+        to_update.append(tochka_product)
+
+    if histories:
+        with transaction.atomic():
+            _upsert_histories(histories)
+            missing = [history for history in histories if history.pk is None]
+            if missing:
+                saved = dict(
+                    TochkaProductHistory.objects.filter(
+                        tochka_product_id__in=[history.tochka_product_id for history in missing],
+                        period=period,
+                    ).values_list('tochka_product_id', 'id')
+                )
+                for history in missing:
+                    history.pk = saved[history.tochka_product_id]
+            TochkaProduct.objects.bulk_update(to_update, ['last_price', 'previous_price', 'updated_at'])
+            histories_changed.send(sender=TochkaProductHistory, histories=histories)
+
+    for result in results:
+        history = result.pop('history', None)
+        if history is not None:
+            result.update({'id': history.id, 'status': history.status, 'price': history.price})
+    return results
+
+
+UPSERT_FIELDS = ['price', 'status', 'employee', 'updated_at']
+ALTERNATIVE_FIELDS = ['unit_miqdor', 'unit_price', 'is_alternative', 'is_checked', 'alternative_for']
+
+
+def _upsert_histories(histories, update_fields=UPSERT_FIELDS):
+    """
+    Historylarni (tochka_product, period) bo'yicha INSERT ... ON CONFLICT DO UPDATE bilan
+    bitta so'rovda yozish. Backend buni qo'llab-quvvatlamasa har biri uchun update_or_create.
+    """
+    connection = connections[router.db_for_write(TochkaProductHistory)]
+    if connection.features.supports_update_conflicts_with_target:
+        TochkaProductHistory.objects.bulk_create(
+            histories,
+            update_conflicts=True,
+            unique_fields=['tochka_product', 'period'],
+            update_fields=update_fields,
+        )
+        return
+
+    fields = ['product', 'ntochka', 'hudud'] + list(update_fields)
+    for history in histories:
+        defaults = {}
+        for name in fields:
+            attname = TochkaProductHistory._meta.get_field(name).attname
+            defaults[attname] = getattr(history, attname)
+        saved, _ = TochkaProductHistory.objects.update_or_create(
+            tochka_product_id=history.tochka_product_id,
+            period_id=history.period_id,
+            defaults=defaults,
+        )
+        history.pk = saved.pk
+
+
+def history_data(history):
+    """
+    TochkaProductHistorySerializer bilan bir xil ko'rinishdagi javob.
+    """
+    return {
+        'id': history.id,
+        'status': history.status,
+        'hudud': history.hudud_id,
+        'ntochka': history.ntochka_id,
+        'product': history.product_id,
+        'tochka_product': history.tochka_product_id,
+        'employee': history.employee_id,
+        'period': history.period_id,
+        'price': history.price,
+        'unit_miqdor': history.unit_miqdor,
+        'unit_price': history.unit_price,
+        'is_checked': history.is_checked,
+        'is_active': history.is_active,
+    }
+
+
+def upsert_price(employee, tochka_product, period, price, status):
+    """
+    Bitta narxni (tochka_product, period) bo'yicha yozish yoki yangilash.
+
+    Xuddi shu narx va status allaqachon saqlangan bo'lsa (qayta yuborish) hech narsa
+    yozilmaydi va saqlangan yozuv qaytadi. Aks holda INSERT ... ON CONFLICT DO UPDATE
+    (qo'llab-quvvatlanmasa update_or_create) bilan yoziladi.
+
+    :return: (TochkaProductHistory, created)
+    """
+    existing = TochkaProductHistory.objects.filter(
+        tochka_product=tochka_product,
+        period=period
+    ).first()
+    if existing is not None and existing.price == price and existing.status == status:
+        return existing, False
+
+    history = TochkaProductHistory(
+        product_id=tochka_product.product_id,
+        ntochka_id=tochka_product.ntochka_id,
+        hudud_id=tochka_product.hudud_id,
+        tochka_product=tochka_product,
+        employee_id=employee.id,
+        period=period,
+        price=price,
+        status=status,
+    )
+    with transaction.atomic():
+        _upsert_histories([history])
+        if history.pk is None:
+            history = TochkaProductHistory.objects.get(tochka_product=tochka_product, period=period)
+
+        # Tuzatishda oldingi davr narxi (previous_price) saqlanib qoladi
+        if existing is None:
+            tochka_product.previous_price = tochka_product.last_price
+        tochka_product.last_price = price
+        tochka_product.updated_at = timezone.now()
+        TochkaProduct.objects.filter(pk=tochka_product.pk).update(
+            last_price=tochka_product.last_price,
+            previous_price=tochka_product.previous_price,
+            updated_at=tochka_product.updated_at,
+        )
+        histories_changed.send(sender=TochkaProductHistory, histories=[history])
+
+    if existing is not None:
+        history.is_checked = existing.is_checked
+        history.is_active = existing.is_active
+        history.unit_miqdor = existing.unit_miqdor
+        history.unit_price = existing.unit_price
+    return history, existing is None
+
+
+def save_alternative_price(employee, tochka_product, period, alternative_product_id, unit_miqdor, price, quantity):
+    """
+    'sotilmayapti' holati: asosiy mahsulot uchun 0 narxli history va rastaga alternativ
+    mahsulot narxini bitta tranzaksiyada yozish.
+
+    Ikkala TochkaProduct select_for_update bilan bitta so'rovda qulflanadi, historylar bitta
+    INSERT (ON CONFLICT DO UPDATE) va TochkaProductlar bitta UPDATE bilan yoziladi.
+
+    :param alternative_product_id: alternativ Product id
+    :param unit_miqdor: alternativ mahsulot o'lchov birligi miqdori
+    :return: asosiy mahsulot TochkaProductHistory si yoki None (rasta mahsuloti topilmadi)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        locked = list(
+            TochkaProduct.objects.select_for_update().filter(
+                Q(id=tochka_product.id) |
+                Q(ntochka_id=tochka_product.ntochka_id, product_id=alternative_product_id)
+            ).annotate(
+                has_history=Exists(
+                    TochkaProductHistory.objects.filter(tochka_product=OuterRef('pk'), period=period)
+                )
+            ).order_by('id')
+        )
+        main = next((row for row in locked if row.id == tochka_product.id), None)
+        if main is None:
+            return None
+        alternative = next((row for row in locked if row.id != main.id), None)
+        if alternative is None:
+            alternative = TochkaProduct(
+                product_id=alternative_product_id,
+                ntochka_id=main.ntochka_id,
+                hudud_id=main.hudud_id,
+            )
+            alternative.has_history = False
+            # post_save signal kerak emas, rasta histories_changed orqali yangilanadi
+            TochkaProduct.objects.bulk_create([alternative])
+
+        for row, row_price in ((alternative, price), (main, 0)):
+            # Tuzatishda oldingi davr narxi (previous_price) saqlanib qoladi
+            if not row.has_history:
+                row.previous_price = row.last_price
+            row.last_price = row_price
+            row.updated_at = now
+        alternative.is_weekly = True
+
+        alternative_history = TochkaProductHistory(
+            product_id=alternative_product_id,
+            ntochka_id=main.ntochka_id,
+            hudud_id=main.hudud_id,
+            tochka_product=alternative,
+            employee_id=employee.id,
+            period=period,
+            price=price,
+            unit_miqdor=quantity,
+            unit_price=price / quantity * unit_miqdor,
+            status='mavjud',
+            is_alternative=True,
+            is_checked=True,
+            alternative_for=main,
+        )
+        main_history = TochkaProductHistory(
+            product_id=main.product_id,
+            ntochka_id=main.ntochka_id,
+            hudud_id=main.hudud_id,
+            tochka_product=main,
+            employee_id=employee.id,
+            period=period,
+            price=0,
+            unit_miqdor=0,
+            unit_price=0,
+            status='sotilmayapti',
+        )
+        histories = [alternative_history, main_history]
+        _upsert_histories(histories, UPSERT_FIELDS + ALTERNATIVE_FIELDS)
+        TochkaProduct.objects.bulk_update(
+            [alternative, main], ['last_price', 'previous_price', 'is_weekly', 'updated_at']
+        )
+        histories_changed.send(sender=TochkaProductHistory, histories=histories)
+    return main_history
+
+
+def save_prices(entries):
+    """
+    Navbatdan kelgan narxlarni (turli rasta va xodimlar) bitta tranzaksiyada upsert qilish.
+
+    Bir (tochka_product, period) uchun bir nechta yozuv bo'lsa oxirgisi olinadi.
+
+    :param entries: [{'employee_id', 'tochka_product_id', 'period_id', 'price', 'status'}, ...]
+    :return: {(tochka_product_id, period_id): TochkaProductHistory yoki None (topilmadi)}
+    """
+    latest = {}
+    for entry in entries:
+        latest[(entry['tochka_product_id'], entry['period_id'])] = entry
+
+    tochka_products = TochkaProduct.objects.in_bulk({key[0] for key in latest})
+    existing = {
+        (history.tochka_product_id, history.period_id): history
+        for history in TochkaProductHistory.objects.filter(
+            tochka_product_id__in=tochka_products.keys(),
+            period_id__in={key[1] for key in latest},
+        )
+    }
+
+    now = timezone.now()
+    results = {}
+    to_create = []
+    to_update = []
+    changed_products = {}
+
+    for key, entry in latest.items():
+        tochka_product = tochka_products.get(key[0])
+        if tochka_product is None:
+            results[key] = None
+            continue
+
+        history = existing.get(key)
+        if history is None:
+            history = TochkaProductHistory(
+                product_id=tochka_product.product_id,
+                ntochka_id=tochka_product.ntochka_id,
+                hudud_id=tochka_product.hudud_id,
+                tochka_product=tochka_product,
+                employee_id=entry['employee_id'],
+                period_id=entry['period_id'],
+                price=entry['price'],
+                status=entry['status'],
+            )
+            to_create.append(history)
+            tochka_product.previous_price = tochka_product.last_price
+        elif history.price == entry['price'] and history.status == entry['status']:
+            results[key] = history
+            continue
+        else:
+            history.price = entry['price']
+            history.status = entry['status']
+            history.employee_id = entry['employee_id']
+            history.updated_at = now
+            to_update.append(history)
+
+        tochka_product.last_price = entry['price']
+        tochka_product.updated_at = now
+        changed_products[tochka_product.id] = tochka_product
+        results[key] = history
+
+    if to_create or to_update:
+        with transaction.atomic():
+            if to_create:
+                # Sinxron yo'l bilan parallel yozilgan bo'lsa ham xato bermaydi
+                _upsert_histories(to_create)
+            if to_update:
+                TochkaProductHistory.objects.bulk_update(to_update, UPSERT_FIELDS)
+            TochkaProduct.objects.bulk_update(
+                changed_products.values(), ['last_price', 'previous_price', 'updated_at']
+            )
+            histories_changed.send(sender=TochkaProductHistory, histories=to_create + to_update)
+    return results
@@ -0,0 +1,166 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max, Prefetch, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+
+from apps.form.models import TochkaProduct, TochkaProductHistory, TochkaProductTombstone
+
+TOKEN_SALT = 'apps.form.rasta-sync'
+
+
+def _overlap():
+    return timedelta(seconds=getattr(settings, 'RASTA_SYNC_OVERLAP', 60))
+
+
+class RastaSync:
+    """
+    Rasta mahsulotlari ro'yxati uchun ETag va `since` sinxronlash tokeni.
+
+    Holat (watermark) TochkaProduct, Product, TochkaProductHistory va o'chirilgan
+    mahsulot izlarining updated_at maksimumlari va sonlaridan uchta agregat so'rov bilan
+    olinadi, shuning uchun o'zgarmagan rasta ro'yxat querysetini qurmasdan 304 oladi.
+
+    `since` bilan javob token vaqtidan RASTA_SYNC_OVERLAP oldingi o'zgarishlarni ham qaytaradi:
+    updated_at tranzaksiya yakunidan oldin yoziladi, shuning uchun token olingan paytda hali
+    yakunlanmagan yozuvlar token vaqtidan kichik bo'lishi mumkin. Qayta berilgan qatorlarni
+    mijoz id bo'yicha almashtiradi (changed - upsert, removed - o'chirish).
+    """
+
+    def __init__(self, ntochka, period_date, period_type='weekly', product_type='1'):
+        self.ntochka = ntochka
+        self.period_date = period_date
+        self.is_weekly = period_type == 'weekly'
+        self.product_type = product_type
+        self._watermark = None
+
+    def base_query(self):
+        query = Q(ntochka=self.ntochka, is_weekly=self.is_weekly)
+        if not self.is_weekly:
+            query &= Q(product__category__product_type=self.product_type)
+        return query
+
+    def history_query(self):
+        return Q(period__period_id=self.period_date.period_id, is_active=True)
+
+    def get_queryset(self):
+        history_prefetch = Prefetch(
+            'history',
+            queryset=TochkaProductHistory.objects.filter(
+                self.history_query()
+            ).select_related('tochka_product', 'period', 'employee'),
+            to_attr='current_history'
+        )
+        return TochkaProduct.objects.filter(
+            self.base_query(),
+            is_active=True,
+        ).select_related(
+            'product',
+            'ntochka',
+            'hudud',
+            'product__category',
+            'product__unit'
+        ).prefetch_related(
+            history_prefetch
+        )
+
+    # --- Watermark ---
+
+    def watermark(self):
+        if self._watermark is None:
+            products = TochkaProduct.objects.filter(self.base_query()).aggregate(
+                tochka_product_at=Max('updated_at'),
+                product_at=Max('product__updated_at'),
+                category_at=Max('product__category__updated_at'),
+                active=Count('id', filter=Q(is_active=True)),
+            )
+            histories = TochkaProductHistory.objects.filter(
+                self.history_query(),
+                ntochka=self.ntochka,
+            ).aggregate(
+                history_at=Max('updated_at'),
+                history_count=Count('id'),
+            )
+            tombstones = TochkaProductTombstone.objects.filter(
+                ntochka_id=self.ntochka.id,
+                is_weekly=self.is_weekly,
+            ).aggregate(
+                deleted_at=Max('deleted_at'),
+            )
+            self._watermark = {**products, **histories, **tombstones}
+        return self._watermark
+
+    def updated_at(self):
+        stamps = [
+            value for key, value in self.watermark().items()
+            if key.endswith('_at') and value
+        ]
+        return max(stamps) if stamps else None
+
+    def etag(self):
+        watermark = self.watermark()
+        state = '|'.join(
+            str(part) for part in (
+                self.ntochka.id, self.period_date.id, self.is_weekly, self.product_type,
+                watermark['tochka_product_at'], watermark['product_at'], watermark['category_at'],
+                watermark['active'], watermark['history_at'], watermark['history_count'],
+                watermark['deleted_at'],
+            )
+        )
+        return quote_etag(hashlib.sha256(state.encode()).hexdigest()[:32])
+
+    # --- Token ---
+
+    def token(self):
+        updated_at = self.updated_at()
+        return signing.dumps({
+            'n': self.ntochka.id,
+            'p': self.period_date.id,
+            't': updated_at.isoformat() if updated_at else None,
+        }, salt=TOKEN_SALT)
+
+    def parse_token(self, token):
+        """
+        Tokendagi vaqtni qaytaradi. Token boshqa rasta/davrga tegishli yoki
+        yaroqsiz bo'lsa None (mijoz to'liq ro'yxatni oladi).
+        """
+        if not token:
+            return None
+        try:
+            payload = signing.loads(token, salt=TOKEN_SALT)
+        except signing.BadSignature:
+            return None
+        if payload.get('n') != self.ntochka.id or payload.get('p') != self.period_date.id:
+            return None
+        if payload.get('t') is None:
+            return None
+        return parse_datetime(payload['t'])
+
+    def changed(self, since):
+        since = since - _overlap()
+        return self.get_queryset().filter(
+            Q(updated_at__gte=since) |
+            Q(product__updated_at__gte=since) |
+            Q(product__category__updated_at__gte=since) |
+            Q(history__period__period_id=self.period_date.period_id, history__updated_at__gte=since)
+        ).distinct()
+
+    def removed(self, since):
+        """
+        Nofaol qilingan va butunlay o'chirilgan rasta mahsulotlari id lari.
+        """
+        since = since - _overlap()
+        deactivated = TochkaProduct.objects.filter(
+            self.base_query(),
+            is_active=False,
+            updated_at__gte=since,
+        ).values_list('id', flat=True)
+        deleted = TochkaProductTombstone.objects.filter(
+            ntochka_id=self.ntochka.id,
+            is_weekly=self.is_weekly,
+            deleted_at__gte=since,
+        ).values_list('tochka_product_id', flat=True)
+        return sorted(set(deactivated) | set(deleted))
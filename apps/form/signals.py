@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from apps.home.models import NTochka, PeriodDate
+
+from .models import Birlik, Product, ProductCategory, TochkaProduct, TochkaProductHistory, TochkaProductTombstone
+from .services import coverage, price_outliers, price_series
+from .services.catalog import invalidate_catalog
+from .services.price_facts import refresh_for_histories
+
+
+# Narx tarixi yozilganda (bitta save yoki bulk_create/bulk_update) yuboriladi.
+# Bulk yo'llar post_save ni chaqirmaydi, shuning uchun ular bu signalni o'zlari yuborishi shart.
+# kwargs: histories - TochkaProductHistory obyektlari ro'yxati
+histories_changed = Signal()
+
+# Obyekt/rasta faolligi queryset.update() bilan o'zgartirilganda yoki faol rasta mahsulotlari
+# bulk_create bilan qo'shilganda (post_save chaqirilmaydi) yuboriladi.
+# kwargs: tochka_ids, ntochka_ids - faolligi o'zgargan Tochka va NTochka id lari
+activation_changed = Signal()
+
+
+@receiver(post_save, sender=TochkaProductHistory)
+@receiver(post_delete, sender=TochkaProductHistory)
+def forward_history_change(sender, instance, **kwargs):
+    """
+    Bitta history saqlanganda yoki o'chirilganda histories_changed signalini yuborish.
+    """
+    histories_changed.send(sender=TochkaProductHistory, histories=[instance])
+
+
+@receiver(histories_changed, sender=TochkaProductHistory)
+def refresh_price_facts(sender, histories, **kwargs):
+    """
+    Narx faktlarini (davr sanasi x tuman x mahsulot) tranzaksiya yakunlangach yangilash:
+    narx yozish tranzaksiyasi qisqa qoladi, faktlar yakunlangan historydan qayta sanaladi.
+    """
+    transaction.on_commit(lambda: refresh_for_histories(histories))
+
+
+@receiver(histories_changed, sender=TochkaProductHistory)
+def refresh_coverage_on_histories(sender, histories, **kwargs):
+    """
+    Obyektlar qamrovini (davr sanasi x obyekt) tranzaksiya yakunlangach yangilash.
+    """
+    transaction.on_commit(lambda: coverage.refresh_for_histories(histories))
+
+
+@receiver(histories_changed, sender=TochkaProductHistory)
+def schedule_price_series(sender, histories, **kwargs):
+    """
+    Ochiq davr sanalarining narx vaqt qatorini kechiktirib qayta qurish.
+    """
+    for period_date_id in {history.period_id for history in histories}:
+        price_series.schedule_refresh(period_date_id)
+
+
+@receiver(histories_changed, sender=TochkaProductHistory)
+def schedule_price_outliers(sender, histories, **kwargs):
+    """
+    O'zgargan davr sanalarida shubhali narxlarni kechiktirib qayta belgilash.
+    """
+    for period_date_id in {history.period_id for history in histories}:
+        price_outliers.schedule_refresh(period_date_id)
+
+
+@receiver(post_save, sender=PeriodDate)
+def close_price_series(sender, instance, created, **kwargs):
+    """
+    Yangi davr sanasi ochilganda oldingisining vaqt qatorini yakuniy qurish.
+    """
+    if created:
+        price_series.close_previous_period(instance)
+
+
+@receiver(activation_changed)
+def refresh_coverage_on_activation(sender, tochka_ids, ntochka_ids, **kwargs):
+    """
+    Obyekt/rasta yopilganda yoki ochilganda ularning barcha sanalardagi qamrovini yangilash.
+    """
+    tochka_ids = set(tochka_ids) | set(
+        NTochka.objects.filter(id__in=ntochka_ids).values_list('hudud_id', flat=True)
+    )
+    transaction.on_commit(lambda: coverage.refresh_for_tochkas(tochka_ids))
+
+
+@receiver(post_save, sender=TochkaProduct)
+@receiver(post_delete, sender=TochkaProduct)
+def refresh_coverage_on_tochka_product(sender, instance, **kwargs):
+    """
+    Rasta mahsuloti qo'shilganda, o'chirilganda yoki faolligi o'zgarganda obyekt qamrovini yangilash.
+    """
+    hudud_id = instance.hudud_id
+    transaction.on_commit(lambda: coverage.refresh_for_tochkas([hudud_id]))
+
+
+@receiver(post_delete, sender=TochkaProduct)
+def record_tochka_product_tombstone(sender, instance, **kwargs):
+    """
+    O'chirilgan rasta mahsulotini `since` sinxronlash uchun qayd etish.
+    """
+    TochkaProductTombstone.objects.create(
+        tochka_product_id=instance.id, ntochka_id=instance.ntochka_id, is_weekly=instance.is_weekly
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=Birlik)
+@receiver(post_delete, sender=Birlik)
+def invalidate_catalog_on_change(sender, instance, **kwargs):
+    """
+    Katalog o'zgarganda barcha jarayonlardagi mahsulot indeksini eskirtirish.
+    Versiya tranzaksiya yakunlangach oshiriladi, aks holda boshqa jarayon yangi versiya
+    bilan hali yakunlanmagan (eski) ma'lumotdan indeks qurib qo'yishi mumkin.
+    """
+    transaction.on_commit(invalidate_catalog)
@@ -0,0 +1,60 @@
+from celery import shared_task
+import logging
+
+from .services import ingestion, price_index, price_outliers, price_series
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def drain_price_ingestion_task(self):
+    """Navbatdagi narxlarni partiyalab bazaga yozish uchun Celery task"""
+    try:
+        total = ingestion.drain()
+        if total:
+            logger.info(f"Navbatdan {total} ta narx yozildi")
+        # Navbatda hali yozuv qolgan bo'lsa keyingi task rejalashtiriladi
+        if ingestion.get_queue().pending():
+            ingestion.schedule_drain()
+        return total
+    except Exception as exc:
+        logger.error(f"Navbatni bo'shatishda xatolik: {exc}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=10 * (self.request.retries + 1), exc=exc)
+        raise exc
+
+
+@shared_task(bind=True, max_retries=3)
+def build_price_series_task(self, period_date_id):
+    """Davr sanasining narx vaqt qatorini qayta qurish uchun Celery task"""
+    try:
+        return price_series.refresh_period(period_date_id)
+    except Exception as exc:
+        logger.error(f"Narx vaqt qatorini qurishda xatolik: {exc}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        raise exc
+
+
+@shared_task(bind=True, max_retries=3)
+def flag_price_outliers_task(self, period_date_id):
+    """Davr sanasining shubhali narxlarini belgilash va barqaror ko'rsatkichlarini yozish uchun Celery task"""
+    try:
+        return price_outliers.refresh_period(period_date_id)
+    except Exception as exc:
+        logger.error(f"Shubhali narxlarni tekshirishda xatolik: {exc}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        raise exc
+
+
+@shared_task(bind=True, max_retries=3)
+def build_price_index_task(self, period_date_id):
+    """Davr sanasi va keyingi sananing narx indeksi bo'g'inlarini qayta hisoblash uchun Celery task"""
+    try:
+        return price_index.refresh_period(period_date_id)
+    except Exception as exc:
+        logger.error(f"Narx indeksini hisoblashda xatolik: {exc}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        raise exc
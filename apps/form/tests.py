@@ -1,3 +1,705 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from apps.home.models import Region, District, Employee, Period, PeriodDate, Tochka, NTochka
+from apps.common.services.statistics import compute_statistics, compute_statistics_from_facts
+from apps.home.services.period_calendar import get_calendar
+
+from .models import (Application, Birlik, ProductCategory, Product, PriceFact, PriceIndex, TochkaCoverage,
+                     TochkaProduct, TochkaProductHistory)
+from .services.catalog import get_catalog
+from .services.coverage import coverage_rows
+from .services import ingestion
+from .services.dsq_registry import DSQRegistry
+from .services.moderation import moderate_applications
+from .services.price_facts import refresh_facts
+from .services import price_index
+from .services.price_index import LEVELS, _level_frames
+from .services.price_outliers import flag_period, robust_stats
+from .signals import activation_changed
+
+
+def create_rasta(products=3):
+    """
+    Bitta xodim, obyekt va rasta, unda products ta haftalik indeks mahsuloti; joriy haftalik davr.
+    """
+    region = Region.objects.create(name='Toshkent', code='27')
+    district = District.objects.create(name='Chilonzor', region=region, code='03')
+    employee = Employee.objects.create(full_name='Xodim', login='xodim', password='parol', district=district)
+    period = Period.objects.create(name='2026-W01', period_type='weekly')
+    period_date = PeriodDate.objects.create(period=period, date=timezone.localdate())
+    unit = Birlik.objects.create(name='kg', code='1', miqdor=1)
+    category = ProductCategory.objects.create(name='Sabzavotlar', code='01')
+    tochka = Tochka.objects.create(name='Bozor', district=district, code='2703-0001', employee=employee)
+    ntochka = NTochka.objects.create(name='Rasta', hudud=tochka, code='2703-0001-001')
+    tochka_products = [
+        TochkaProduct.objects.create(
+            product=Product.objects.create(
+                name=f'Mahsulot {index}', category=category, code=f'01{index:02}', unit=unit, is_index=True
+            ),
+            ntochka=ntochka, hudud=tochka, is_weekly=True,
+        )
+        for index in range(products)
+    ]
+    return {
+        'region': region, 'district': district, 'employee': employee, 'period': period,
+        'period_date': period_date, 'unit': unit, 'category': category, 'tochka': tochka,
+        'ntochka': ntochka, 'tochka_products': tochka_products,
+    }
+
+
+def create_history(tochka_product, period_date, price, employee=None, **kwargs):
+    return TochkaProductHistory.objects.create(
+        product_id=tochka_product.product_id, ntochka_id=tochka_product.ntochka_id, hudud_id=tochka_product.hudud_id,
+        tochka_product=tochka_product, employee=employee or tochka_product.hudud.employee, period=period_date,
+        price=price, **kwargs
+    )
+
+
+class AlternativeProductSubmissionTests(APITestCase):
+    """
+    'sotilmayapti' statusi: alternativ mahsulot bilan narx yuborish.
+    """
+    url = '/api/form/tochka-product-history/'
+
+    def setUp(self):
+        cache.clear()
+        region = Region.objects.create(name='Toshkent', code='27')
+        district = District.objects.create(name='Chilonzor', region=region, code='03')
+        self.employee = Employee.objects.create(full_name='Xodim', login='xodim', password='parol', district=district)
+        period = Period.objects.create(name='2026-W01', period_type='weekly')
+        self.period_date = PeriodDate.objects.create(period=period, date=timezone.localdate())
+
+        unit = Birlik.objects.create(name='kg', code='1', miqdor=1)
+        category = ProductCategory.objects.create(name='Sabzavotlar', code='01')
+        self.product = Product.objects.create(name='Kartoshka', category=category, code='0101', unit=unit, is_index=True)
+        self.alternative = Product.objects.create(name='Sabzi', category=category, code='0102', unit=unit, is_index=True)
+
+        tochka = Tochka.objects.create(name='Bozor', district=district, code='2703-0001', employee=self.employee)
+        ntochka = NTochka.objects.create(name='Rasta', hudud=tochka, code='2703-0001-001')
+        self.tochka_product = TochkaProduct.objects.create(
+            product=self.product, ntochka=ntochka, hudud=tochka, is_weekly=True, last_price=5000
+        )
+
+        # Jarayon indekslari oldindan quriladi, so'rovlar soniga kirmaydi
+        get_calendar()
+        get_catalog()
+
+    def post_alternative(self, price=7000):
+        return self.client.post(
+            self.url,
+            {
+                'period_type': 'weekly',
+                'status': 'sotilmayapti',
+                'alternative_product': {'uuid': str(self.alternative.uuid), 'price': price, 'quantity': 2},
+            },
+            format='json',
+            HTTP_X_USER_UUID=str(self.employee.uuid),
+            HTTP_X_TOCHKA_PRODUCT_ID=str(self.tochka_product.id),
+        )
+
+    def test_creates_both_histories_in_fixed_number_of_queries(self):
+        # xodim, rasta mahsuloti, savepoint, qulflash, alternativ TochkaProduct INSERT,
+        # historylar INSERT, TochkaProductlar UPDATE, release. Narx faktlari, obyekt qamrovi va
+        # marshrut nusxasi tranzaksiya yakunlangach yangilanadi
+        with self.assertNumQueries(8):
+            response = self.post_alternative()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'sotilmayapti')
+        self.assertEqual(response.data['price'], 0)
+
+        alternative_product = TochkaProduct.objects.get(ntochka=self.tochka_product.ntochka, product=self.alternative)
+        self.assertEqual(alternative_product.last_price, 7000)
+        self.assertTrue(alternative_product.is_weekly)
+        alternative_history = TochkaProductHistory.objects.get(tochka_product=alternative_product)
+        self.assertTrue(alternative_history.is_alternative)
+        self.assertEqual(alternative_history.unit_price, 3500)
+        self.assertEqual(alternative_history.alternative_for_id, self.tochka_product.id)
+
+        self.tochka_product.refresh_from_db()
+        self.assertEqual((self.tochka_product.last_price, self.tochka_product.previous_price), (0, 5000))
+
+    def test_resubmission_updates_without_new_rows(self):
+        self.post_alternative()
+        # alternativ TochkaProduct endi mavjud: INSERT faqat historylar uchun
+        with self.assertNumQueries(7):
+            response = self.post_alternative(price=8000)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TochkaProductHistory.objects.count(), 2)
+        self.assertEqual(TochkaProduct.objects.count(), 2)
+        alternative_product = TochkaProduct.objects.get(product=self.alternative)
+        self.assertEqual((alternative_product.last_price, alternative_product.previous_price), (8000, 0))
+        self.tochka_product.refresh_from_db()
+        self.assertEqual(self.tochka_product.previous_price, 5000)
+
+    def test_rejects_incomplete_alternative(self):
+        response = self.client.post(
+            self.url,
+            {'period_type': 'weekly', 'status': 'sotilmayapti', 'alternative_product': {'uuid': str(self.alternative.uuid)}},
+            format='json',
+            HTTP_X_USER_UUID=str(self.employee.uuid),
+            HTTP_X_TOCHKA_PRODUCT_ID=str(self.tochka_product.id),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TochkaProductHistory.objects.exists())
+
+
+class BatchSubmissionTests(APITestCase):
+    url = '/api/form/tochka-product-history/batch/'
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.headers = {
+            'HTTP_X_USER_UUID': str(self.rasta['employee'].uuid),
+            'HTTP_X_RASTA_UUID': str(self.rasta['ntochka'].uuid),
+        }
+
+    def post(self, items):
+        return self.client.post(self.url, {'period_type': 'weekly', 'items': items}, format='json', **self.headers)
+
+    def test_saves_valid_items_and_reports_the_rest(self):
+        tochka_products = self.rasta['tochka_products']
+        items = [{'tochka_product': tochka_product.id, 'price': 100 + index} for index, tochka_product in enumerate(tochka_products)]
+        items += [{'tochka_product': tochka_products[0].id, 'price': 5}, {'tochka_product': 99999, 'price': 5}]
+        response = self.post(items)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 2))
+        self.assertIn('errors', response.data['results'][3])
+        self.assertIn('errors', response.data['results'][4])
+        self.assertEqual(TochkaProductHistory.objects.count(), 3)
+        tochka_products[1].refresh_from_db()
+        self.assertEqual(tochka_products[1].last_price, 101)
+
+    def test_resubmission_corrects_already_entered_products(self):
+        tochka_product = self.rasta['tochka_products'][0]
+        TochkaProduct.objects.filter(id=tochka_product.id).update(last_price=90)
+        first = self.post([{'tochka_product': tochka_product.id, 'price': 100}])
+        response = self.post([{'tochka_product': tochka_product.id, 'price': 200}])
+        self.assertEqual(response.status_code, 201)
+        history = TochkaProductHistory.objects.get()
+        self.assertEqual((history.id, history.price), (first.data['results'][0]['id'], 200))
+        self.assertEqual(response.data['results'][0]['id'], history.id)
+        tochka_product.refresh_from_db()
+        # Tuzatishda oldingi davr narxi saqlanib qoladi
+        self.assertEqual((tochka_product.last_price, tochka_product.previous_price), (200, 90))
+
+
+class RastaSyncTests(APITestCase):
+    url = '/api/form/tochka-products/?period_type=weekly'
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.headers = {
+            'HTTP_X_USER_UUID': str(self.rasta['employee'].uuid),
+            'HTTP_X_RASTA_UUID': str(self.rasta['ntochka'].uuid),
+        }
+        response = self.client.get(self.url, **self.headers)
+        self.etag, self.token = response['ETag'], response['X-Sync-Token']
+
+    def sync(self):
+        return self.client.get(f'{self.url}&since={self.token}', **self.headers).json()
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag, **self.headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_rows_committed_late_are_returned_again(self):
+        # token vaqtidan oldingi updated_at bilan kechikib yakunlangan yozuv
+        tochka_product = self.rasta['tochka_products'][0]
+        TochkaProduct.objects.filter(id=tochka_product.id).update(
+            last_price=5, updated_at=timezone.now() - timedelta(seconds=10)
+        )
+        self.assertIn(tochka_product.id, [row['id'] for row in self.sync()['changed']])
+
+    def test_deactivated_and_deleted_products_are_removed(self):
+        deactivated, deleted = self.rasta['tochka_products'][:2]
+        deactivated.is_active = False
+        deactivated.save()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sync()['removed'], sorted([deactivated.id, deleted_id]))
+
+
+class CatalogInvalidationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+
+    def test_catalog_is_rebuilt_after_commit(self):
+        catalog = get_catalog()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            product = Product.objects.create(
+                name='Maxsus', category=self.rasta['category'], code='0199', unit=self.rasta['unit'], is_special=True
+            )
+        self.assertIs(get_catalog(), catalog)
+        for callback in callbacks:
+            callback()
+        catalog = get_catalog()
+        self.assertEqual(catalog.get_product(product.uuid), (product.id, product.category_id))
+        self.assertEqual([item['id'] for item in catalog.special], [product.id])
+
+
+class DSQRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'DSQ_orgs.csv')
+        self.write('INN,NAME\n300000002, A\n300000001,B\n300000002,C\nabc,D\n')
+        self.registry = DSQRegistry(self.path)
+
+    def write(self, content, mtime=None):
+        with open(self.path, 'w') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.path, ns=(mtime, mtime))
+
+    def test_contains_many_keeps_input_order(self):
+        self.assertEqual(
+            self.registry.contains_many(['300000001', 300000002, ' 300000002 ', 999999999, '', None, 'x']),
+            [True, True, True, False, False, False, False],
+        )
+        self.assertEqual(self.registry.inns().tolist(), [300000001, 300000002])
+
+    def test_reloads_when_file_changes(self):
+        self.assertFalse(self.registry.contains(300000003))
+        self.write('INN\n300000003\n', mtime=os.stat(self.path).st_mtime_ns + 10 ** 9)
+        self.assertTrue(self.registry.contains(300000003))
+        self.assertFalse(self.registry.contains(300000001))
+
+    def test_missing_file_contains_nothing(self):
+        self.assertEqual(DSQRegistry(self.path + '.missing').contains_many([300000001]), [False])
+
+
+class PriceSubmissionTests(APITestCase):
+    url = '/api/form/tochka-product-history/'
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.tochka_product = self.rasta['tochka_products'][0]
+        self.headers = {
+            'HTTP_X_USER_UUID': str(self.rasta['employee'].uuid),
+            'HTTP_X_TOCHKA_PRODUCT_ID': str(self.tochka_product.id),
+        }
+
+    def post(self, price, **headers):
+        return self.client.post(self.url, {'period_type': 'weekly', 'price': price}, format='json', **{**self.headers, **headers})
+
+    def test_resubmitted_price_updates_history(self):
+        first = self.post(100)
+        second = self.post(120)
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        history = TochkaProductHistory.objects.get()
+        self.assertEqual((history.id, history.price), (first.data['id'], 120))
+        self.tochka_product.refresh_from_db()
+        self.assertEqual(self.tochka_product.last_price, 120)
+
+    def test_same_key_replays_stored_response(self):
+        first = self.post(100, HTTP_IDEMPOTENCY_KEY='kalit-1')
+        with self.assertNumQueries(1):
+            replay = self.post(100, HTTP_IDEMPOTENCY_KEY='kalit-1')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.data, first.data)
+
+    def test_same_key_with_different_body_is_rejected(self):
+        self.post(100, HTTP_IDEMPOTENCY_KEY='kalit-1')
+        response = self.post(150, HTTP_IDEMPOTENCY_KEY='kalit-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(TochkaProductHistory.objects.get().price, 100)
+
+    def test_same_key_for_other_product_is_rejected(self):
+        self.post(100, HTTP_IDEMPOTENCY_KEY='kalit-1')
+        other = self.rasta['tochka_products'][1]
+        response = self.post(100, HTTP_IDEMPOTENCY_KEY='kalit-1', HTTP_X_TOCHKA_PRODUCT_ID=str(other.id))
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(TochkaProductHistory.objects.filter(tochka_product=other).exists())
+
+    def test_non_finite_prices_are_rejected(self):
+        for price in ('nan', 'inf', '-inf', '1e999', 'abc'):
+            self.assertEqual(self.post(price).status_code, 400, price)
+        response = self.client.post(
+            '/api/form/tochka-product-history/batch/',
+            {'period_type': 'weekly', 'items': [{'tochka_product': self.tochka_product.id, 'price': 'nan'}]},
+            format='json',
+            HTTP_X_USER_UUID=str(self.rasta['employee'].uuid),
+            HTTP_X_RASTA_UUID=str(self.rasta['ntochka'].uuid),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TochkaProductHistory.objects.exists())
+
+
+class PriceIngestionDrainTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(PRICE_INGESTION_BACKEND='file', PRICE_INGESTION_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.queue = ingestion.get_queue()
+
+    def entry(self, submission_id, tochka_product_id, price):
+        return {
+            'id': submission_id,
+            'employee_id': self.rasta['employee'].id,
+            'tochka_product_id': tochka_product_id,
+            'period_id': self.rasta['period_date'].id,
+            'price': price,
+            'status': 'mavjud',
+        }
+
+    def test_queue_is_created_once_per_process(self):
+        self.assertIs(ingestion.get_queue(), self.queue)
+
+    def test_drain_persists_entries_in_batches(self):
+        tochka_products = self.rasta['tochka_products']
+        for index, tochka_product in enumerate(tochka_products):
+            self.queue.append(self.entry(f's{index}', tochka_product.id, 100 + index))
+        self.queue.append(self.entry('unknown', 99999, 5))
+
+        self.assertEqual(ingestion.drain(batch_size=2), 4)
+        self.assertEqual(self.queue.pending(), 0)
+        self.assertEqual(
+            sorted(TochkaProductHistory.objects.values_list('tochka_product_id', 'price')),
+            [(tochka_product.id, 100 + index) for index, tochka_product in enumerate(tochka_products)],
+        )
+        self.assertEqual(ingestion.get_status('s1')['state'], ingestion.STATUS_PERSISTED)
+        self.assertEqual(ingestion.get_status('unknown')['state'], ingestion.STATUS_FAILED)
+
+    def test_bad_entry_is_dead_lettered_and_rest_is_saved(self):
+        first, second, third = self.rasta['tochka_products']
+        self.queue.append(self.entry('good-1', first.id, 100))
+        self.queue.append(self.entry('bad', second.id, 'abc'))
+        self.queue.append(self.entry('good-2', third.id, 120))
+
+        self.assertEqual(ingestion.drain(), 3)
+        self.assertEqual(self.queue.pending(), 0)
+        self.assertEqual(
+            sorted(TochkaProductHistory.objects.values_list('tochka_product_id', flat=True)), sorted([first.id, third.id])
+        )
+        self.assertEqual(ingestion.get_status('bad')['state'], ingestion.STATUS_FAILED)
+        dead = os.listdir(os.path.join(self.directory, 'dead'))
+        self.assertEqual(len(dead), 1)
+        self.assertIn('bad', dead[0])
+
+    def test_status_and_stats_live_in_queue_backend(self):
+        # Drain boshqa jarayonda (o'z keshi bilan) ishlagandek: kesh tozalansa ham holat ko'rinadi
+        tochka_product = self.rasta['tochka_products'][0]
+        self.queue.append(self.entry('s1', tochka_product.id, 100))
+        ingestion.drain()
+        cache.clear()
+
+        self.assertEqual(ingestion.get_status('s1')['state'], ingestion.STATUS_PERSISTED)
+        self.assertIsNone(ingestion.get_status('../s1'))
+        self.assertEqual(ingestion.queue_stats()['persisted_total'], 1)
+
+
+class ModerationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta(products=2)
+        self.user = User.objects.create_user('moderator')
+        self.ntochka = NTochka.objects.create(
+            name='Yangi rasta', hudud=self.rasta['tochka'], code='2703-0001-002', is_active=False, in_proccess=True
+        )
+        self.existing = TochkaProduct.objects.create(
+            product=self.rasta['tochka_products'][0].product, ntochka=self.ntochka, hudud=self.rasta['tochka'],
+            is_active=False, is_weekly=True,
+        )
+        self.new_product = self.rasta['tochka_products'][1].product
+        self.application = Application.objects.create(
+            application_type='for_open_rasta', employee=self.rasta['employee'], tochka=self.rasta['tochka'],
+            ntochka=self.ntochka, period=self.rasta['period_date'],
+            products=[
+                {'product_id': self.existing.product_id, 'price': 150, 'miqdor': 2},
+                {'product_id': self.new_product.id, 'price': 80, 'miqdor': 1},
+            ],
+        )
+
+    def test_open_rasta_upserts_application_products(self):
+        received = []
+
+        def receiver(sender, tochka_ids, ntochka_ids, **kwargs):
+            received.append((set(ntochka_ids), TochkaProduct.objects.filter(ntochka=self.ntochka, is_active=True).count()))
+
+        activation_changed.connect(receiver)
+        self.addCleanup(activation_changed.disconnect, receiver)
+        results = moderate_applications([self.application.id], approve=True, user=self.user)
+
+        self.assertEqual(results, [{'id': self.application.id, 'status': 'approved'}])
+        self.assertEqual(
+            sorted(TochkaProduct.objects.filter(ntochka=self.ntochka).values_list('product_id', 'last_price', 'miqdor', 'is_active')),
+            sorted([(self.existing.product_id, 150, 2, True), (self.new_product.id, 80, 1, True)]),
+        )
+        self.assertTrue(NTochka.objects.get(id=self.ntochka.id).is_active)
+        # signal mahsulotlar yozilgandan keyin yuboriladi
+        self.assertEqual(received, [({self.ntochka.id}, 2)])
+
+
+class PriceFactTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.period_date = self.rasta['period_date']
+        self.district = self.rasta['district']
+
+    def facts(self):
+        return {
+            (fact.period_id, fact.product_id): (fact.count, fact.price_sum, fact.price_min, fact.price_max)
+            for fact in PriceFact.objects.filter(district=self.district)
+        }
+
+    def test_submission_and_deactivation_maintain_facts(self):
+        tochka_product = self.rasta['tochka_products'][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/form/tochka-product-history/', {'period_type': 'weekly', 'price': 100}, format='json',
+                HTTP_X_USER_UUID=str(self.rasta['employee'].uuid), HTTP_X_TOCHKA_PRODUCT_ID=str(tochka_product.id),
+            )
+            # Faktlar tranzaksiya yakunlangach yangilanadi
+            self.assertEqual(self.facts(), {})
+        self.assertEqual(response.status_code, 201)
+        other = TochkaProduct.objects.create(
+            product=tochka_product.product, ntochka=self.rasta['ntochka'], hudud=self.rasta['tochka'], is_weekly=True,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            create_history(other, self.period_date, 300)
+        key = (self.period_date.id, tochka_product.product_id)
+        self.assertEqual(self.facts(), {key: (2, 400.0, 100.0, 300.0)})
+
+        history = TochkaProductHistory.objects.get(tochka_product=other)
+        history.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            history.save()
+        self.assertEqual(self.facts(), {key: (1, 100.0, 100.0, 100.0)})
+        with self.captureOnCommitCallbacks(execute=True):
+            TochkaProductHistory.objects.filter(tochka_product=tochka_product).get().delete()
+        self.assertEqual(self.facts(), {})
+
+    def test_refresh_leaves_unrequested_keys_untouched(self):
+        first, second = self.rasta['tochka_products'][:2]
+        later = PeriodDate.objects.create(period=self.rasta['period'], date=self.period_date.date + timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            for period_date in (self.period_date, later):
+                for tochka_product in (first, second):
+                    create_history(tochka_product, period_date, 10)
+        PriceFact.objects.update(count=99)
+
+        # Ustma-ust to'plamga (self.period_date, second) va (later, first) ham kiradi
+        refresh_facts({
+            (self.period_date.id, self.district.id, first.product_id),
+            (later.id, self.district.id, second.product_id),
+        })
+        self.assertEqual(
+            {key: value[0] for key, value in self.facts().items()},
+            {
+                (self.period_date.id, first.product_id): 1,
+                (self.period_date.id, second.product_id): 99,
+                (later.id, first.product_id): 99,
+                (later.id, second.product_id): 1,
+            },
+        )
+
+    def test_fact_statistics_match_history_statistics(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for tochka_product, price in zip(self.rasta['tochka_products'], (10, 20, 60)):
+                create_history(tochka_product, self.period_date, price)
+        flag_period(self.period_date.id)
+        filters = {'period__period_id': self.rasta['period'].id}
+        self.assertEqual(compute_statistics_from_facts(filters), compute_statistics(filters))
+
+
+class CoverageTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta()
+        self.period_date = self.rasta['period_date']
+        self.tochka = self.rasta['tochka']
+
+    def coverage(self):
+        return list(TochkaCoverage.objects.filter(tochka=self.tochka).values_list(
+            'period_id', 'active_products', 'entered_products'
+        ))
+
+    def test_submission_and_deactivation_maintain_coverage(self):
+        first, second, third = self.rasta['tochka_products']
+        with self.captureOnCommitCallbacks(execute=True):
+            create_history(first, self.period_date, 100)
+            create_history(second, self.period_date, 200)
+        self.assertEqual(self.coverage(), [(self.period_date.id, 3, 2)])
+
+        second.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertEqual(self.coverage(), [(self.period_date.id, 2, 1)])
+
+        # queryset.update post_save chaqirmaydi, qamrov activation_changed orqali yangilanadi
+        TochkaProduct.objects.filter(id=third.id).update(is_active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            activation_changed.send(sender=TochkaProduct, tochka_ids=[], ntochka_ids=[self.rasta['ntochka'].id])
+        self.assertEqual(self.coverage(), [(self.period_date.id, 1, 1)])
+
+        TochkaProduct.objects.filter(id=first.id).update(is_active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            activation_changed.send(sender=TochkaProduct, tochka_ids=[self.tochka.id], ntochka_ids=[])
+        self.assertEqual(self.coverage(), [])
+
+    def test_rows_union_products_across_dates(self):
+        first, second, _ = self.rasta['tochka_products']
+        later = PeriodDate.objects.create(period=self.rasta['period'], date=self.period_date.date + timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_history(first, self.period_date, 100)
+            create_history(second, later, 200)
+        self.assertEqual(coverage_rows([self.period_date]), {self.tochka.id: (3, 1)})
+        self.assertEqual(coverage_rows([self.period_date, later]), {self.tochka.id: (3, 2)})
+        self.assertEqual(
+            coverage_rows([self.period_date.id, later.id], tochka__district_id=self.rasta['district'].id),
+            {self.tochka.id: (3, 2)},
+        )
+
+
+class RobustStatsTests(SimpleTestCase):
+
+    def test_matches_numpy_per_group(self):
+        rng = np.random.default_rng(7)
+        products = rng.integers(1, 4, 200)
+        districts = rng.integers(1, 3, 200)
+        prices = rng.lognormal(8, 0.5, 200).round(0)
+
+        groups, stats = robust_stats(products, districts, prices)
+        self.assertEqual(stats['count'].size, len(set(zip(products.tolist(), districts.tolist()))))
+        for group, (product, district) in enumerate(zip(stats['product'], stats['district'])):
+            mask = (products == product) & (districts == district)
+            values = prices[mask]
+            median = np.median(values)
+            self.assertTrue((groups[mask] == group).all())
+            self.assertEqual(stats['count'][group], values.size)
+            np.testing.assert_allclose(
+                [stats['median'][group], stats['mad'][group], stats['p25'][group], stats['p75'][group]],
+                [median, np.median(np.abs(values - median)), np.quantile(values, 0.25), np.quantile(values, 0.75)],
+            )
+
+
+class PriceOutlierTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta(products=1)
+        self.period_date = self.rasta['period_date']
+        tochka_product = self.rasta['tochka_products'][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            for price in (100, 102, 98, 101, 99, 1000):
+                other = TochkaProduct.objects.create(
+                    product=tochka_product.product, ntochka=self.rasta['ntochka'], hudud=self.rasta['tochka'],
+                    is_weekly=True,
+                )
+                create_history(other, self.period_date, price)
+
+    def test_flag_period_marks_outliers_and_fills_fact(self):
+        # setUp da rejalashtirilgan tekshiruv (eager task) belgilarni qo'ygan, ular tozalanadi
+        TochkaProductHistory.objects.update(is_outlier=False, outlier_reason='')
+        self.assertEqual(flag_period(self.period_date.id), 1)
+        self.assertEqual(
+            list(TochkaProductHistory.objects.filter(is_outlier=True).values_list('price', 'outlier_reason')),
+            [(1000, 'high')],
+        )
+        fact = PriceFact.objects.get()
+        self.assertEqual(
+            (fact.price_median, fact.outlier_count, fact.clean_count, fact.clean_sum), (100.5, 1, 5, 500.0)
+        )
+        # Qayta ishga tushirish hech narsani o'zgartirmaydi
+        self.assertEqual(flag_period(self.period_date.id), 0)
+
+
+class PriceIndexLevelTests(SimpleTestCase):
+
+    def setUp(self):
+        # 1-mahsulot: 1.0 va 1.21 (Jevons 1.1), 2-mahsulot: 1.3, 3-mahsulot vaznsiz
+        self.matched = pd.DataFrame({
+            'product_id': [1, 1, 2, 3],
+            'district_id': [10, 10, 20, 20],
+            'region_id': [1, 1, 1, 1],
+            'weight': [2.0, 2.0, 1.0, 0.0],
+            'log_relative': np.log([1.0, 1.21, 1.3, 2.0]),
+        })
+
+    def frames(self, level):
+        return _level_frames(self.matched, dict(LEVELS)[level])
+
+    def test_product_relatives_are_geometric_means(self):
+        products, _ = self.frames('country')
+        products = products.set_index('product_id')
+        np.testing.assert_allclose(products.loc[[1, 2, 3], 'relative'], [1.1, 1.3, 2.0])
+        self.assertEqual(products.loc[[1, 2, 3], 'count'].tolist(), [2, 1, 1])
+
+    def test_totals_are_weighted_over_positive_weights(self):
+        _, district = self.frames('district')
+        district = district.set_index('district_id')
+        np.testing.assert_allclose(district.loc[[10, 20], 'relative'], [1.1, 1.3])
+        self.assertEqual(district.loc[[10, 20], 'count'].tolist(), [1, 1])
+
+        for level in ('region', 'country'):
+            _, totals = self.frames(level)
+            self.assertEqual(len(totals), 1)
+            np.testing.assert_allclose(totals['relative'], [(2 * 1.1 + 1.3) / 3])
+            self.assertEqual(totals['count'].tolist(), [2])
+
+    def test_without_weighted_products_totals_are_empty(self):
+        self.matched['weight'] = 0.0
+        for level, _ in LEVELS:
+            products, totals = self.frames(level)
+            self.assertEqual((len(products) > 0, len(totals)), (True, 0), level)
+
+
+class PriceIndexBuildTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rasta = create_rasta(products=2)
+        self.first = self.rasta['period_date']
+        for tochka_product, price in zip(self.rasta['tochka_products'], (100, 200)):
+            create_history(tochka_product, self.first, price)
+
+    def test_links_dates_created_after_calendar_was_built(self):
+        get_calendar()
+        # Kalendar versiyasi oshmaydi (tranzaksiya yakunlanmagan): jarayon kalendari eski
+        period = Period.objects.create(name='2026-W02', period_type='weekly')
+        second = PeriodDate.objects.create(period=period, date=self.first.date + timedelta(days=7))
+        self.assertIsNone(get_calendar().get(second.id))
+        for tochka_product, price in zip(self.rasta['tochka_products'], (110, 220)):
+            create_history(tochka_product, second, price)
+
+        # 3 daraja x (2 mahsulot + jami)
+        self.assertEqual(price_index.refresh_period(self.first.id), 9)
+        country = PriceIndex.objects.get(period=second, level='country', product__isnull=True)
+        self.assertEqual((country.previous_id, country.count), (self.first.id, 2))
+        self.assertAlmostEqual(country.relative, 1.1)
+        self.assertFalse(PriceIndex.objects.filter(period=self.first).exists())
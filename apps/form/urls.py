@@ -15,6 +15,7 @@ urlpatterns = [
     # Actions
     path('<int:pk>/approve/', views.approve_application, name='approve_application'),
     path('<int:pk>/reject/', views.reject_application, name='reject_application'),
+    path('bulk-moderate/', views.bulk_moderate_applications, name='bulk_moderate_applications'),
     
     # Statistics
     path('statistics/', views.get_application_statistics, name='application_statistics'),
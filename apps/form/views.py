@@ -14,7 +14,9 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 import json
 
 from .models import Application, TochkaProductHistory, TochkaProduct
-from apps.home.models import Employee, PeriodDate, Tochka, NTochka
+from apps.home.models import Tochka, NTochka
+from apps.common.services import reference_data
+from .services.moderation import moderate_applications
 
 
 class ApplicationListView(LoginRequiredMixin, ListView):
@@ -73,9 +75,10 @@ class ApplicationListView(LoginRequiredMixin, ListView):
         context['approved_applications'] = Application.objects.filter(is_checked=True, is_active=True).count()
         context['rejected_applications'] = Application.objects.filter(is_checked=True, is_active=False).count()
         
-        # Filters data
-        context['periods'] = PeriodDate.objects.all().order_by('-id')
-        context['employees'] = Employee.objects.all().order_by('full_name')
+        # Filters data (services.reference_data): xodimlar ko'p, faqat tanlangani chiqariladi
+        context['periods'] = reference_data.get_options('period_dates')
+        selected_employee = reference_data.find('employees', self.request.GET.get('employee'))
+        context['employees'] = [selected_employee] if selected_employee else []
         
         # Current filters
         context['current_status'] = self.request.GET.get('status', '')
@@ -112,61 +115,8 @@ def approve_application(request, pk):
         return redirect('form:application_list')
     
     try:
-        # Mark as checked and approved
-        application.is_checked = True
-        application.is_active = True
-        application.checked_by = request.user
-        application.checked_at = timezone.now()
-        
-        # Process based on application type
-        if application.application_type == 'for_close_rasta':
-            # Close rastas
-            for ntochka in application.ntochkas.all():
-                ntochka.is_active = False
-                ntochka.save()
-                
-                # Deactivate all products in this rasta
-                TochkaProduct.objects.filter(ntochka=ntochka).update(is_active=False)
-        
-        elif application.application_type == 'for_open_rasta':
-            # Open rastas
-            for ntochka in application.ntochkas.all():
-                ntochka.is_active = False
-                ntochka.save()
-                
-                # Process products if any
-                if application.products:
-                    for product_data in application.products:
-                        product_id = product_data.get('product_id')
-                        if product_id:
-                            TochkaProduct.objects.update_or_create(
-                                product_id=product_id,
-                                ntochka=ntochka,
-                                hudud=application.tochka,
-                                defaults={
-                                    'is_active': False,
-                                    'last_price': product_data.get('price', 0),
-                                    'miqdor': product_data.get('miqdor', 0)
-                                }
-                            )
-        
-        elif application.application_type == 'for_close_obyekt':
-            # Close obyekt
-            if application.tochka:
-                application.tochka.is_active = False
-                application.tochka.save()
-                
-                # Deactivate all products and rastas in this obyekt
-                NTochka.objects.filter(tochka=application.tochka).update(is_active=False)
-                TochkaProduct.objects.filter(hudud=application.tochka).update(is_active=False)
-        
-        elif application.application_type == 'for_open_obyekt':
-            # Open obyekt
-            if application.tochka:
-                application.tochka.is_active = False
-                application.tochka.save()
-        
-        application.save()
+        # Ariza turiga qarab obyekt/rasta faolligi services.moderation da o'zgartiriladi
+        moderate_applications([application.pk], approve=True, user=request.user)
         
         messages.success(request, 'Ariza muvaffaqiyatli tasdiqlandi!')
         
@@ -201,17 +151,12 @@ def reject_application(request, pk):
     
     try:
         # Mark as checked but not active (rejected)
-        application.is_checked = True
-        application.is_active = False
-        application.checked_by = request.user
-        application.checked_at = timezone.now()
-        
-        # Add rejection comment if provided
-        comment = request.POST.get('rejection_comment')
-        if comment:
-            application.comment = f"Rad etish sababi: {comment}"
-        
-        application.save()
+        moderate_applications(
+            [application.pk],
+            approve=False,
+            user=request.user,
+            comment=request.POST.get('rejection_comment')
+        )
         
         messages.success(request, 'Ariza rad etildi!')
         
@@ -234,6 +179,47 @@ def reject_application(request, pk):
     return redirect('form:application_list')
 
 
+@login_required
+@require_POST
+def bulk_moderate_applications(request):
+    """
+    Bir nechta arizani birdaniga tasdiqlash yoki rad etish.
+
+    Body (JSON yoki form): {"ids": [1, 2, ...], "action": "approve" | "reject", "rejection_comment": "..."}
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': "Noto'g'ri JSON"}, status=400)
+        ids = data.get('ids') or []
+    else:
+        data = request.POST
+        ids = data.getlist('ids')
+
+    action = data.get('action')
+    if action not in ('approve', 'reject'):
+        return JsonResponse({'status': 'error', 'message': "action 'approve' yoki 'reject' bo'lishi kerak"}, status=400)
+    try:
+        ids = [int(application_id) for application_id in ids]
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': "ids butun sonlar ro'yxati bo'lishi kerak"}, status=400)
+    if not ids:
+        return JsonResponse({'status': 'error', 'message': 'Kamida bitta ariza tanlang'}, status=400)
+
+    results = moderate_applications(
+        ids,
+        approve=action == 'approve',
+        user=request.user,
+        comment=data.get('rejection_comment')
+    )
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+
+    return JsonResponse({'status': 'success', 'summary': summary, 'results': results})
+
+
 @login_required
 def application_detail_ajax(request, pk):
     """AJAX orqali ariza tafsilotlarini olish"""
@@ -4,9 +4,11 @@ from django.forms import ModelForm
 from django.urls import path
 from django.utils.html import format_html
 from django.db import models
-from .models import Region, District, Period, PeriodDate, Tochka, Employee, NTochka
+from .models import Region, District, Period, PeriodDate, Tochka, Employee, NTochka, PeriodRollover
 from ..common.admin import BaseAdmin
 from apps.common.views import export_all_csv_zip
+from .api.authentication import revoke_tokens, TOKEN_FIELDS
+from .services.period_rollover import schedule_rollover
 
 
 class CSVExportMixin:
@@ -94,6 +96,27 @@ class PeriodDateAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
 
 
+@admin.register(PeriodRollover)
+class PeriodRolloverAdmin(admin.ModelAdmin):
+    list_display = ['period_date', 'previous_period', 'status', 'processed', 'created_count', 'started_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = [
+        'period_date', 'previous_period', 'status', 'last_history_id', 'processed', 'created_count',
+        'error', 'started_at', 'finished_at', 'created_at', 'updated_at',
+    ]
+    actions = ['resume']
+
+    def has_add_permission(self, request):
+        return False
+
+    def resume(self, request, queryset):
+        period_date_ids = list(queryset.exclude(status='done').values_list('period_date_id', flat=True))
+        for period_date_id in period_date_ids:
+            schedule_rollover(period_date_id)
+        self.message_user(request, f"{len(period_date_ids)} ta ko'chirish qayta navbatga qo'yildi.")
+    resume.short_description = "Tanlangan ko'chirishlarni davom ettirish"
+
+
 
 
 
@@ -141,8 +164,9 @@ class EmployeeAdmin(BaseAdmin):
     list_display_links = ('id', 'full_name')
     search_fields = ('full_name', 'login', 'district__name')
     ordering = ('full_name',)
-    readonly_fields = ('uuid', 'created_at', 'updated_at')
+    readonly_fields = ('uuid', 'token_version', 'created_at', 'updated_at')
     list_select_related = ("district","district__region") 
+    actions = ['revoke_tokens']
 
     # fieldsets = (
     #     ('Shaxsiy ma\'lumotlar', {
@@ -172,4 +196,16 @@ class EmployeeAdmin(BaseAdmin):
 
     permissions_summary.short_description = 'Ruxsatlar'
 
+    def save_model(self, request, obj, form, change):
+        # Tokendagi ma'lumotlar o'zgarsa eski tokenlar bekor bo'ladi
+        if change and set(form.changed_data) & set(TOKEN_FIELDS):
+            obj.token_version += 1
+        super().save_model(request, obj, form, change)
+
+    def revoke_tokens(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        revoke_tokens(ids)
+        self.message_user(request, f'{len(ids)} ta xodimning tokenlari bekor qilindi.')
+    revoke_tokens.short_description = "Tanlangan xodimlarning tokenlarini bekor qilish"
+
 
@@ -4,6 +4,7 @@ from rest_framework.generics import CreateAPIView
 
 from apps.home.models import Employee
 
+from ..authentication import issue_token
 from .serializers import EmployeeSerializer, LoginSerializer
 
 class LoginView(CreateAPIView):
@@ -17,5 +18,7 @@ class LoginView(CreateAPIView):
         if serializer.is_valid():
             employee = serializer.validated_data['employee']
             employee_serializer = EmployeeSerializer(employee)
-            return Response(employee_serializer.data, status=status.HTTP_200_OK)
+            data = employee_serializer.data
+            data['token'] = issue_token(employee)
+            return Response(data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
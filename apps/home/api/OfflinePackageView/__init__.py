@@ -0,0 +1 @@
+from .views import OfflinePackageDownloadView
\ No newline at end of file
@@ -0,0 +1,72 @@
+from django.http import FileResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.form.api.utils import get_period_by_type_today
+from apps.home.services.offline_package import get_package
+
+from ..utils import get_request_employee
+
+
+class OfflinePackageDownloadView(APIView):
+    """
+    Xodimning joriy davr uchun oldindan yaratilgan offline SQLite paketini yuklab berish.
+    ETag sifatida fayl sha256 hashi beriladi, o'zgarmagan bo'lsa 304 qaytadi.
+    """
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'X-User-UUID',
+                openapi.IN_HEADER,
+                description="Xodim UUID raqami (header orqali)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                'weekly_type',
+                openapi.IN_QUERY,
+                description="Davr turi (masalan: 'weekly', 'monthly')",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        employee = get_request_employee(request)
+        if not employee:
+            return Response({"error": "Xodim topilmadi"}, status=status.HTTP_404_NOT_FOUND)
+
+        period_date = get_period_by_type_today(request.GET.get('weekly_type', 1))
+        if not period_date:
+            return Response({"error": "Faol davr topilmadi"}, status=status.HTTP_404_NOT_FOUND)
+
+        package = get_package(period_date.period_id, employee.uuid)
+        if package is None:
+            return Response({"error": "Offline paket hali tayyor emas"}, status=status.HTTP_404_NOT_FOUND)
+        entry, path = package
+
+        etag = quote_etag(entry['sha256'])
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        response = FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f'offline_{period_date.id}.sqlite',
+            content_type='application/vnd.sqlite3',
+        )
+        response['ETag'] = etag
+        response['X-Content-SHA256'] = entry['sha256']
+        response['X-Period-Date'] = str(period_date.id)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
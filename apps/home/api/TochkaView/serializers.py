@@ -18,11 +18,10 @@ class RastaSerializer(serializers.ModelSerializer):
         fields = ['id', 'uuid', 'name', 'hudud', 'is_active', 'is_checked', 'all_count', 'finished', 'in_proccess']
 
     def get_all_count(self, obj):
-        return len(getattr(obj, 'active_products', []))
+        return getattr(obj, 'products_count', 0)
 
     def get_finished(self, obj):
-        # print(getattr(obj, 'completed_history', []))
-        return len(getattr(obj, 'completed_history', []))
+        return getattr(obj, 'history_count', 0)
 
     def get_is_checked(self, obj):
         all_count = self.get_all_count(obj)
@@ -61,12 +60,12 @@ class TochkaSerializer(serializers.ModelSerializer):
         ntochkas = getattr(obj, 'active_ntochkas', [])
 
         for rasta in ntochkas:
-            total = len(getattr(rasta, 'active_products', []))
+            total = getattr(rasta, 'products_count', 0)
             if total == 0:
                 finished += 1
                 continue
 
-            completed = len(getattr(rasta, 'completed_history', []))
+            completed = getattr(rasta, 'history_count', 0)
             if completed == total:
                 finished += 1
 
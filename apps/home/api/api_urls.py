@@ -1,6 +1,7 @@
 from django.urls import path
 
 from .LoginView import views as login_views
+from .OfflinePackageView import views as offline_package_views
 from .TochkaView import views as tochka_views
 
 app_name = 'home'
@@ -8,4 +9,5 @@ app_name = 'home'
 urlpatterns = [
     path('login/', login_views.LoginView.as_view(), name='login'),
     path('tochka-list/', tochka_views.TochkaListView.as_view(), name='tochka-list'),
+    path('offline-package/', offline_package_views.OfflinePackageDownloadView.as_view(), name='offline-package'),
 ]
\ No newline at end of file
@@ -0,0 +1,152 @@
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import cached_property
+
+from rest_framework import authentication, exceptions
+
+from ..models import Employee, District
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'apps.home.employee-token'
+KEYWORD = 'Bearer'
+
+PERMISSION_FIELDS = (
+    'permission1', 'permission2', 'permission3', 'permission4', 'permission5',
+    'permission_plov', 'gps_permission',
+)
+# Tokenga yoziladigan maydonlar: ular o'zgarsa token qayta chiqarilishi kerak
+TOKEN_FIELDS = PERMISSION_FIELDS + ('district', 'lang')
+
+
+def _version_cache_key(employee_id):
+    return f'employee_token_version:{employee_id}'
+
+
+def _max_age():
+    return getattr(settings, 'EMPLOYEE_TOKEN_MAX_AGE', 60 * 60 * 24 * 30)
+
+
+def _version_ttl():
+    return getattr(settings, 'EMPLOYEE_TOKEN_VERSION_TTL', 5)
+
+
+def permission_bits(employee):
+    bits = 0
+    for index, field in enumerate(PERMISSION_FIELDS):
+        if getattr(employee, field):
+            bits |= 1 << index
+    return bits
+
+
+def issue_token(employee):
+    """
+    Xodim uchun HMAC bilan imzolangan ixcham token yaratish.
+    """
+    payload = {
+        'e': employee.id,
+        'u': employee.uuid.hex,
+        'd': employee.district_id,
+        'p': permission_bits(employee),
+        'l': employee.lang,
+        'v': employee.token_version,
+    }
+    return signing.dumps(payload, salt=TOKEN_SALT, compress=True)
+
+
+def get_token_version(employee_id):
+    """
+    Xodimning amaldagi token versiyasi (keshdan, bo'lmasa bazadan).
+    Kesh bir necha soniya (EMPLOYEE_TOKEN_VERSION_TTL) saqlanadi: revoke_tokens faqat o'z
+    jarayonining keshini tozalaydi, LocMemCache da boshqa ishchilar bekor qilingan tokenni
+    shu muddatdan ortiq qabul qilmasligi kerak.
+    """
+    key = _version_cache_key(employee_id)
+    version = cache.get(key)
+    if version is None:
+        version = Employee.objects.filter(id=employee_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(key, version, _version_ttl())
+    return version
+
+
+def forget_token_version(employee_id):
+    cache.delete(_version_cache_key(employee_id))
+
+
+def revoke_tokens(employee_ids):
+    """
+    Berilgan xodimlarning barcha chiqarilgan tokenlarini bekor qilish.
+    """
+    employee_ids = list(employee_ids)
+    Employee.objects.filter(id__in=employee_ids).update(token_version=F('token_version') + 1)
+    cache.delete_many([_version_cache_key(employee_id) for employee_id in employee_ids])
+
+
+class EmployeePrincipal:
+    """
+    Tokendan olingan xodim. Bazaga murojaat qilmasdan id, tuman, ruxsatlar va tilni beradi.
+    To'liq Employee kerak bo'lsa `employee` orqali olinadi (bitta so'rov).
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, payload):
+        self.id = payload['e']
+        self.uuid = payload['u']
+        self.district_id = payload['d']
+        self.permissions = payload['p']
+        self.lang = payload['l']
+        self.token_version = payload['v']
+
+    @property
+    def pk(self):
+        return self.id
+
+    def has_permission(self, field):
+        return bool(self.permissions & (1 << PERMISSION_FIELDS.index(field)))
+
+    @cached_property
+    def employee(self):
+        return Employee.objects.get(id=self.id)
+
+    @cached_property
+    def district(self):
+        return District.objects.select_related('region').get(id=self.district_id)
+
+    def __str__(self):
+        return f'{self.id}'
+
+
+class EmployeeTokenAuthentication(authentication.BaseAuthentication):
+    """
+    `Authorization: Bearer <token>` headerini xotirada tekshiradi.
+    Header bo'lmasa None qaytaradi (eski X-User-UUID yo'li ishlayveradi).
+    """
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != KEYWORD.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Token noto'g'ri formatda.")
+
+        try:
+            payload = signing.loads(auth[1].decode(), salt=TOKEN_SALT, max_age=_max_age())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed("Token muddati tugagan.")
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed("Token yaroqsiz.")
+
+        if get_token_version(payload['e']) != payload['v']:
+            raise exceptions.AuthenticationFailed("Token bekor qilingan.")
+
+        return EmployeePrincipal(payload), auth[1]
+
+    def authenticate_header(self, request):
+        return KEYWORD
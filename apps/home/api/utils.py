@@ -1,5 +1,6 @@
 import logging
 from ..models import Employee, NTochka
+from .authentication import EmployeePrincipal
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,22 @@ def get_employee_by_uuid(uuid):
         logger.error(f"Employee with UUID {uuid} not found")
         return None
 
+def get_request_employee(request):
+    """
+    Get the employee of an API request.
+
+    Token bilan kelgan so'rovda bazaga murojaatsiz EmployeePrincipal qaytariladi,
+    aks holda eski X-User-UUID header orqali Employee olinadi.
+
+    :param request: DRF request
+    :return: EmployeePrincipal, Employee instance or None if not found
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, EmployeePrincipal):
+        return user
+    return get_employee_by_uuid(request.META.get('HTTP_X_USER_UUID'))
+
+
 def get_ntochka_by_uuid(uuid):
     """
     Get NTochka by UUID.
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.home.models import Employee, PeriodDate
+from apps.home.services.offline_package import build_offline_packages
+
+
+class Command(BaseCommand):
+    help = "Xodimlar uchun offline SQLite paketlarini (obyekt, rasta, mahsulot, davr statuslari) yaratadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, help="PeriodDate id (berilmasa eng oxirgisi)")
+        parser.add_argument('--workers', type=int, default=None, help="Parallel jarayonlar soni")
+        parser.add_argument('--employee', action='append', default=None, help="Faqat shu xodim UUID si (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        if options['period_date']:
+            period_date = PeriodDate.objects.filter(id=options['period_date']).first()
+        else:
+            period_date = PeriodDate.objects.order_by('-date', '-id').first()
+        if period_date is None:
+            raise CommandError("Davr sanasi topilmadi")
+
+        employee_ids = None
+        if options['employee']:
+            employee_ids = list(
+                Employee.objects.filter(uuid__in=options['employee']).values_list('id', flat=True)
+            )
+
+        manifest = build_offline_packages(period_date.id, employee_ids=employee_ids, workers=options['workers'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{period_date} uchun {len(manifest.get('packages', {}))} ta offline paket tayyor"
+            )
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.home.models import PeriodDate
+from apps.home.services.period_rollover import plan_rollover, run_rollover
+
+
+class Command(BaseCommand):
+    help = "Oldingi haftalik davrning 'vaqtinchalik'/'mavsumiy' historylarini yangi davrga ko'chiradi (to'xtagan joyidan davom etadi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period-date', type=int, required=True, help="Yangi davrning PeriodDate id si")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Bitta tranzaksiyadagi historylar soni")
+
+    def handle(self, *args, **options):
+        period_date = PeriodDate.objects.select_related('period').filter(id=options['period_date']).first()
+        if period_date is None:
+            raise CommandError("Davr sanasi topilmadi")
+        if plan_rollover(period_date) is None and not hasattr(period_date, 'rollover'):
+            raise CommandError("Bu davr sanasi uchun ko'chirish talab qilinmaydi")
+
+        rollover = run_rollover(period_date.id, chunk_size=options['chunk_size'])
+        if rollover is None:
+            raise CommandError("Bu davr sanasi boshqa ishchi tomonidan ko'chirilmoqda")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{period_date}: {rollover.processed} ta history ko'rildi, {rollover.created_count} ta yaratildi"
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0037_alter_ntochka_is_active_alter_tochka_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='token_version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Token versiyasi'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-18 09:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0038_employee_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodRollover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan sana')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('running', 'Bajarilmoqda'), ('done', 'Tugallangan'), ('failed', 'Xatolik')], default='pending', max_length=20, verbose_name='Holati')),
+                ('last_history_id', models.BigIntegerField(default=0, verbose_name="Oxirgi ko'chirilgan history id")),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name="Ko'rilgan historylar")),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Yaratilgan historylar')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Xatolik')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Boshlangan vaqt')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Tugagan vaqt')),
+                ('period_date', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollover', to='home.perioddate', verbose_name='Yangi davr sanasi')),
+                ('previous_period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollovers', to='home.period', verbose_name='Oldingi davr')),
+            ],
+            options={
+                'verbose_name': "Davr ko'chirilishi",
+                'verbose_name_plural': "Davr ko'chirilishlari",
+                'db_table': 'period_rollover',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0039_period_rollover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True, verbose_name='Kalit')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='Oxirgi qiymat')),
+            ],
+            options={
+                'verbose_name': 'Kod ketma-ketligi',
+                'verbose_name_plural': 'Kod ketma-ketliklari',
+                'db_table': 'code_sequence',
+            },
+        ),
+    ]
@@ -224,6 +224,7 @@ class Employee(BaseModel):
     permission_plov = models.BooleanField(default=False, verbose_name=_("Palov uchun ruxsat"))
     gps_permission = models.BooleanField(default=True, verbose_name=_("GPS ruxsat"))
     lang = models.CharField(max_length=10, default='uz', verbose_name=_("Til"), choices=(('uz', 'Uzbek'), ('ru', 'Rus')), blank=True)
+    token_version = models.PositiveIntegerField(default=1, verbose_name=_("Token versiyasi"))
 
     def __str__(self):
         return f"{self.login}"
@@ -237,3 +238,52 @@ class Employee(BaseModel):
             models.Index(fields=['full_name']),
         ]
 
+
+
+class PeriodRollover(BaseModel):
+    """
+    Yangi haftalik davr ochilganda oldingi davrning 'vaqtinchalik'/'mavsumiy' historylarini
+    ko'chirish jarayoni. last_history_id - qayta ishga tushirilganda davom ettiriladigan nuqta.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Navbatda'),
+        ('running', 'Bajarilmoqda'),
+        ('done', 'Tugallangan'),
+        ('failed', 'Xatolik'),
+    )
+
+    period_date = models.OneToOneField(PeriodDate, on_delete=models.CASCADE, related_name='rollover', verbose_name=_("Yangi davr sanasi"))
+    previous_period = models.ForeignKey(Period, on_delete=models.CASCADE, related_name='rollovers', verbose_name=_("Oldingi davr"))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name=_("Holati"))
+    last_history_id = models.BigIntegerField(default=0, verbose_name=_("Oxirgi ko'chirilgan history id"))
+    processed = models.PositiveIntegerField(default=0, verbose_name=_("Ko'rilgan historylar"))
+    created_count = models.PositiveIntegerField(default=0, verbose_name=_("Yaratilgan historylar"))
+    error = models.TextField(blank=True, default='', verbose_name=_("Xatolik"))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Boshlangan vaqt"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Tugagan vaqt"))
+
+    def __str__(self):
+        return f"{self.period_date_id}: {self.status}"
+
+    class Meta:
+        verbose_name = "Davr ko'chirilishi"
+        verbose_name_plural = "Davr ko'chirilishlari"
+        ordering = ['-id']
+        db_table = 'period_rollover'
+
+
+class CodeSequence(models.Model):
+    """
+    Obyekt va rasta kodlari uchun ketma-ketlik hisoblagichi.
+    key: 'tochka:<district_id>' yoki 'ntochka:<tochka_id>'; last_value - berilgan oxirgi raqam.
+    """
+    key = models.CharField(max_length=50, unique=True, verbose_name=_("Kalit"))
+    last_value = models.BigIntegerField(default=0, verbose_name=_("Oxirgi qiymat"))
+
+    def __str__(self):
+        return f"{self.key}: {self.last_value}"
+
+    class Meta:
+        verbose_name = "Kod ketma-ketligi"
+        verbose_name_plural = "Kod ketma-ketliklari"
+        db_table = 'code_sequence'
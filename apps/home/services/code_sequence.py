@@ -0,0 +1,112 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+
+from apps.home.models import CodeSequence, Tochka, NTochka
+
+logger = logging.getLogger(__name__)
+
+
+def _block_size():
+    return max(1, getattr(settings, 'CODE_SEQUENCE_BLOCK_SIZE', 20))
+
+
+def _max_suffix(codes, prefix):
+    """
+    Mavjud kodlardagi prefiksdan keyingi eng katta raqam (ketma-ketlikni boshlash uchun).
+    """
+    values = [
+        int(code[len(prefix):]) for code in codes
+        if code and code.startswith(prefix) and code[len(prefix):].isdigit()
+    ]
+    return max(values, default=0)
+
+
+class CodeAllocator:
+    """
+    CodeSequence jadvalidan raqamlarni bloklab olish.
+
+    Jarayon har bir kalit uchun bir so'rovda CODE_SEQUENCE_BLOCK_SIZE ta raqam band qiladi
+    va keyingi kodlarni bazaga murojaatsiz beradi. Tashqi tranzaksiya ichida chaqirilsa
+    (rollback bo'lsa band qilish ham bekor bo'ladi) faqat bitta raqam olinadi.
+    Jarayon to'xtaganda blokning ishlatilmagan qismi tashlab yuboriladi (kodlarda bo'shliq).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def _reserve(self, key, size, seed):
+        """
+        [start, end] oralig'ini band qilish. Kalit yo'q bo'lsa seed() dan boshlanadi.
+        """
+        with transaction.atomic():
+            sequence = CodeSequence.objects.select_for_update().filter(key=key).first()
+            if sequence is None:
+                try:
+                    with transaction.atomic():
+                        sequence = CodeSequence.objects.create(key=key, last_value=seed())
+                except IntegrityError:
+                    # Boshqa jarayon shu paytda yaratdi
+                    sequence = CodeSequence.objects.select_for_update().get(key=key)
+            start = sequence.last_value + 1
+            sequence.last_value += size
+            CodeSequence.objects.filter(pk=sequence.pk).update(last_value=sequence.last_value)
+        return start, sequence.last_value
+
+    def next_value(self, key, seed):
+        """
+        :param key: ketma-ketlik kaliti
+        :param seed: kalit birinchi marta ishlatilganda boshlang'ich qiymatni qaytaruvchi funksiya
+        """
+        connection = connections[router.db_for_write(CodeSequence)]
+        if connection.in_atomic_block:
+            return self._reserve(key, 1, seed)[0]
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                block = list(self._reserve(key, _block_size(), seed))
+                self._blocks[key] = block
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+code_allocator = CodeAllocator()
+
+
+def next_tochka_code(district):
+    """
+    Obyekt kodi: tuman SOATO si + '-' + tuman ichidagi tartib raqami (kamida 4 xonali).
+    Ajratuvchi bo'lmasa bir SOATO boshqasining prefiksi bo'lganda (2703 va 27031) kodlar to'qnashadi.
+    """
+    prefix = f"{district.soato}-"
+
+    def seed():
+        return _max_suffix(
+            Tochka.objects.filter(district=district, code__startswith=prefix).order_by().values_list('code', flat=True),
+            prefix
+        )
+
+    return f"{prefix}{code_allocator.next_value(f'tochka:{district.id}', seed):04d}"
+
+
+def next_ntochka_code(tochka):
+    """
+    Rasta kodi: obyekt kodi + '-' + obyekt ichidagi tartib raqami (kamida 3 xonali).
+    """
+    prefix = f"{tochka.code}-"
+
+    def seed():
+        return _max_suffix(
+            NTochka.objects.filter(hudud=tochka).order_by().values_list('code', flat=True), prefix
+        )
+
+    return f"{prefix}{code_allocator.next_value(f'ntochka:{tochka.id}', seed):03d}"
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.form.models import Birlik, Product, ProductCategory, TochkaProduct, TochkaProductHistory
+from apps.home.models import Employee, NTochka, PeriodDate, Tochka
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE birlik (id INTEGER PRIMARY KEY, name TEXT, code TEXT, miqdor REAL);
+CREATE TABLE product_category (
+    id INTEGER PRIMARY KEY, name TEXT, code TEXT, number INTEGER, union_name TEXT,
+    rasfas INTEGER, product_type INTEGER, weekly_type INTEGER, logo TEXT
+);
+CREATE TABLE product (
+    id INTEGER PRIMARY KEY, uuid TEXT, name TEXT, category_id INTEGER, code TEXT, price REAL,
+    top INTEGER, bottom INTEGER, unit_id INTEGER, barcode TEXT, weekly_type INTEGER,
+    is_index INTEGER, is_import INTEGER, is_special INTEGER
+);
+CREATE TABLE obyekt (
+    id INTEGER PRIMARY KEY, uuid TEXT, name TEXT, icon TEXT, code TEXT, address TEXT,
+    lat REAL, lon REAL, weekly_type INTEGER, product_type TEXT, in_proccess INTEGER
+);
+CREATE TABLE rasta (
+    id INTEGER PRIMARY KEY, uuid TEXT, name TEXT, hudud_id INTEGER, code TEXT,
+    weekly_type INTEGER, product_type TEXT, in_proccess INTEGER
+);
+CREATE TABLE rasta_product (
+    id INTEGER PRIMARY KEY, product_id INTEGER, ntochka_id INTEGER, hudud_id INTEGER,
+    last_price REAL, previous_price REAL, miqdor REAL, is_weekly INTEGER
+);
+CREATE TABLE period_status (
+    id INTEGER PRIMARY KEY, tochka_product_id INTEGER, period_id INTEGER, status TEXT,
+    price REAL, is_from_period_create INTEGER
+);
+CREATE INDEX rasta_hudud_idx ON rasta (hudud_id);
+CREATE INDEX rasta_product_ntochka_idx ON rasta_product (ntochka_id);
+CREATE INDEX period_status_tochka_product_idx ON period_status (tochka_product_id);
+"""
+
+
+def package_root():
+    return Path(getattr(settings, 'OFFLINE_PACKAGE_ROOT', settings.BASE_DIR / 'offline_packages'))
+
+
+def package_dir(period_id):
+    """
+    Paketlar Period bo'yicha saqlanadi: davrning keyingi sanalarida ham shu paket beriladi.
+    """
+    return package_root() / str(period_id)
+
+
+def _multi(value):
+    return ','.join(value) if value else ''
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_employee_package(employee_id, period_date_id):
+    """
+    Bitta xodim uchun offline SQLite faylini yaratish.
+
+    :return: manifest yozuvi (uuid, file, sha256, size)
+    """
+    period_date = PeriodDate.objects.select_related('period').get(id=period_date_id)
+    employee = Employee.objects.only('id', 'uuid').get(id=employee_id)
+
+    tochkas = list(Tochka.objects.filter(employee_id=employee_id, is_active=True).values_list(
+        'id', 'uuid', 'name', 'icon', 'code', 'address', 'lat', 'lon', 'weekly_type', 'product_type', 'in_proccess'
+    ))
+    tochka_ids = [row[0] for row in tochkas]
+    ntochkas = list(NTochka.objects.filter(hudud_id__in=tochka_ids, is_active=True).values_list(
+        'id', 'uuid', 'name', 'hudud_id', 'code', 'weekly_type', 'product_type', 'in_proccess'
+    ))
+    ntochka_ids = [row[0] for row in ntochkas]
+    tochka_products = list(TochkaProduct.objects.filter(
+        ntochka_id__in=ntochka_ids, is_active=True, is_udalen=False
+    ).values_list(
+        'id', 'product_id', 'ntochka_id', 'hudud_id', 'last_price', 'previous_price', 'miqdor', 'is_weekly'
+    ))
+    product_ids = {row[1] for row in tochka_products}
+    products = list(Product.objects.filter(id__in=product_ids).values_list(
+        'id', 'uuid', 'name', 'category_id', 'code', 'price', 'top', 'bottom', 'unit_id', 'barcode',
+        'weekly_type', 'is_index', 'is_import', 'is_special'
+    ))
+    categories = list(ProductCategory.objects.filter(
+        id__in={row[3] for row in products}
+    ).values_list(
+        'id', 'name', 'code', 'number', 'union', 'rasfas', 'product_type', 'weekly_type', 'logo'
+    ))
+    units = list(Birlik.objects.filter(
+        id__in={row[8] for row in products}
+    ).values_list('id', 'name', 'code', 'miqdor'))
+    statuses = list(TochkaProductHistory.objects.filter(
+        hudud_id__in=tochka_ids,
+        period__period_id=period_date.period_id,
+    ).values_list('id', 'tochka_product_id', 'period_id', 'status', 'price', 'is_from_period_create'))
+
+    target_dir = package_dir(period_date.period_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    path = target_dir / f'{employee.uuid}.sqlite'
+    tmp_path = path.with_suffix('.sqlite.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.executescript(SCHEMA)
+        db.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('employee_id', str(employee_id)),
+            ('employee_uuid', str(employee.uuid)),
+            ('period_date_id', str(period_date.id)),
+            ('period_id', str(period_date.period_id)),
+            ('period_type', period_date.period.period_type),
+            ('date', period_date.date.isoformat()),
+            ('built_at', timezone.now().isoformat()),
+        ])
+        db.executemany('INSERT INTO birlik VALUES (?, ?, ?, ?)', units)
+        db.executemany('INSERT INTO product_category VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            row[:8] + (row[8] or '',) for row in categories
+        ])
+        db.executemany('INSERT INTO product VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            (row[0], str(row[1])) + row[2:] for row in products
+        ])
+        db.executemany('INSERT INTO obyekt VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            (row[0], str(row[1])) + row[2:9] + (_multi(row[9]), row[10]) for row in tochkas
+        ])
+        db.executemany('INSERT INTO rasta VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [
+            (row[0], str(row[1])) + row[2:6] + (_multi(row[6]), row[7]) for row in ntochkas
+        ])
+        db.executemany('INSERT INTO rasta_product VALUES (?, ?, ?, ?, ?, ?, ?, ?)', tochka_products)
+        db.executemany('INSERT INTO period_status VALUES (?, ?, ?, ?, ?, ?)', statuses)
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp_path, path)
+
+    return {
+        'employee_id': employee_id,
+        'uuid': str(employee.uuid),
+        'file': path.name,
+        'sha256': _sha256(path),
+        'size': path.stat().st_size,
+    }
+
+
+def _worker_init():
+    # Har bir jarayon o'z DB ulanishini ochishi kerak
+    connections.close_all()
+
+
+def build_offline_packages(period_date_id, employee_ids=None, workers=None):
+    """
+    Davr sanasi uchun xodimlarning offline paketlarini parallel yaratish va manifest yozish.
+
+    :param period_date_id: PeriodDate id (paket uning Period i uchun yoziladi)
+    :param employee_ids: faqat shu xodimlar (None - barcha obyekti bor xodimlar)
+    :param workers: jarayonlar soni (None - settings.OFFLINE_PACKAGE_WORKERS)
+    :return: manifest dict
+    """
+    if employee_ids is None:
+        employee_ids = list(
+            Tochka.objects.filter(is_active=True).values_list('employee_id', flat=True).distinct()
+        )
+    workers = workers or getattr(settings, 'OFFLINE_PACKAGE_WORKERS', os.cpu_count() or 1)
+    # Celery prefork worker (daemon) bola jarayon yarata olmaydi
+    if multiprocessing.current_process().daemon:
+        workers = 1
+
+    entries = []
+    if workers > 1 and len(employee_ids) > 1:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) as pool:
+            futures = [pool.submit(build_employee_package, employee_id, period_date_id) for employee_id in employee_ids]
+            for future in futures:
+                try:
+                    entries.append(future.result())
+                except Exception as e:
+                    logger.error(f"Offline paket yaratishda xatolik: {e}")
+    else:
+        for employee_id in employee_ids:
+            try:
+                entries.append(build_employee_package(employee_id, period_date_id))
+            except Exception as e:
+                logger.error(f"Offline paket yaratishda xatolik (xodim {employee_id}): {e}")
+
+    period_id = PeriodDate.objects.values_list('period_id', flat=True).get(id=period_date_id)
+    manifest = read_manifest(period_id)
+    manifest['period_id'] = period_id
+    manifest['period_date_id'] = period_date_id
+    manifest['built_at'] = timezone.now().isoformat()
+    manifest.setdefault('packages', {})
+    for entry in entries:
+        manifest['packages'][entry['uuid']] = entry
+
+    target_dir = package_dir(period_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = target_dir / f'{MANIFEST_NAME}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, target_dir / MANIFEST_NAME)
+    return manifest
+
+
+def schedule_build(period_date_id):
+    """
+    OFFLINE_PACKAGES_ON_PERIOD_OPEN yoqilgan bo'lsa paketlar taskini tranzaksiya yakunlangach yuborish.
+    """
+    if not getattr(settings, 'OFFLINE_PACKAGES_ON_PERIOD_OPEN', False):
+        return
+
+    def enqueue():
+        from apps.home.tasks import build_offline_packages_task
+        try:
+            build_offline_packages_task.delay(period_date_id)
+        except Exception as e:
+            logger.error(f"Offline paketlar taskini yuborishda xatolik: {e}")
+
+    transaction.on_commit(enqueue)
+
+
+def read_manifest(period_id):
+    path = package_dir(period_id) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def get_package(period_id, employee_uuid):
+    """
+    Xodim paketining manifest yozuvi va fayl yo'li. Topilmasa None.
+    """
+    entry = read_manifest(period_id).get('packages', {}).get(str(employee_uuid))
+    if not entry:
+        return None
+    path = package_dir(period_id) / entry['file']
+    if not path.exists():
+        return None
+    return entry, path
@@ -0,0 +1,153 @@
+import copy
+import threading
+import time
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.common.services.cache_versions import get_version, bump_version
+from apps.home.models import PeriodDate
+
+VERSION_NAME = 'period_calendar'
+
+# API da davr turi son ko'rinishida ham keladi (weekly_type=1/2)
+PERIOD_TYPES = {'1': 'weekly', '2': 'monthly', 1: 'weekly', 2: 'monthly'}
+
+_lock = threading.Lock()
+_calendar = None
+
+
+def _grace_days():
+    return getattr(settings, 'PERIOD_CALENDAR_GRACE_DAYS', 0)
+
+
+def _max_age():
+    return getattr(settings, 'PERIOD_CALENDAR_MAX_AGE', 30)
+
+
+def normalize_period_type(period_type):
+    return PERIOD_TYPES.get(period_type, period_type)
+
+
+class PeriodCalendar:
+    """
+    Barcha Period/PeriodDate larning xotiradagi indeksi.
+
+    Har bir period_type uchun sanalar saralangan ro'yxatda saqlanadi, "faol davr sanasi"
+    bisect bilan O(log n) da topiladi. Bazaga faqat qurishda bitta so'rov yuboriladi.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.by_id = {}
+        self.by_period = {}
+        self.period_ids = {}
+        self._dates = {}
+        self._entries = {}
+
+        period_dates = PeriodDate.objects.select_related('period').order_by('date', 'id')
+        for period_date in period_dates:
+            period_type = period_date.period.period_type
+            self.by_id[period_date.id] = period_date
+            self.by_period.setdefault(period_date.period_id, []).append(period_date)
+            self._dates.setdefault(period_type, []).append(period_date.date)
+            self._entries.setdefault(period_type, []).append(period_date)
+
+        for period_id, dates in self.by_period.items():
+            period_type = dates[0].period.period_type
+            self.period_ids.setdefault(period_type, []).append(period_id)
+        for ids in self.period_ids.values():
+            ids.sort()
+
+    def active(self, period_type='weekly', date=None):
+        """
+        Berilgan sana uchun faol PeriodDate: shu turdagi sana <= date bo'lgan eng oxirgisi,
+        agar date uning Period idagi oxirgi sanadan (+ grace) oshmasa. Aks holda None.
+        """
+        period_type = normalize_period_type(period_type)
+        date = date or timezone.localdate()
+        dates = self._dates.get(period_type)
+        if not dates:
+            return None
+        position = bisect_right(dates, date)
+        if position == 0:
+            return None
+        period_date = self._entries[period_type][position - 1]
+        last_date = self.by_period[period_date.period_id][-1].date
+        if date > last_date + timedelta(days=_grace_days()):
+            return None
+        return copy.copy(period_date)
+
+    def get(self, period_date_id):
+        period_date = self.by_id.get(period_date_id)
+        return copy.copy(period_date) if period_date else None
+
+    def period_dates(self, period_id):
+        """
+        Period ning barcha sanalari (sana bo'yicha saralangan).
+        """
+        return [copy.copy(period_date) for period_date in self.by_period.get(period_id, [])]
+
+    def previous_period_id(self, period_type, period_id):
+        """
+        Shu turdagi id bo'yicha oldingi Period id si (sanasi bor bo'lganlar ichida).
+        """
+        ids = self.period_ids.get(normalize_period_type(period_type), [])
+        position = bisect_right(ids, period_id - 1)
+        return ids[position - 1] if position else None
+
+    def neighbours(self, period_date_id):
+        """
+        Shu turdagi (sana bo'yicha) oldingi va keyingi PeriodDate. Yo'q bo'lsa None.
+        """
+        period_date = self.by_id.get(period_date_id)
+        if period_date is None:
+            return None, None
+        entries = self._entries[period_date.period.period_type]
+        position = entries.index(period_date)
+        previous = entries[position - 1] if position else None
+        following = entries[position + 1] if position + 1 < len(entries) else None
+        return (
+            copy.copy(previous) if previous else None,
+            copy.copy(following) if following else None,
+        )
+
+
+def get_calendar():
+    """
+    Joriy davr kalendari. Period/PeriodDate o'zgargan bo'lsa qayta quriladi. Versiya keshda:
+    umumiy bo'lmagan keshda boshqa jarayondagi o'zgarish ko'rinmaydi, shuning uchun kalendar
+    PERIOD_CALENDAR_MAX_AGE soniyadan eski bo'lsa ham versiyadan qat'i nazar qayta quriladi.
+    """
+    global _calendar
+    version = get_version(VERSION_NAME)
+
+    def is_fresh(calendar):
+        return (
+            calendar is not None and calendar.version == version
+            and time.monotonic() - calendar.built_at < _max_age()
+        )
+
+    calendar = _calendar
+    if not is_fresh(calendar):
+        with _lock:
+            if not is_fresh(_calendar):
+                _calendar = PeriodCalendar(version)
+            calendar = _calendar
+    return calendar
+
+
+def is_only_date(period_date):
+    """
+    PeriodDate o'z Period idagi yagona sanami. Bazadan tekshiriladi: Period/PeriodDate
+    signallari tranzaksiya ichida ishlaydi, u yerda get_calendar() yakunlanmagan qatorlarni
+    jarayon kalendariga yozib qo'yardi.
+    """
+    return not PeriodDate.objects.filter(period_id=period_date.period_id).exclude(id=period_date.id).exists()
+
+
+def invalidate_calendar():
+    bump_version(VERSION_NAME)
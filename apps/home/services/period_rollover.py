@@ -0,0 +1,203 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.form.models import TochkaProduct, TochkaProductHistory
+from apps.form.signals import histories_changed
+from apps.home.models import PeriodDate, PeriodRollover
+
+from . import offline_package
+from .period_calendar import is_only_date
+
+logger = logging.getLogger(__name__)
+
+ROLLOVER_STATUSES = ['vaqtinchalik', 'mavsumiy']
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _claim(period_date_id, lock_timeout):
+    """
+    Ko'chirishni bazada egallash (shartli UPDATE): navbatdagi yoki xato bilan to'xtagan yozuv,
+    yoki lock_timeout soniyadan beri yangilanmagan (ishchisi o'lgan) 'running' yozuv.
+    Har bir bo'lak updated_at ni yangilaydi, shuning uchun ishlayotgan ko'chirish egallanmaydi.
+
+    :return: True - shu ishchi egalladi
+    """
+    now = timezone.now()
+    return bool(PeriodRollover.objects.filter(
+        Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=now - timedelta(seconds=lock_timeout)),
+        period_date_id=period_date_id,
+    ).update(status='running', error='', started_at=Coalesce('started_at', now), updated_at=now))
+
+
+def plan_rollover(period_date):
+    """
+    Yangi PeriodDate uchun ko'chirish yozuvini yaratish.
+
+    Faqat haftalik Period ning birinchi sanasi uchun va oldingi haftalik Period mavjud
+    bo'lsa yaratiladi, aks holda None.
+    """
+    if period_date.period.period_type != 'weekly':
+        return None
+
+    # Signal tranzaksiyasi ichida chaqiriladi, shuning uchun kalendar emas, baza
+    if not is_only_date(period_date):
+        return None
+
+    previous_period_id = PeriodDate.objects.filter(
+        period__period_type='weekly',
+        period_id__lt=period_date.period_id,
+    ).order_by('-period_id').values_list('period_id', flat=True).first()
+    if not previous_period_id:
+        return None
+
+    rollover, _ = PeriodRollover.objects.get_or_create(
+        period_date=period_date,
+        defaults={'previous_period_id': previous_period_id},
+    )
+    return rollover
+
+
+def schedule_rollover(period_date_id):
+    """
+    Ko'chirish taskini tranzaksiya yakunlangandan keyin yuborish.
+    """
+    def enqueue():
+        from apps.home.tasks import period_rollover_task
+        try:
+            period_rollover_task.delay(period_date_id)
+        except Exception as e:
+            logger.error(f"Davr ko'chirish taskini yuborishda xatolik: {e}")
+
+    transaction.on_commit(enqueue)
+
+
+def _write_chunk(rollover, period_date, chunk):
+    """
+    Bitta bo'lak: yangi davrda hali history si yo'q rasta mahsulotlari uchun 0 narxli history
+    yaratish va narxlarini surish. Progress shu tranzaksiyada saqlanadi.
+
+    Rasta mahsulotlari tranzaksiya ichida select_for_update bilan qulflanadi va history borligi
+    qulfdan keyin tekshiriladi: parallel kiritilgan narx ko'rinadi va 0 bilan ustidan yozilmaydi.
+    """
+    tochka_product_ids = {history.tochka_product_id for history in chunk}
+
+    with transaction.atomic():
+        tochka_products = {
+            tochka_product.id: tochka_product
+            for tochka_product in TochkaProduct.objects.select_for_update().filter(
+                id__in=tochka_product_ids
+            ).order_by('id')
+        }
+        already = set(
+            TochkaProductHistory.objects.filter(
+                period=period_date,
+                tochka_product_id__in=tochka_product_ids
+            ).values_list('tochka_product_id', flat=True)
+        )
+
+        new_histories = []
+        changed = {}
+        for history in chunk:
+            tochka_product = tochka_products.get(history.tochka_product_id)
+            if tochka_product is None or tochka_product.id in already or tochka_product.id in changed:
+                continue
+
+            tochka_product.previous_price = tochka_product.last_price
+            tochka_product.last_price = 0
+            changed[tochka_product.id] = tochka_product
+
+            new_histories.append(
+                TochkaProductHistory(
+                    product_id=history.product_id,
+                    ntochka_id=history.ntochka_id,
+                    hudud_id=history.hudud_id,
+                    tochka_product=tochka_product,
+                    employee_id=history.employee_id,
+                    period=period_date,
+                    status=history.status,  # Oldingi status saqlanadi
+                    price=0,
+                    unit_price=0,
+                    unit_miqdor=tochka_product.miqdor,
+                    is_from_period_create=True,
+                )
+            )
+
+        if changed:
+            TochkaProduct.objects.bulk_update(changed.values(), ['last_price', 'previous_price'])
+        if new_histories:
+            TochkaProductHistory.objects.bulk_create(
+                new_histories,
+                ignore_conflicts=True  # parallel yuborilgan narx bilan to'qnashsa
+            )
+            histories_changed.send(sender=TochkaProductHistory, histories=new_histories)
+
+        rollover.last_history_id = chunk[-1].id
+        rollover.processed += len(chunk)
+        rollover.created_count += len(new_histories)
+        rollover.save(update_fields=['last_history_id', 'processed', 'created_count', 'updated_at'])
+
+
+def run_rollover(period_date_id, chunk_size=None):
+    """
+    Oldingi davrning 'vaqtinchalik'/'mavsumiy' historylarini yangi davrga bo'laklab ko'chirish.
+
+    Historylar id bo'yicha .iterator(chunk_size) bilan oqim qilib o'qiladi, har bir bo'lak
+    alohida tranzaksiyada yoziladi. To'xtab qolsa keyingi ishga tushirish last_history_id
+    dan davom etadi. Bir davr sanasini bir vaqtda faqat bitta ishchi ko'chiradi: yozuv bazada
+    shartli UPDATE bilan egallanadi (_claim).
+
+    :return: PeriodRollover yoki None (boshqa ishchi band yoki yozuv yo'q)
+    """
+    chunk_size = chunk_size or _setting('PERIOD_ROLLOVER_CHUNK_SIZE', 2000)
+    claimed = _claim(period_date_id, _setting('PERIOD_ROLLOVER_LOCK_TIMEOUT', 60 * 30))
+    rollover = PeriodRollover.objects.select_related('period_date').filter(period_date_id=period_date_id).first()
+    if not claimed:
+        if rollover is not None and rollover.status == 'running':
+            logger.info(f"Davr sanasi {period_date_id} boshqa ishchi tomonidan ko'chirilmoqda")
+            return None
+        return rollover
+
+    previous_period_dates = list(
+        PeriodDate.objects.filter(period_id=rollover.previous_period_id).values_list('id', flat=True)
+    )
+    previous_histories = TochkaProductHistory.objects.filter(
+        period__in=previous_period_dates,
+        status__in=ROLLOVER_STATUSES,
+        tochka_product__is_weekly=True,
+        id__gt=rollover.last_history_id,
+    ).order_by('id')
+
+    try:
+        chunk = []
+        for history in previous_histories.iterator(chunk_size=chunk_size):
+            chunk.append(history)
+            if len(chunk) >= chunk_size:
+                _write_chunk(rollover, rollover.period_date, chunk)
+                chunk = []
+        if chunk:
+            _write_chunk(rollover, rollover.period_date, chunk)
+    except Exception as e:
+        rollover.status = 'failed'
+        rollover.error = str(e)
+        rollover.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    rollover.status = 'done'
+    rollover.finished_at = timezone.now()
+    rollover.save(update_fields=['status', 'finished_at', 'updated_at'])
+    logger.info(
+        f"Davr sanasi {period_date_id} ko'chirildi: {rollover.processed} ta ko'rildi, "
+        f"{rollover.created_count} ta yaratildi"
+    )
+    # Offline paketlar ko'chirilgan statuslar bilan yaratiladi
+    offline_package.schedule_build(period_date_id)
+    return rollover
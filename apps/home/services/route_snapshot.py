@@ -0,0 +1,281 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.common.services.cache_versions import bump_version, get_version, get_versions
+from apps.form.models import TochkaProduct, TochkaProductHistory
+from apps.home.models import Tochka, NTochka
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_TYPES = {'food': '1', 'nofood': '2', 'services': '3'}
+
+
+def _timeout():
+    return getattr(settings, 'ROUTE_SNAPSHOT_TIMEOUT', 60 * 60 * 6)
+
+
+def _version_name(employee_id):
+    return f'route_snapshot:{employee_id}'
+
+
+def _registry_key(employee_id, version):
+    return f'route_snapshot_keys:{employee_id}:{version}'
+
+
+def _registered_keys(employee_id, version):
+    """
+    Xodimning shu versiyadagi nusxalari kalitlari (takrorlanmasdan).
+    """
+    registry_key = _registry_key(employee_id, version)
+    count = cache.get(f'{registry_key}:count') or 0
+    if not count:
+        return []
+    slots = cache.get_many([f'{registry_key}:{slot}' for slot in range(1, count + 1)])
+    return list(dict.fromkeys(slots.values()))
+
+
+class RouteSnapshot:
+    """
+    Xodim marshruti (Tochka -> NTochka -> hisoblagichlar) ning keshdagi nusxasi.
+
+    Kalit: (employee, xodim versiyasi, PeriodDate, weekly_type, product_type). Planshet
+    yangilanishi bitta cache.get bilan javob oladi, history yozilganda faqat tegishli rasta
+    hisoblagichlari qayta hisoblanadi (refresh_ntochkas), obyekt/rasta holati o'zgarganda
+    xodim versiyasi oshiriladi va barcha eski nusxalar o'z-o'zidan eskiradi (invalidate_employees).
+
+    Versiya va kalitlar ro'yxati keshda atomar (incr) yuritiladi. Bir nechta jarayonda
+    (gunicorn ishchilari) to'g'ri ishlashi uchun umumiy kesh (USE_REDIS) kerak: locmem da
+    har bir jarayon o'z nusxasini ROUTE_SNAPSHOT_TIMEOUT gacha eski holda berishi mumkin.
+    """
+
+    def __init__(self, employee_id, period_date, weekly_type='weekly', product_type='1'):
+        self.employee_id = employee_id
+        self.version = get_version(_version_name(employee_id))
+        self.period_date = period_date
+        self.period_type = weekly_type
+        self.weekly_type = 1 if weekly_type == 'weekly' else 2
+        self.product_type = product_type
+
+    @classmethod
+    def from_request(cls, employee_id, period_date, request):
+        product_type = PRODUCT_TYPES.get(request.GET.get('obyekt_type', None), '1')
+        weekly_type = request.GET.get('weekly_type', 1)
+        return cls(employee_id, period_date, weekly_type, product_type)
+
+    @property
+    def key(self):
+        return (
+            f'route_snapshot:{self.employee_id}:{self.version}:{self.period_date.id}:'
+            f'{self.weekly_type}:{self.product_type}'
+        )
+
+    @property
+    def filter_by_product_type(self):
+        # faqat oylik bo'lgandagina product type bo'yicha filter qilinadi,
+        # haftalikda barcha rastalar ko'rinishi kerak
+        return bool(self.product_type) and self.weekly_type == 2
+
+    def params(self):
+        return {
+            'employee_id': self.employee_id,
+            'period_date_id': self.period_date.id,
+            'period_id': self.period_date.period_id,
+            'weekly_type': self.weekly_type,
+            'product_type': self.product_type,
+            'filter_by_product_type': self.filter_by_product_type,
+        }
+
+    # --- Querysetlar ---
+
+    def tochka_product_query(self):
+        return _tochka_product_query(self.params())
+
+    def history_query(self):
+        return _history_query(self.params())
+
+    def get_queryset(self):
+        base_query = Q(
+            Q(weekly_type=self.weekly_type) | Q(weekly_type=3),  # 3 is 'bari' type
+            employee_id=self.employee_id,
+            is_active=True
+        )
+        ntochka_query = Q(
+            Q(weekly_type=self.weekly_type) | Q(weekly_type=3),
+            is_active=True
+        )
+        if self.filter_by_product_type:
+            ntochka_query &= Q(product_type__contains=self.product_type)
+            base_query &= Q(product_type__contains=self.product_type)
+
+        # Rasta mahsulotlari va historylar Pythonga yuklanmaydi, faqat sonlari olinadi
+        ntochka_prefetch = Prefetch(
+            'ntochkas',
+            queryset=_annotate_counts(
+                NTochka.objects.filter(ntochka_query),
+                self.params()
+            ).only(
+                'id', 'uuid', 'name', 'hudud_id', 'is_active', 'in_proccess'
+            ),
+            to_attr='active_ntochkas'
+        )
+
+        return Tochka.objects.filter(base_query).select_related(
+            'employee',
+            'district'
+        ).only(
+            'id', 'uuid', 'name', 'icon', 'address', 'in_proccess',
+            'lat', 'lon', 'employee_id', 'district_id', 'is_active'
+        ).prefetch_related(
+            ntochka_prefetch
+        )
+
+    # --- Kesh ---
+
+    def build(self):
+        from apps.home.api.TochkaView.serializers import TochkaSerializer
+
+        data = TochkaSerializer(self.get_queryset(), many=True).data
+        snapshot = {'params': self.params(), 'data': [dict(item) for item in data]}
+        cache.set(self.key, snapshot, _timeout())
+        self._register()
+        return snapshot
+
+    def get(self):
+        snapshot = cache.get(self.key)
+        if snapshot is None:
+            snapshot = self.build()
+        return snapshot['data']
+
+    def _register(self):
+        """
+        Kalitni xodim ro'yxatiga qo'shish: har bir kalit alohida slotga yoziladi, slot raqami
+        atomar incr bilan olinadi, shuning uchun parallel so'rovlar bir-birining kalitini yo'qotmaydi.
+        """
+        registry_key = _registry_key(self.employee_id, self.version)
+        cache.add(f'{registry_key}:count', 0, _timeout())
+        try:
+            slot = cache.incr(f'{registry_key}:count')
+        except ValueError:
+            # Hisoblagich shu orada keshdan tushib ketgan
+            cache.add(f'{registry_key}:count', 1, _timeout())
+            slot = 1
+        cache.set(f'{registry_key}:{slot}', self.key, _timeout())
+
+
+def _tochka_product_query(params):
+    query = Q(is_udalen=False, is_weekly=params['weekly_type'] == 1)
+    if params['filter_by_product_type']:
+        query &= Q(product__category__product_type=int(params['product_type']))
+    return query
+
+
+def _history_query(params):
+    query = Q(period__period_id=params['period_id'])
+    if params['filter_by_product_type']:
+        query &= Q(product__category__product_type=int(params['product_type']))
+    return query
+
+
+def _count_subquery(queryset):
+    return Coalesce(
+        Subquery(
+            queryset.filter(
+                ntochka_id=OuterRef('pk')
+            ).order_by().values('ntochka_id').annotate(count=Count('id')).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def _annotate_counts(queryset, params):
+    """
+    Rastalarga products_count (mahsulotlar) va history_count (kiritilganlar)
+    sonlarini subquery COUNT bilan qo'shish.
+    """
+    return queryset.annotate(
+        products_count=_count_subquery(TochkaProduct.objects.filter(_tochka_product_query(params))),
+        history_count=_count_subquery(TochkaProductHistory.objects.filter(_history_query(params))),
+    )
+
+
+def _apply_tochka_counts(tochka):
+    rastas = tochka['ntochkas']
+    finished = sum(
+        1 for rasta in rastas
+        if rasta['all_count'] == 0 or rasta['finished'] == rasta['all_count']
+    )
+    tochka['all_count'] = len(rastas)
+    tochka['finished'] = finished
+    tochka['is_checked'] = finished == len(rastas)
+
+
+def refresh_ntochkas(ntochka_ids):
+    """
+    Berilgan rastalarning hisoblagichlarini ularning xodimlari keshdagi barcha
+    nusxalarida yangilash. Nusxa bo'lmasa hech narsa qilinmaydi.
+    Hisoblagichlar tranzaksiya yakunlangach qayta sanaladi va yoziladi, aks holda bekor
+    qilingan yoki hali ko'rinmaydigan narxlar keshga tushib qoladi.
+    """
+    ntochka_ids = set(ntochka_ids)
+    if not ntochka_ids:
+        return
+    transaction.on_commit(lambda: _refresh_ntochkas(ntochka_ids))
+
+
+def _refresh_ntochkas(ntochka_ids):
+    owners = {}
+    for ntochka_id, employee_id in NTochka.objects.filter(
+        id__in=ntochka_ids
+    ).values_list('id', 'hudud__employee_id'):
+        owners.setdefault(employee_id, set()).add(ntochka_id)
+
+    versions = get_versions([_version_name(employee_id) for employee_id in owners])
+    for employee_id, employee_ntochka_ids in owners.items():
+        for key in _registered_keys(employee_id, versions[_version_name(employee_id)]):
+            snapshot = cache.get(key)
+            if snapshot is None:
+                continue
+            counts = None
+            changed = False
+            for tochka in snapshot['data']:
+                for rasta in tochka['ntochkas']:
+                    if rasta['id'] not in employee_ntochka_ids:
+                        continue
+                    if counts is None:
+                        counts = {
+                            ntochka_id: (products_count, history_count)
+                            for ntochka_id, products_count, history_count in _annotate_counts(
+                                NTochka.objects.filter(id__in=employee_ntochka_ids),
+                                snapshot['params']
+                            ).values_list('id', 'products_count', 'history_count')
+                        }
+                    all_count, finished = counts.get(rasta['id'], (0, 0))
+                    rasta['all_count'] = all_count
+                    rasta['finished'] = finished
+                    rasta['is_checked'] = all_count == finished
+                    _apply_tochka_counts(tochka)
+                    changed = True
+            if changed:
+                cache.set(key, snapshot, _timeout())
+
+
+def invalidate_employees(employee_ids):
+    """
+    Xodimlarning barcha marshrut nusxalarini eskirtirish: versiya oshadi, keyingi so'rovda
+    yangi kalit bilan qayta quriladi, eskilari ROUTE_SNAPSHOT_TIMEOUT da keshdan chiqadi.
+    Versiya tranzaksiya yakunlangach oshiriladi, aks holda boshqa ishchi yangi versiya ostida
+    hali saqlanmagan holatni keshlab qo'yishi mumkin.
+    """
+    employee_ids = set(employee_ids)
+
+    def bump():
+        for employee_id in employee_ids:
+            bump_version(_version_name(employee_id))
+
+    transaction.on_commit(bump)
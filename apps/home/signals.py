@@ -1,7 +1,33 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from .models import PeriodDate, Period
+from apps.form.models import TochkaProduct, TochkaProductHistory
+from apps.form.signals import histories_changed, activation_changed
+
+from .api.authentication import forget_token_version
+from .models import PeriodDate, Period, PeriodRollover, Tochka, NTochka, Employee
+from .services import offline_package, route_snapshot, period_rollover
+from .services.period_calendar import invalidate_calendar, is_only_date
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Period)
+@receiver(post_delete, sender=Period)
+@receiver(post_save, sender=PeriodDate)
+@receiver(post_delete, sender=PeriodDate)
+def invalidate_period_calendar(sender, instance, **kwargs):
+    """
+    Davr yoki uning sanasi o'zgarganda davr kalendarini qayta qurish.
+    Versiya tranzaksiya yakunlangach oshiriladi, shuning uchun quyidagi receiverlar
+    kalendarni emas, bazani o'qiydi; ularning on_commit tasklari esa yangi kalendarni ko'radi.
+    """
+    transaction.on_commit(invalidate_calendar)
 
 
 @receiver(post_save, sender=PeriodDate)
@@ -10,84 +36,79 @@ def create_history_for_new_period(sender, instance, created, **kwargs):
     Yangi PeriodDate yaratilganda, oldingi perioddagi
     'vaqtinchalik' yoki 'mavsumiy' statusli history larni
     yangi period uchun ko'chirish.
+
+    Ko'chirish admin so'rovida emas, Celery taskida bo'laklab bajariladi
+    (services.period_rollover), bu yerda faqat progress yozuvi yaratiladi.
     """
     if not created:
         return
 
-    # Faqat weekly period uchun
-    if instance.period.period_type != 'weekly':
-        return
+    rollover = period_rollover.plan_rollover(instance)
+    if rollover is not None:
+        period_rollover.schedule_rollover(instance.id)
 
-    # Shu Period uchun birinchi PeriodDate bo'lishi kerak
-    if PeriodDate.objects.filter(period=instance.period).count() > 1:
-        return
 
-    # Oldingi Period ni topish (id bo'yicha oldingi weekly period)
-    previous_period = Period.objects.filter(
-        id__lt=instance.period.id,
-        period_type='weekly'
-    ).order_by('-id').first()
+@receiver(histories_changed, sender=TochkaProductHistory)
+def refresh_route_snapshot_on_history(sender, histories, **kwargs):
+    """
+    History yozilganda marshrut nusxasidagi rasta hisoblagichlarini yangilash.
+    """
+    route_snapshot.refresh_ntochkas({history.ntochka_id for history in histories})
 
-    if not previous_period:
-        return
 
-    # Oldingi period ning PeriodDate sini topish
-    previous_period_dates = PeriodDate.objects.filter(
-        period=previous_period
-    )
+@receiver(post_save, sender=TochkaProduct)
+@receiver(post_delete, sender=TochkaProduct)
+def refresh_route_snapshot_on_tochka_product(sender, instance, **kwargs):
+    route_snapshot.refresh_ntochkas([instance.ntochka_id])
 
-    if not previous_period_dates.exists():
-        return
 
-    # Import here to avoid circular import
-    from apps.form.models import TochkaProductHistory, TochkaProduct
-
-    # Oldingi perioddagi shartga mos history larni olish
-    previous_histories = TochkaProductHistory.objects.filter(
-        period__in=previous_period_dates,
-        status__in=['vaqtinchalik', 'mavsumiy'],
-        tochka_product__is_weekly=True
-    ).select_related('tochka_product')
-
-    # Yangi history larni yaratish va TochkaProduct larni yangilash
-    new_histories = []
-    tochka_products_to_update = []
-
-    for history in previous_histories:
-        tochka_product = history.tochka_product
-
-        # TochkaProduct narxlarini yangilash
-        tochka_product.previous_price = tochka_product.last_price
-        tochka_product.last_price = 0
-        tochka_products_to_update.append(tochka_product)
-
-        # Yangi history yaratish
-        new_histories.append(
-            TochkaProductHistory(
-                product=history.product,
-                ntochka=history.ntochka,
-                hudud=history.hudud,
-                tochka_product=tochka_product,
-                employee=history.employee,
-                period=instance,  # Yangi PeriodDate
-                status=history.status,  # Oldingi status saqlanadi
-                price=0,
-                unit_price=0,
-                unit_miqdor=tochka_product.miqdor,
-                is_from_period_create=True,
-            )
-        )
-
-    # TochkaProduct larni bulk update qilish
-    if tochka_products_to_update:
-        TochkaProduct.objects.bulk_update(
-            tochka_products_to_update,
-            ['last_price', 'previous_price']
-        )
-
-    # History larni bulk create qilish
-    if new_histories:
-        TochkaProductHistory.objects.bulk_create(
-            new_histories,
-            ignore_conflicts=True  # unique_together xatoligini oldini olish
-        )
+@receiver(post_save, sender=Tochka)
+@receiver(post_delete, sender=Tochka)
+def invalidate_route_snapshot_on_tochka(sender, instance, **kwargs):
+    """
+    Obyekt yoqilganda/o'chirilganda xodim marshrutini qayta qurish.
+    """
+    route_snapshot.invalidate_employees([instance.employee_id])
+
+
+@receiver(post_save, sender=NTochka)
+@receiver(post_delete, sender=NTochka)
+def invalidate_route_snapshot_on_ntochka(sender, instance, **kwargs):
+    """
+    Rasta yoqilganda/o'chirilganda xodim marshrutini qayta qurish.
+    """
+    employee_id = Tochka.objects.filter(id=instance.hudud_id).values_list('employee_id', flat=True).first()
+    if employee_id:
+        route_snapshot.invalidate_employees([employee_id])
+
+
+@receiver(activation_changed)
+def invalidate_route_snapshot_on_activation(sender, tochka_ids, ntochka_ids, **kwargs):
+    """
+    Arizalar ommaviy tasdiqlanganda (queryset.update) obyekt/rasta egalari marshrutini qayta qurish.
+    """
+    employee_ids = Tochka.objects.filter(
+        Q(id__in=tochka_ids) | Q(ntochkas__id__in=ntochka_ids)
+    ).order_by().values_list('employee_id', flat=True).distinct()
+    route_snapshot.invalidate_employees(list(employee_ids))
+
+
+@receiver(post_save, sender=Employee)
+def forget_employee_token_version(sender, instance, **kwargs):
+    forget_token_version(instance.id)
+
+
+@receiver(post_save, sender=PeriodDate)
+def schedule_offline_packages(sender, instance, created, **kwargs):
+    """
+    Davr ochilganda (Period uchun birinchi PeriodDate) xodimlarning
+    offline paketlarini fonda yaratish. Historylar ko'chiriladigan bo'lsa
+    paketlar ko'chirish tugagach yaratiladi (period_rollover.run_rollover).
+    """
+    if not created or not getattr(settings, 'OFFLINE_PACKAGES_ON_PERIOD_OPEN', False):
+        return
+    if not is_only_date(instance):
+        return
+    if PeriodRollover.objects.filter(period_date=instance).exists():
+        return
+    offline_package.schedule_build(instance.id)
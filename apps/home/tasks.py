@@ -0,0 +1,42 @@
+from celery import shared_task
+import logging
+
+from .services.offline_package import build_offline_packages
+from .services.period_rollover import run_rollover
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def build_offline_packages_task(self, period_date_id, employee_ids=None):
+    """Davr ochilganda xodimlarning offline SQLite paketlarini yaratish uchun Celery task"""
+    try:
+        manifest = build_offline_packages(period_date_id, employee_ids=employee_ids)
+        logger.info(f"Offline paketlar yaratildi: {len(manifest.get('packages', {}))} ta (davr sanasi {period_date_id})")
+        return {'period_date_id': period_date_id, 'packages': len(manifest.get('packages', {}))}
+    except Exception as exc:
+        logger.error(f"Offline paketlar task da xatolik: {exc}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        raise exc
+
+
+@shared_task(bind=True, max_retries=3)
+def period_rollover_task(self, period_date_id):
+    """Oldingi davr historylarini yangi davrga bo'laklab ko'chirish uchun Celery task"""
+    try:
+        rollover = run_rollover(period_date_id)
+        if rollover is None:
+            return {'period_date_id': period_date_id, 'status': None}
+        return {
+            'period_date_id': period_date_id,
+            'status': rollover.status,
+            'processed': rollover.processed,
+            'created': rollover.created_count,
+        }
+    except Exception as exc:
+        logger.error(f"Davr ko'chirish task da xatolik: {exc}")
+        if self.request.retries < self.max_retries:
+            # Qayta urinish last_history_id dan davom etadi
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        raise exc
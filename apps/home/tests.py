@@ -1,3 +1,339 @@
-from django.test import TestCase
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from apps.form.models import Birlik, ProductCategory, Product, TochkaProduct, TochkaProductHistory
+
+from .api.authentication import revoke_tokens
+from .models import Region, District, Employee, Period, PeriodDate, PeriodRollover, Tochka, NTochka
+from .services import route_snapshot
+from .services.code_sequence import code_allocator, next_tochka_code, next_ntochka_code
+from .services.period_rollover import run_rollover
+from .services.offline_package import build_offline_packages, get_package
+from .services.period_calendar import get_calendar
+
+
+def create_route(products=3):
+    """
+    Bitta xodim, bitta obyekt va rasta, unda products ta haftalik rasta mahsuloti.
+    """
+    region = Region.objects.create(name='Toshkent', code='27')
+    district = District.objects.create(name='Chilonzor', region=region, code='03')
+    employee = Employee.objects.create(full_name='Xodim', login='xodim', password='parol', district=district)
+    period = Period.objects.create(name='2026-W01', period_type='weekly')
+    period_date = PeriodDate.objects.create(period=period, date=timezone.localdate())
+    unit = Birlik.objects.create(name='kg', code='1', miqdor=1)
+    category = ProductCategory.objects.create(name='Sabzavotlar', code='01')
+    tochka = Tochka.objects.create(name='Bozor', district=district, code='2703-0001', employee=employee)
+    ntochka = NTochka.objects.create(name='Rasta', hudud=tochka, code='2703-0001-001')
+    tochka_products = [
+        TochkaProduct.objects.create(
+            product=Product.objects.create(name=f'Mahsulot {index}', category=category, code=f'01{index:02}', unit=unit),
+            ntochka=ntochka, hudud=tochka, is_weekly=True,
+        )
+        for index in range(products)
+    ]
+    return {
+        'region': region, 'district': district, 'employee': employee, 'period': period,
+        'period_date': period_date, 'tochka': tochka, 'ntochka': ntochka, 'tochka_products': tochka_products,
+    }
+
+
+class RouteSnapshotTests(APITestCase):
+    url = '/api/home/tochka-list/?weekly_type=weekly'
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route()
+        self.headers = {'HTTP_X_USER_UUID': str(self.route['employee'].uuid)}
+        get_calendar()
+
+    def get_rastas(self):
+        return self.client.get(self.url, **self.headers).json()[0]['ntochkas']
+
+    def test_snapshot_is_served_from_cache(self):
+        self.get_rastas()
+        # faqat xodim so'rovi, marshrut keshdan
+        with self.assertNumQueries(1):
+            self.get_rastas()
+
+    def test_history_refreshes_counters_in_place(self):
+        self.assertEqual(self.get_rastas()[0]['finished'], 0)
+        tochka_product = self.route['tochka_products'][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            TochkaProductHistory.objects.create(
+                product=tochka_product.product, ntochka=self.route['ntochka'], hudud=self.route['tochka'],
+                tochka_product=tochka_product, employee=self.route['employee'], period=self.route['period_date'],
+                price=10,
+            )
+            # tranzaksiya yakunlanmaguncha nusxa o'zgarmaydi
+            self.assertEqual(self.get_rastas()[0]['finished'], 0)
+        rasta = self.get_rastas()[0]
+        self.assertEqual((rasta['finished'], rasta['all_count']), (1, 3))
+
+    def test_deactivation_invalidates_after_commit(self):
+        self.get_rastas()
+        ntochka = self.route['ntochka']
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            ntochka.is_active = False
+            ntochka.save()
+        # tranzaksiya yakunlanmaguncha eski nusxa beriladi
+        self.assertEqual(len(self.get_rastas()), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_rastas(), [])
+
+    def test_registry_keeps_every_key(self):
+        employee_id = self.route['employee'].id
+        snapshots = [
+            route_snapshot.RouteSnapshot(employee_id, self.route['period_date'], weekly_type, product_type)
+            for weekly_type in ('weekly', 'monthly') for product_type in ('1', '2')
+        ]
+        for snapshot in snapshots:
+            snapshot.build()
+        snapshots[0].build()
+        version = snapshots[0].version
+        self.assertCountEqual(
+            route_snapshot._registered_keys(employee_id, version), [snapshot.key for snapshot in snapshots]
+        )
+
+
+class EmployeeTokenTests(APITestCase):
+    url = '/api/home/tochka-list/?weekly_type=weekly'
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route()
+        response = self.client.post('/api/home/login/', {'login': 'xodim', 'password': 'parol'}, format='json')
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {response.json()['token']}"}
+
+    def test_token_authenticates_without_uuid_header(self):
+        response = self.client.get(self.url, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_revoked_token_is_rejected(self):
+        revoke_tokens([self.route['employee'].id])
+        self.assertEqual(self.client.get(self.url, **self.headers).status_code, 401)
+
+    def test_revocation_reaches_other_processes_after_ttl(self):
+        self.assertEqual(self.client.get(self.url, **self.headers).status_code, 200)
+        # Boshqa jarayondagi bekor qilish: baza o'zgaradi, bu jarayon keshi tozalanmaydi
+        Employee.objects.filter(id=self.route['employee'].id).update(token_version=F('token_version') + 1)
+        self.assertEqual(self.client.get(self.url, **self.headers).status_code, 200)
+        # EMPLOYEE_TOKEN_VERSION_TTL o'tgach versiya bazadan qayta o'qiladi
+        with mock.patch('time.time', return_value=time.time() + 10):
+            self.assertEqual(self.client.get(self.url, **self.headers).status_code, 401)
+
+    def test_tampered_token_is_rejected(self):
+        token = self.headers['HTTP_AUTHORIZATION'][:-2] + 'xx'
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION=token).status_code, 401)
+
+
+class OfflinePackageTests(APITestCase):
+    url = '/api/home/offline-package/?weekly_type=weekly'
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route()
+        self.headers = {'HTTP_X_USER_UUID': str(self.route['employee'].uuid)}
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(OFFLINE_PACKAGE_ROOT=Path(root.name), OFFLINE_PACKAGE_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_package_is_served_on_later_dates_of_period(self):
+        build_offline_packages(self.route['period_date'].id)
+        with self.captureOnCommitCallbacks(execute=True):
+            PeriodDate.objects.filter(id=self.route['period_date'].id).update(date=timezone.localdate() - timedelta(days=3))
+            later = PeriodDate.objects.create(period=self.route['period'], date=timezone.localdate())
+
+        response = self.client.get(self.url, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Period-Date'], str(later.id))
+        b''.join(response.streaming_content)
+
+    def test_package_is_built_after_rollover(self):
+        tochka_product = self.route['tochka_products'][0]
+        TochkaProductHistory.objects.create(
+            product=tochka_product.product, ntochka=self.route['ntochka'], hudud=self.route['tochka'],
+            tochka_product=tochka_product, employee=self.route['employee'], period=self.route['period_date'],
+            price=10, status='vaqtinchalik',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            period = Period.objects.create(name='2026-W02', period_type='weekly')
+            period_date = PeriodDate.objects.create(period=period, date=timezone.localdate() + timedelta(days=7))
+
+        _, path = get_package(period.id, self.route['employee'].uuid)
+        db = sqlite3.connect(path)
+        try:
+            statuses = db.execute('SELECT period_id, status FROM period_status').fetchall()
+        finally:
+            db.close()
+        self.assertEqual(statuses, [(period_date.id, 'vaqtinchalik')])
+
+
+class SnapshotCountsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route()
+        self.snapshot = route_snapshot.RouteSnapshot(self.route['employee'].id, self.route['period_date'])
+
+    def counts(self, ntochka):
+        ntochka = route_snapshot._annotate_counts(NTochka.objects.filter(id=ntochka.id), self.snapshot.params()).get()
+        return ntochka.products_count, ntochka.history_count
+
+    def test_counts_kept_products_and_period_histories(self):
+        first, second, _ = self.route['tochka_products']
+        first.is_udalen = True
+        first.save()
+        other_period = Period.objects.create(name='2025-W52', period_type='weekly')
+        other_date = PeriodDate.objects.create(period=other_period, date=timezone.localdate() - timedelta(days=7))
+        for period_date in (self.route['period_date'], other_date):
+            TochkaProductHistory.objects.create(
+                product=second.product, ntochka=self.route['ntochka'], hudud=self.route['tochka'],
+                tochka_product=second, employee=self.route['employee'], period=period_date, price=10,
+            )
+        self.assertEqual(self.counts(self.route['ntochka']), (2, 1))
+
+    def test_empty_rasta_counts_zero(self):
+        empty = NTochka.objects.create(name="Bo'sh rasta", hudud=self.route['tochka'], code='2703-0001-002')
+        self.assertEqual(self.counts(empty), (0, 0))
+
+
+class PeriodCalendarTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route()
+
+    def test_calendar_is_invalidated_after_commit(self):
+        calendar = get_calendar()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            period_date = PeriodDate.objects.create(period=self.route['period'], date=timezone.localdate() + timedelta(days=1))
+        # tranzaksiya ichida yakunlanmagan sana kalendarga tushmaydi
+        self.assertIs(get_calendar(), calendar)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_calendar().get(period_date.id), period_date)
+
+    def test_calendar_is_rebuilt_after_max_age(self):
+        # Versiya boshqa jarayonning keshida oshirilgan (bu jarayon uni ko'rmaydi)
+        calendar = get_calendar()
+        with self.captureOnCommitCallbacks(execute=False):
+            period_date = PeriodDate.objects.create(period=self.route['period'], date=timezone.localdate() + timedelta(days=1))
+        self.assertIs(get_calendar(), calendar)
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + settings.PERIOD_CALENDAR_MAX_AGE + 1):
+            self.assertEqual(get_calendar().get(period_date.id), period_date)
+
+    def test_rollover_is_planned_for_first_date_only(self):
+        PeriodDate.objects.create(period=self.route['period'], date=timezone.localdate() + timedelta(days=1))
+        period = Period.objects.create(name='2026-W02', period_type='weekly')
+        first = PeriodDate.objects.create(period=period, date=timezone.localdate() + timedelta(days=7))
+        PeriodDate.objects.create(period=period, date=timezone.localdate() + timedelta(days=8))
+        self.assertEqual(
+            list(PeriodRollover.objects.values_list('period_date_id', 'previous_period_id')),
+            [(first.id, self.route['period'].id)],
+        )
+
+
+class PeriodRolloverTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route(products=5)
+        TochkaProduct.objects.update(last_price=50)
+        self.histories = [
+            TochkaProductHistory.objects.create(
+                product=tochka_product.product, ntochka=self.route['ntochka'], hudud=self.route['tochka'],
+                tochka_product=tochka_product, employee=self.route['employee'], period=self.route['period_date'],
+                price=50, status='vaqtinchalik' if index else 'mavjud',
+            )
+            for index, tochka_product in enumerate(self.route['tochka_products'])
+        ]
+        period = Period.objects.create(name='2026-W02', period_type='weekly')
+        self.period_date = PeriodDate.objects.create(period=period, date=timezone.localdate() + timedelta(days=7))
+
+    def rolled_over(self):
+        return sorted(
+            TochkaProductHistory.objects.filter(period=self.period_date).values_list('tochka_product_id', flat=True)
+        )
+
+    def test_copies_temporary_statuses_in_chunks(self):
+        rollover = run_rollover(self.period_date.id, chunk_size=2)
+
+        self.assertEqual(
+            (rollover.status, rollover.processed, rollover.created_count, rollover.last_history_id),
+            ('done', 4, 4, self.histories[-1].id),
+        )
+        copied = [history.tochka_product_id for history in self.histories[1:]]
+        self.assertEqual(self.rolled_over(), sorted(copied))
+        self.assertEqual(
+            set(TochkaProduct.objects.filter(id__in=copied).values_list('last_price', 'previous_price')), {(0, 50)}
+        )
+
+    def test_resumes_from_last_history_and_keeps_entered_prices(self):
+        PeriodRollover.objects.filter(period_date=self.period_date).update(
+            status='failed', last_history_id=self.histories[2].id, processed=2, created_count=2
+        )
+        entered = self.route['tochka_products'][4]
+        TochkaProductHistory.objects.create(
+            product=entered.product, ntochka=self.route['ntochka'], hudud=self.route['tochka'],
+            tochka_product=entered, employee=self.route['employee'], period=self.period_date, price=70,
+        )
+        TochkaProduct.objects.filter(id=entered.id).update(last_price=70)
+
+        rollover = run_rollover(self.period_date.id, chunk_size=2)
+
+        self.assertEqual((rollover.status, rollover.processed, rollover.created_count), ('done', 4, 3))
+        self.assertEqual(self.rolled_over(), sorted([self.route['tochka_products'][3].id, entered.id]))
+        entered.refresh_from_db()
+        self.assertEqual(entered.last_price, 70)
+
+    def test_running_rollover_is_claimed_only_when_stale(self):
+        PeriodRollover.objects.filter(period_date=self.period_date).update(status='running')
+        self.assertIsNone(run_rollover(self.period_date.id))
+        self.assertEqual(self.rolled_over(), [])
+
+        PeriodRollover.objects.filter(period_date=self.period_date).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(run_rollover(self.period_date.id).status, 'done')
+        # Tugagan ko'chirish qayta egallanmaydi
+        self.assertEqual(run_rollover(self.period_date.id).created_count, 4)
+
+
+class CodeSequenceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        code_allocator.reset()
+        self.addCleanup(code_allocator.reset)
+        self.route = create_route(products=0)
+
+    def test_codes_continue_district_and_obyekt_sequences(self):
+        district, tochka = self.route['district'], self.route['tochka']
+        self.assertEqual([next_tochka_code(district), next_tochka_code(district)], ['2703-0002', '2703-0003'])
+        self.assertEqual(next_ntochka_code(tochka), '2703-0001-002')
+
+    def test_prefix_soato_does_not_collide(self):
+        # 27 + 031 = 27031 soatosi 27 + 03 = 2703 bilan boshlanadi
+        other = District.objects.create(name='Boshqa', region=self.route['region'], code='031')
+        Tochka.objects.create(name='Bozor 2', district=other, code='27031-0007', employee=self.route['employee'])
+
+        self.assertEqual(next_tochka_code(self.route['district']), '2703-0002')
+        self.assertEqual(next_tochka_code(other), '27031-0008')
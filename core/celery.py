@@ -1,5 +1,14 @@
+import os
+
+from celery import Celery
 from celery.schedules import crontab
 
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.develop')
+
+app = Celery('core')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
 CELERY_BEAT_SCHEDULE = {
     'import-kobo-data-every-hour': {
         'task': 'apps.utils.tasks.import_kobo_data_task',
@@ -7,4 +16,10 @@ CELERY_BEAT_SCHEDULE = {
         # 'schedule': crontab(minute=0, hour='*/6'),  # 6 soatda bir marta
         # 'schedule': crontab(minute=0, hour=0),  # Har kuni yarim tunda
     },
-}
\ No newline at end of file
+    'drain-price-ingestion': {
+        'task': 'apps.form.tasks.drain_price_ingestion_task',
+        'schedule': 30.0,  # Navbat rejimida qolib ketgan narxlar uchun zaxira
+    },
+}
+
+app.conf.beat_schedule = CELERY_BEAT_SCHEDULE
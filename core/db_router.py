@@ -0,0 +1,111 @@
+"""
+O'qish replikasi uchun router va middleware.
+
+REPLICA_READ_VIEWS dagi view larning GET/HEAD so'rovlari `replica` bazasidan o'qiydi.
+Yozuvlar har doim `default` ga ketadi. Mijoz yozuv qilgandan keyin REPLICA_STICKY_SECONDS
+davomida uning o'qishlari ham `default` dan bo'ladi (replika kechikishi ko'rinmasligi uchun).
+Bu belgi keshda emas, mijozda saqlanadi: imzolangan `db_sticky` cookie va xuddi shu qiymatli
+`X-DB-Sticky` javob sarlavhasi (cookie saqlamaydigan mobil mijoz uni keyingi so'rovlarda qaytaradi).
+`replica` bazasi sozlanmagan bo'lsa hammasi `default` da ishlaydi.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'db_sticky'
+STICKY_HEADER = 'X-DB-Sticky'
+_STICKY_SIGNER = signing.TimestampSigner(salt='core.db_router.sticky')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_enabled():
+    return REPLICA_DB_ALIAS in connections.settings
+
+
+def _sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def _mark_sticky(response):
+    seconds = _sticky_seconds()
+    value = _STICKY_SIGNER.sign('1')
+    response.set_cookie(
+        STICKY_COOKIE, value, max_age=seconds, httponly=True, samesite='Lax',
+        secure=settings.SESSION_COOKIE_SECURE,
+    )
+    response[STICKY_HEADER] = value
+
+
+def _is_sticky(request):
+    """
+    Cookie yoki sarlavhadagi imzo to'g'ri va REPLICA_STICKY_SECONDS dan eski bo'lmasa True.
+    """
+    value = request.COOKIES.get(STICKY_COOKIE) or request.META.get('HTTP_X_DB_STICKY')
+    if not value:
+        return False
+    try:
+        _STICKY_SIGNER.unsign(value, max_age=_sticky_seconds())
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class ReplicaRouter:
+    """
+    O'qishlar: replika rejimi yoqilgan bo'lsa `replica`, aks holda `default`.
+    Yozuvlar: har doim `default`; yozuvdan keyin shu so'rovdagi o'qishlar ham `default`.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_enabled():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if _use_replica.get():
+            _use_replica.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    REPLICA_READ_VIEWS dagi o'qish so'rovlarini replikaga yo'naltirish va
+    muvaffaqiyatli yozuvdan keyin mijozni vaqtincha `default` ga bog'lash.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                _use_replica.reset(request._replica_token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_enabled():
+            _mark_sticky(response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or not replica_enabled():
+            return None
+        match = request.resolver_match
+        if match is None or match.view_name not in getattr(settings, 'REPLICA_READ_VIEWS', ()):
+            return None
+        if _is_sticky(request):
+            return None
+        request._replica_token = _use_replica.set(True)
+        return None
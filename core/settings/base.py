@@ -66,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
 ]
 
 if DEBUG:
@@ -121,6 +122,37 @@ DATABASES = {
     }
 }
 
+# O'qish replikasi (ixtiyoriy). Lokal sinov uchun DB_REPLICA_NAME ga db.sqlite3 nusxasini berish mumkin.
+if config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {
+        'ENGINE': config('DB_REPLICA_ENGINE', default=DATABASES['default']['ENGINE']),
+        'NAME': config('DB_REPLICA_NAME'),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': config('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# GET so'rovlari replikadan o'qiladigan view lar (resolver view_name)
+REPLICA_READ_VIEWS = [
+    'home:home:tochka-list',
+    'form:home:tochka_product_list',
+    'form:home:application_list',
+    'form:application_list',
+    'form:application_statistics',
+    'monitoring:dashboard',
+    'monitoring:history',
+    'monitoring:product_detail',
+    'monitoring:region_monitoring',
+    'monitoring:export_excel',
+    'monitoring:export_csv',
+    'export_all_csv',
+]
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)  # yozuvdan keyin primary dan o'qish oynasi
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -175,6 +207,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # 'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.home.api.authentication.EmployeeTokenAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
     ],
@@ -234,6 +267,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['X-DB-Sticky']  # replika: yozuvdan keyin mijoz qaytaradigan belgi (core/db_router.py)
 
 # Security Settings
 if not DEBUG:
@@ -336,6 +370,40 @@ LOGGING = {
 API_VERSION = 'v1'
 PAGINATION_PAGE_SIZE = config('PAGINATION_PAGE_SIZE', default=20, cast=int)
 MAX_UPLOAD_SIZE = config('MAX_UPLOAD_SIZE', default=5242880, cast=int)  # 5MB
+EMPLOYEE_TOKEN_MAX_AGE = config('EMPLOYEE_TOKEN_MAX_AGE', default=60 * 60 * 24 * 30, cast=int)  # planshet tokeni muddati
+EMPLOYEE_TOKEN_VERSION_TTL = config('EMPLOYEE_TOKEN_VERSION_TTL', default=5, cast=int)  # token versiyasi keshi (soniya), bekor qilish shu muddatda barcha ishchilarga yetadi
+IDEMPOTENCY_KEY_TIMEOUT = config('IDEMPOTENCY_KEY_TIMEOUT', default=60 * 60 * 24, cast=int)  # Idempotency-Key javoblari keshi
+RASTA_SYNC_OVERLAP = config('RASTA_SYNC_OVERLAP', default=60, cast=int)  # since-token bilan qayta beriladigan oraliq (soniya)
+# Narxlarni navbat orqali yozish: 'sync' (darhol) yoki 'queue' (202 + Celery)
+PRICE_INGESTION_MODE = config('PRICE_INGESTION_MODE', default='sync')
+PRICE_INGESTION_BACKEND = config('PRICE_INGESTION_BACKEND', default='file')  # 'redis' yoki 'file'
+PRICE_INGESTION_REDIS_URL = config('PRICE_INGESTION_REDIS_URL', default='redis://127.0.0.1:6379/2')
+PRICE_INGESTION_STREAM = 'price_submissions'
+PRICE_INGESTION_DIR = BASE_DIR / 'ingestion'
+PRICE_INGESTION_BATCH_SIZE = config('PRICE_INGESTION_BATCH_SIZE', default=500, cast=int)
+PRICE_INGESTION_MAX_PENDING = config('PRICE_INGESTION_MAX_PENDING', default=50000, cast=int)  # back-pressure chegarasi
+ROUTE_SNAPSHOT_TIMEOUT = config('ROUTE_SNAPSHOT_TIMEOUT', default=60 * 60 * 6, cast=int)  # xodim marshruti keshi
+PERIOD_CALENDAR_GRACE_DAYS = config('PERIOD_CALENDAR_GRACE_DAYS', default=0, cast=int)  # davr oxirgi sanasidan keyin ham faol hisoblanadigan kunlar
+PERIOD_CALENDAR_MAX_AGE = config('PERIOD_CALENDAR_MAX_AGE', default=30, cast=int)  # soniya, shundan keyin kalendar versiyadan qat'i nazar qayta quriladi
+DSQ_ORGS_FILE = BASE_DIR / 'datas' / 'DSQ_orgs.csv'  # DSQ tashkilotlari INN ro'yxati
+OFFLINE_PACKAGE_ROOT = BASE_DIR / 'offline_packages'  # xodimlarning offline SQLite paketlari
+OFFLINE_PACKAGE_WORKERS = config('OFFLINE_PACKAGE_WORKERS', default=4, cast=int)
+OFFLINE_PACKAGES_ON_PERIOD_OPEN = config('OFFLINE_PACKAGES_ON_PERIOD_OPEN', default=True, cast=bool)
+PERIOD_ROLLOVER_CHUNK_SIZE = config('PERIOD_ROLLOVER_CHUNK_SIZE', default=2000, cast=int)  # davr ko'chirishda bitta tranzaksiyadagi historylar
+PERIOD_ROLLOVER_LOCK_TIMEOUT = 60 * 30  # shuncha soniya yangilanmagan 'running' ko'chirish (ishchisi o'lgan) qayta egallanadi
+CODE_SEQUENCE_BLOCK_SIZE = config('CODE_SEQUENCE_BLOCK_SIZE', default=20, cast=int)  # jarayon bir so'rovda band qiladigan obyekt/rasta kodlari
+MONITORING_STATS_TIMEOUT = config('MONITORING_STATS_TIMEOUT', default=60 * 2, cast=int)  # monitoring natijalari keshi, joriy davr uchun
+MONITORING_CACHE_CLOSED_TIMEOUT = config('MONITORING_CACHE_CLOSED_TIMEOUT', default=60 * 60 * 24 * 7, cast=int)  # yopiq davrlar natijalari (versiya o'zgarguncha)
+PRICE_SERIES_DELAY = config('PRICE_SERIES_DELAY', default=60, cast=int)  # ochiq davr narx vaqt qatorini qayta qurishgacha kutish (soniya)
+PRICE_SERIES_LOCK_TIMEOUT = 60 * 10  # bitta davr sanasini bitta ishchi qurishi uchun bazadagi qulf muddati
+PRICE_OUTLIER_DELAY = config('PRICE_OUTLIER_DELAY', default=60, cast=int)  # shubhali narxlarni qayta belgilashgacha kutish (soniya)
+PRICE_OUTLIER_LOCK_TIMEOUT = 60 * 10  # bitta davr sanasini bitta ishchi tekshirishi uchun bazadagi qulf muddati
+PRICE_OUTLIER_MIN_GROUP = config('PRICE_OUTLIER_MIN_GROUP', default=5, cast=int)  # (mahsulot, tuman) guruhida oraliq bo'yicha tekshirish uchun eng kam narxlar
+PRICE_OUTLIER_IQR_K = config('PRICE_OUTLIER_IQR_K', default=3.0, cast=float)  # kvartillardan IQR ning necha barobari uzoqlik shubhali
+PRICE_OUTLIER_MAD_Z = config('PRICE_OUTLIER_MAD_Z', default=3.5, cast=float)  # medianadan necha barqaror standart og'ish uzoqlik shubhali
+PRICE_OUTLIER_MIN_SPREAD = config('PRICE_OUTLIER_MIN_SPREAD', default=0.2, cast=float)  # medianadan bu ulushgacha farq hech qachon shubhali emas
+PRICE_INDEX_DELAY = config('PRICE_INDEX_DELAY', default=60, cast=int)  # shubhali narxlar belgilangach indeksni qayta hisoblashgacha kutish (soniya)
+PRICE_INDEX_LOCK_TIMEOUT = 60 * 10  # bitta davr sanasini bitta ishchi hisoblashi uchun bazadagi qulf muddati
 
 # Celery
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379')